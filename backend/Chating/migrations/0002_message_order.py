@@ -0,0 +1,21 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Split out of 0001 once Orders got migrations: databases created before
+    # then already have the column, and ``migrate --fake-initial`` skips it.
+    initial = True
+
+    dependencies = [
+        ('Orders', '0001_initial'),
+        ('chating', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='message',
+            name='order',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='chat_messages', to='Orders.order'),
+        ),
+    ]
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class HomeConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'Home'
+
+    def ready(self):
+        from . import signals  # noqa: F401  (registers receivers)
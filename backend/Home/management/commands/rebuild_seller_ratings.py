@@ -0,0 +1,53 @@
+# backend/Home/management/commands/rebuild_seller_ratings.py
+"""
+Recompute every seller's rating aggregates from RatingSeller rows.
+
+    python manage.py rebuild_seller_ratings
+
+Ratings are maintained incrementally; run this to repair drift (rows edited
+with raw SQL, restored backups, ...). One grouped query computes all
+sellers' totals and only profiles that differ are rewritten, with
+``bulk_update`` in batches.
+"""
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from Home.models import STAR_FIELDS, RatingSeller, UserProfile, seller_rating_aggregates
+
+FIELDS = ['rating_sum', 'rating_count', *STAR_FIELDS.values(), 'overall_rating']
+
+
+class Command(BaseCommand):
+    help = "Rebuild UserProfile rating sums, counts and star histograms"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        totals = {
+            row.pop('seller_id'): row
+            for row in RatingSeller.objects.exclude(review_rating__isnull=True)
+            .values('seller_id').annotate(**seller_rating_aggregates()).order_by()
+        }
+        empty = {'rating_sum': 0, 'rating_count': 0, **{field: 0 for field in STAR_FIELDS.values()}}
+
+        changed, batch = 0, []
+        with transaction.atomic():
+            for profile in UserProfile.objects.only('id', 'user_id', *FIELDS).iterator(chunk_size=batch_size):
+                row = dict(totals.get(profile.user_id, empty))
+                row['overall_rating'] = round(row['rating_sum'] / row['rating_count'], 2) if row['rating_count'] else 0
+                if all(getattr(profile, field) == value for field, value in row.items()):
+                    continue
+                for field, value in row.items():
+                    setattr(profile, field, value)
+                batch.append(profile)
+                if len(batch) >= batch_size:
+                    UserProfile.objects.bulk_update(batch, FIELDS)
+                    changed += len(batch)
+                    batch = []
+            if batch:
+                UserProfile.objects.bulk_update(batch, FIELDS)
+                changed += len(batch)
+
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt seller ratings: {changed} profile(s) corrected"))
@@ -0,0 +1,75 @@
+import Home.models
+import django.core.validators
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Skill',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Certification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(max_length=100)),
+                ('issuing_organization', models.CharField(max_length=100)),
+                ('issue_date', models.DateField()),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='certifications', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Language',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('language', models.CharField(max_length=50)),
+                ('proficiency', models.CharField(choices=[('novice', 'Novice'), ('basic', 'Basic'), ('intermediate', 'Intermediate'), ('advanced', 'Advanced'), ('proficient', 'Proficient')], max_length=12)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='languages', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='UserProfile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('profile_image', models.ImageField(blank=True, default=Home.models.default_profile_image, upload_to='profiles/')),
+                ('country', models.CharField(default='Nepal', max_length=50)),
+                ('state', models.CharField(default='Bagmati', max_length=50)),
+                ('phone', models.CharField(blank=True, max_length=15, null=True)),
+                ('website_link', models.URLField(blank=True, null=True)),
+                ('about_me', models.TextField()),
+                ('overall_rating', models.DecimalField(blank=True, decimal_places=2, default=0.0, max_digits=3, null=True)),
+                ('role', models.CharField(choices=[('admin', 'Admin'), ('customer', 'Customer'), ('seller', 'Freelancer')], default='customer', max_length=10)),
+                ('location', models.CharField(blank=True, default='Kathmandu, Nepal', max_length=100)),
+                ('skills', models.ManyToManyField(blank=True, related_name='user_profiles', to='Home.skill')),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='userprofile', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='RatingSeller',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('review_rating', models.DecimalField(blank=True, decimal_places=2, max_digits=3, null=True, validators=[django.core.validators.MinValueValidator(0.5), django.core.validators.MaxValueValidator(5.0)])),
+                ('title', models.CharField(max_length=50)),
+                ('review', models.TextField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('reviewer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ratings_given', to=settings.AUTH_USER_MODEL)),
+                ('seller', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ratings_received', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('seller', 'reviewer')},
+            },
+        ),
+    ]
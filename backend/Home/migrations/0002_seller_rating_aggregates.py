@@ -0,0 +1,68 @@
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+
+# Star buckets as in Home.models.seller_rating_aggregates at the time of writing
+STAR_BUCKETS = {'rating_1': (0, 1.5), 'rating_2': (1.5, 2.5), 'rating_3': (2.5, 3.5),
+                'rating_4': (3.5, 4.5), 'rating_5': (4.5, 6)}
+
+
+def fill_rating_aggregates(apps, schema_editor):
+    RatingSeller = apps.get_model('Home', 'RatingSeller')
+    UserProfile = apps.get_model('Home', 'UserProfile')
+    totals = (
+        RatingSeller.objects.exclude(review_rating__isnull=True).values('seller_id')
+        .annotate(rating_sum=Sum('review_rating', default=0), rating_count=Count('id'), **{
+            field: Count('id', filter=Q(review_rating__gte=low, review_rating__lt=high))
+            for field, (low, high) in STAR_BUCKETS.items()
+        })
+        .order_by()
+    )
+    for row in totals:
+        row['overall_rating'] = round(row['rating_sum'] / row['rating_count'], 2)
+        UserProfile.objects.filter(user_id=row.pop('seller_id')).update(**row)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Home', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprofile',
+            name='rating_1',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='rating_2',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='rating_3',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='rating_4',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='rating_5',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='rating_sum',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10),
+        ),
+        migrations.RunPython(fill_rating_aggregates, migrations.RunPython.noop),
+    ]
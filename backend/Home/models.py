@@ -1,8 +1,33 @@
 # Home/models.py — FINAL 100% WORKING VERSION
+from decimal import ROUND_HALF_UP, Decimal
+
 from django.conf import settings
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Case, Count, F, FloatField, Q, Sum, Value, When
+from django.db.models.functions import Cast, Round
 from django.core.validators import MinValueValidator, MaxValueValidator
 
+# Per-star seller rating histogram columns on UserProfile
+STAR_FIELDS = {star: f'rating_{star}' for star in range(1, 6)}
+
+
+def star_bucket(rating):
+    """Histogram star for a (possibly half-star) rating: 0.5-1.4 → 1 … 4.5-5.0 → 5."""
+    return min(5, max(1, int(Decimal(str(rating)).quantize(Decimal(1), rounding=ROUND_HALF_UP))))
+
+
+def seller_rating_aggregates():
+    """Aggregate expressions for every UserProfile rating field over RatingSeller rows."""
+    buckets = {1: (0, 1.5), 2: (1.5, 2.5), 3: (2.5, 3.5), 4: (3.5, 4.5), 5: (4.5, 6)}
+    return {
+        'rating_sum': Sum('review_rating', default=0),
+        'rating_count': Count('id'),
+        **{
+            STAR_FIELDS[star]: Count('id', filter=Q(review_rating__gte=low, review_rating__lt=high))
+            for star, (low, high) in buckets.items()
+        },
+    }
+
 
 class Skill(models.Model):
     name = models.CharField(max_length=50, unique=True)
@@ -35,6 +60,14 @@ class UserProfile(models.Model):
     website_link = models.URLField(blank=True, null=True)
     about_me = models.TextField()
     overall_rating = models.DecimalField(max_digits=3, decimal_places=2, default=0.00, null=True, blank=True)
+    # Running aggregates of RatingSeller rows, adjusted per rating with F() updates
+    rating_sum = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    rating_count = models.PositiveIntegerField(default=0)
+    rating_1 = models.PositiveIntegerField(default=0)
+    rating_2 = models.PositiveIntegerField(default=0)
+    rating_3 = models.PositiveIntegerField(default=0)
+    rating_4 = models.PositiveIntegerField(default=0)
+    rating_5 = models.PositiveIntegerField(default=0)
     skills = models.ManyToManyField(Skill, related_name='user_profiles', blank=True)
     role = models.CharField(max_length=10, choices=ROLE_CHOICES, default='customer')
     location = models.CharField(max_length=100, blank=True, default='Kathmandu, Nepal')
@@ -42,14 +75,40 @@ class UserProfile(models.Model):
     def __str__(self):
         return f"{self.user.username} - {self.get_role_display()}"
 
+    @property
+    def rating_histogram(self):
+        return {star: getattr(self, field) for star, field in STAR_FIELDS.items()}
+
+    @classmethod
+    def apply_rating_delta(cls, seller_id, added=None, removed=None):
+        """Count one rating in (``added``) and/or out (``removed``) of a seller's aggregates, O(1)."""
+        changes = {}
+        for rating, sign in ((added, 1), (removed, -1)):
+            if rating is None:
+                continue
+            field = STAR_FIELDS[star_bucket(rating)]
+            changes[field] = changes.get(field, F(field)) + sign
+            changes['rating_sum'] = changes.get('rating_sum', F('rating_sum')) + sign * Decimal(str(rating))
+            changes['rating_count'] = changes.get('rating_count', F('rating_count')) + sign
+        if not changes:
+            return
+        profiles = cls.objects.filter(user_id=seller_id)
+        with transaction.atomic():
+            profiles.update(**changes)
+            # Separate statement: some databases evaluate SET clauses left to right
+            profiles.update(overall_rating=Case(
+                When(rating_count=0, then=Value(0.0)),
+                default=Round(Cast(F('rating_sum'), FloatField()) / F('rating_count'), 2),
+                output_field=FloatField(),
+            ))
+
     def update_rating(self):
-        ratings = self.ratings_received.exclude(review_rating__isnull=True)
-        if ratings.exists():
-            avg = ratings.aggregate(avg=models.Avg('review_rating'))['avg']
-            self.overall_rating = round(avg, 2)
-        else:
-            self.overall_rating = 0.00
-        self.save()
+        """Rebuild the rating aggregates from scratch (repairs drift)."""
+        totals = self.user.ratings_received.exclude(review_rating__isnull=True).aggregate(**seller_rating_aggregates())
+        for field, value in totals.items():
+            setattr(self, field, value)
+        self.overall_rating = round(totals['rating_sum'] / totals['rating_count'], 2) if totals['rating_count'] else 0
+        self.save(update_fields=[*totals, 'overall_rating'])
 
 
 class Certification(models.Model):
@@ -112,7 +171,17 @@ class RatingSeller(models.Model):
         unique_together = ['seller', 'reviewer']
 
     def save(self, *args, **kwargs):
-        super().save(*args, **kwargs)
-        # Update seller's overall rating
-        if hasattr(self.seller, 'userprofile'):
-            self.seller.userprofile.update_rating()
\ No newline at end of file
+        with transaction.atomic():
+            previous = None
+            if self.pk is not None:
+                previous = RatingSeller.objects.filter(pk=self.pk).values_list('seller_id', 'review_rating').first()
+            super().save(*args, **kwargs)
+            # Adjust the seller's aggregates by this rating's change only
+            rating = self.review_rating
+            if previous is None:
+                UserProfile.apply_rating_delta(self.seller_id, added=rating)
+            elif previous[0] != self.seller_id:
+                UserProfile.apply_rating_delta(previous[0], removed=previous[1])
+                UserProfile.apply_rating_delta(self.seller_id, added=rating)
+            elif previous[1] != (Decimal(str(rating)) if rating is not None else None):
+                UserProfile.apply_rating_delta(self.seller_id, added=rating, removed=previous[1])
\ No newline at end of file
@@ -0,0 +1,17 @@
+# backend/Home/signals.py
+"""
+Keeps seller rating aggregates in step when ratings are deleted.
+
+Creates and edits are handled in ``RatingSeller.save``; deletes go through
+``post_delete`` so ``QuerySet.delete()`` (which skips ``Model.delete``) is
+covered too.
+"""
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from .models import RatingSeller, UserProfile
+
+
+@receiver(post_delete, sender=RatingSeller)
+def rating_deleted(sender, instance, **kwargs):
+    UserProfile.apply_rating_delta(instance.seller_id, removed=instance.review_rating)
@@ -1,3 +1,51 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
 from django.test import TestCase
 
-# Create your tests here.
+from .models import RatingSeller, UserProfile, star_bucket
+
+
+class SellerRatingTests(TestCase):
+    def setUp(self):
+        User = get_user_model()
+        self.seller = User.objects.create_user(username='seller', password='pass')
+        self.profile = UserProfile.objects.create(user=self.seller, about_me='Plumber')
+        self.buyers = [User.objects.create_user(username=f'buyer{i}', password='pass') for i in range(3)]
+
+    def rate(self, buyer, rating):
+        obj, _ = RatingSeller.objects.update_or_create(
+            seller=self.seller, reviewer=buyer,
+            defaults={'review_rating': rating, 'title': 'Review', 'review': 'Good'},
+        )
+        return obj
+
+    def test_star_bucket(self):
+        self.assertEqual([star_bucket(r) for r in ('0.5', '1.5', '2.4', '4.5', '5.0')], [1, 2, 2, 5, 5])
+
+    def test_update_or_create_applies_deltas(self):
+        self.rate(self.buyers[0], '5.0')
+        self.rate(self.buyers[1], '3.5')
+        self.rate(self.buyers[0], '4.0')          # edit: 5.0 → 4.0
+        self.profile.refresh_from_db()
+        self.assertEqual((self.profile.rating_sum, self.profile.rating_count), (7.5, 2))
+        self.assertEqual(self.profile.rating_histogram, {1: 0, 2: 0, 3: 0, 4: 2, 5: 0})
+        self.assertEqual(str(self.profile.overall_rating), '3.75')
+
+        RatingSeller.objects.filter(reviewer=self.buyers[1]).delete()
+        self.profile.refresh_from_db()
+        self.assertEqual((self.profile.rating_count, str(self.profile.overall_rating)), (1, '4.00'))
+
+    def test_rebuild_command_repairs_drift(self):
+        for buyer, rating in zip(self.buyers, ('2.0', '4.5', '5.0')):
+            self.rate(buyer, rating)
+        UserProfile.objects.filter(pk=self.profile.pk).update(rating_sum=0, rating_count=9, rating_5=0)
+
+        out = StringIO()
+        call_command('rebuild_seller_ratings', stdout=out)
+        self.assertIn('1 profile(s) corrected', out.getvalue())
+        self.profile.refresh_from_db()
+        self.assertEqual((self.profile.rating_sum, self.profile.rating_count), (11.5, 3))
+        self.assertEqual(self.profile.rating_histogram, {1: 0, 2: 1, 3: 0, 4: 0, 5: 2})
+        self.assertEqual(str(self.profile.overall_rating), '3.83')
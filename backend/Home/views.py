@@ -1,4 +1,4 @@
-from django.contrib.auth.models import User
+from django.contrib.auth import get_user_model
 from django.db import models
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth import logout, authenticate, login
@@ -10,25 +10,38 @@ from django.forms import inlineformset_factory
 
 from .forms import UserProfileForm, CertificationForm, LanguageForm
 from .models import UserProfile, Certification, Language, RatingSeller
-from services.models import Overview, Category, Booking, Package
+from services.models import Overview, Category, Booking, Package, ServiceCard
+from services.fuzzy import fuzzy_search
+from services.search import search_services
+
+User = get_user_model()
+
+SEARCH_RESULT_LIMIT = 200
 
 
 def intro_home(request):
-    services = Overview.objects.filter(is_active=True).select_related('user')
+    # Flat read-model rows: the listing needs no joins
+    services = ServiceCard.objects.filter(is_active=True)
     categories = Category.objects.all()  # ← Use Category model
 
-    # Search
+    # Search — BM25-ranked ids from the in-process full-text index,
+    # falling back to trigram matching for misspelt queries
     q = request.GET.get('q')
     if q:
-        services = services.filter(
-            models.Q(titleOverview__icontains=q) |
-            models.Q(description__icontains=q)
-        )
+        ranked_ids = [overview_id for overview_id, _ in search_services(q, limit=SEARCH_RESULT_LIMIT)]
+        if not ranked_ids:
+            ranked_ids = [pk for _, pk, _ in fuzzy_search(q, kinds=('service',))]
+        if ranked_ids:
+            services = services.filter(pk__in=ranked_ids).order_by(
+                models.Case(*[models.When(pk=pk, then=pos) for pos, pk in enumerate(ranked_ids)])
+            )
+        else:
+            services = services.none()
 
     # Category filter
     cat = request.GET.get('category')
     if cat and cat != 'all':
-        services = services.filter(category__name__iexact=cat)
+        services = services.filter(category_name__iexact=cat)
 
     context = {
         'services': services,
@@ -110,23 +123,19 @@ def edit_profile(request, identifier):
 @login_required
 def view_profile_public(request, username):
     user = get_object_or_404(User, username=username)
-    profile, _ = UserProfile.objects.get_or_create(user=user)
+    # Read-only on GET: an unsaved default profile stands in until the user creates one
+    profile = UserProfile.objects.filter(user=user).first() or UserProfile(user=user)
     services = Overview.objects.filter(user=user)
-    reviews = RatingSeller.objects.filter(seller=profile)
-
-    if reviews.exists():
-        avg = reviews.aggregate(models.Avg('review_rating'))['review_rating__avg']
-        profile.overall_rating = round(avg, 1)
-        profile.save()
+    reviews = RatingSeller.objects.filter(seller=user).select_related('reviewer')
 
     if request.method == 'POST' and request.user.is_authenticated:
         rating = request.POST.get('rg1')
         title = request.POST.get('review_title')
         review = request.POST.get('review_message')
-        reviewer_profile, _ = UserProfile.objects.get_or_create(user=request.user)
 
+        # RatingSeller.save applies the rating delta to the seller's aggregates
         RatingSeller.objects.update_or_create(
-            seller=profile, reviewer=reviewer_profile,
+            seller=user, reviewer=request.user,
             defaults={'review_rating': rating, 'title': title, 'review': review}
         )
         return redirect('view_profile_public', username=username)
@@ -135,7 +144,8 @@ def view_profile_public(request, username):
         'user_profile': profile,
         'user_service_profiles': services,
         'profile_reviews': reviews,
-        'count_review': reviews.count(),
+        'count_review': profile.rating_count,
+        'rating_histogram': profile.rating_histogram,
     }
     return render(request, 'profiles/view_profile_public.html', context)
 
@@ -0,0 +1,30 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('Orders', '0001_initial'),
+        ('payments', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='transaction',
+            field=models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='payments.transaction'),
+        ),
+        migrations.AddField(
+            model_name='deliverydetails',
+            name='order',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, to='Orders.order'),
+        ),
+        migrations.AddField(
+            model_name='order_requirements',
+            name='order',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, to='Orders.order'),
+        ),
+    ]
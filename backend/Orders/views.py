@@ -5,6 +5,7 @@ from .forms import DeliveryDetailsForm
 from datetime import datetime
 from datetime import date
 from django.contrib.auth.models import User
+from django.db import transaction as db_transaction
 from django.utils import timezone
 from django.http import HttpResponseForbidden
 from django.shortcuts import render, get_object_or_404, redirect
@@ -14,6 +15,7 @@ from .forms import OrderRequirementsForm
 from services.models import Overview
 from payments.models import Transaction
 from services.models import Question
+from ledger.entries import record_earning, record_refunds
 
 
 # View function for submitting requirements for an order
@@ -89,12 +91,18 @@ def Details_of_the_order(request, order_id, username):
     # transation = Transaction.objects.filter(id=order.transaction_id)
     # for i in transation:
     #     print(i.id)
+    # Only the buyer may cancel or approve: both move money in the ledger
+    if request.method == "POST" and order.buyer_id != request.user.id:
+        return HttpResponseForbidden("Access Denied")
     # Handling cancellation of pending orders
     if (order.status == "pending"):
         if request.method == "POST":
             cencel = request.POST.get("status_order")
-            order.status = "cancelled"
-            order.save()
+            with db_transaction.atomic():
+                order.status = "cancelled"
+                order.save()
+                if order.transaction_id:
+                    record_refunds([order.transaction])
  # Handling actions upon order delivery
     if (order.status == 'delivered'):
         if request.method == 'POST':
@@ -102,11 +110,13 @@ def Details_of_the_order(request, order_id, username):
             no = request.POST.get('no')
 
             if (ok == 'yes,appove the delivary'):
-                for item in delivary_item:
-                    item. delivery_status = "completed"
-                    item.save()
-                order.status = "completed"
-                order.save()
+                with db_transaction.atomic():
+                    for item in delivary_item:
+                        item. delivery_status = "completed"
+                        item.save()
+                    order.status = "completed"
+                    order.save()
+                    record_earning(order)
             elif (no == 'i am not ready of yet'):
                 for item in delivary_item:
                     item. delivery_status = "return"
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Category, Overview, Package, Description, Question, Gallery, Review, Booking, Payout
+from .models import Category, Overview, Package, Description, Question, Gallery, Review, Booking, Payout, Tag
 
 
 @admin.register(Category)
@@ -8,6 +8,12 @@ class CategoryAdmin(admin.ModelAdmin):
     search_fields = ('name',)
     
 
+@admin.register(Tag)
+class TagAdmin(admin.ModelAdmin):
+    list_display = ('name',)
+    search_fields = ('name',)
+
+
 @admin.register(Overview)
 class OverviewAdmin(admin.ModelAdmin):
     list_display = ('titleOverview', 'user', 'category', 'overall_rating', 'is_active')
@@ -73,6 +79,6 @@ class BookingAdmin(admin.ModelAdmin):
 
 @admin.register(Payout)
 class PayoutAdmin(admin.ModelAdmin):
-    list_display = ('seller', 'amount', 'esewa_id', 'status', 'created_at')
+    list_display = ('seller', 'amount', 'esewa_id', 'status', 'batch_ref', 'created_at')
     list_filter = ('status', 'created_at')
-    search_fields = ('seller__username', 'esewa_id')
\ No newline at end of file
+    search_fields = ('seller__username', 'esewa_id', 'batch_ref')
\ No newline at end of file
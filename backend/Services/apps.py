@@ -4,4 +4,6 @@ from django.apps import AppConfig
 class ServicesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'services'
-  
+
+    def ready(self):
+        from . import cache, signals  # noqa: F401  (registers the cache check and receivers)
@@ -0,0 +1,207 @@
+# backend/Services/autocomplete.py
+"""
+Search-box suggestions from an in-memory sorted array.
+
+Suggestions are category names, normalised ``search_tags`` tokens and the
+titles of booked services, weighted by how often they are booked. Entries
+are ``(text, kind)`` tuples kept sorted, so all completions of a prefix
+form one contiguous slice found with two ``bisect`` calls. The top
+completions of very short prefixes (whose slices are large) are cached
+and invalidated per entry.
+
+Every service's contribution is remembered, so a service change adjusts
+only the weights of the entries it touches. The searchable array holds
+at most ``AUTOCOMPLETE_MAX_ENTRIES``. When it grows past that, the
+lightest tags and titles are forgotten along with their weights
+(categories are always kept); a service re-adds them when it next changes.
+"""
+import heapq
+import threading
+import time
+from bisect import bisect_left, insort
+
+from django.conf import settings
+from django.db.models import Count, Q
+
+from .models import Category, Overview
+from .search import DEFAULT_MAX_AGE
+
+DEFAULT_MAX_ENTRIES = 100_000
+TRIM_SLACK = 0.1                 # overshoot allowed before trimming, as a fraction
+MAX_COMPLETIONS = 20
+CACHED_PREFIX_LENGTH = 2
+POPULAR_TITLE_MIN_BOOKINGS = 1
+
+CATEGORY, TAG, TITLE = 'category', 'tag', 'title'
+
+
+def normalize(text):
+    return ' '.join((text or '').lower().split())
+
+
+def booked_services(overview_filter=Q()):
+    """Active services annotated with their non-cancelled booking count."""
+    return Overview.objects.filter(overview_filter, is_active=True).annotate(
+        bookings=Count('service_bookings_received', filter=~Q(service_bookings_received__status='cancelled'))
+    )
+
+
+class Autocomplete:
+    def __init__(self, max_entries=None):
+        self._lock = threading.RLock()
+        self.max_entries = max_entries or getattr(settings, 'AUTOCOMPLETE_MAX_ENTRIES', DEFAULT_MAX_ENTRIES)
+        self.weights = {}        # (text, kind) -> weight
+        self.display = {}        # (text, kind) -> original spelling
+        self.keys = []           # admitted entries, sorted
+        self._admitted = set()
+        self._services = {}      # overview id -> (weight, entries) it contributed
+        self._top = {}           # short prefix -> cached top completions
+        self._bulk = False       # while loading, entries are sorted once at the end
+        self.loaded_at = None
+
+    def __len__(self):
+        return len(self.keys)
+
+    # ────── Loading ──────
+    def load(self):
+        with self._lock:
+            self._bulk = True
+            for name in Category.objects.values_list('name', flat=True):
+                self._bump((normalize(name), CATEGORY), name, 0)
+            rows = booked_services().values_list('id', 'titleOverview', 'search_tags', 'category__name', 'bookings')
+            for row in rows.iterator(chunk_size=2000):
+                self.set_service(*row)
+            self._bulk = False
+            self._trim()
+            self.loaded_at = time.monotonic()
+        return self
+
+    def refresh(self, overview_ids):
+        """Re-read services from the database and re-apply (or drop) their contributions."""
+        overview_ids = set(overview_ids)
+        rows = booked_services(Q(pk__in=overview_ids)).values_list(
+            'id', 'titleOverview', 'search_tags', 'category__name', 'bookings'
+        )
+        found = {row[0]: row for row in rows}
+        with self._lock:
+            for overview_id in overview_ids:
+                if overview_id in found:
+                    self.set_service(*found[overview_id])
+                else:
+                    self.remove_service(overview_id)
+
+    # ────── Mutation ──────
+    def set_service(self, overview_id, title, tags, category, bookings):
+        entries = {}
+        if category:
+            entries[(normalize(category), CATEGORY)] = category
+        for tag in (tags or '').split(','):
+            if normalize(tag):
+                entries[(normalize(tag), TAG)] = tag.strip()
+        if bookings >= POPULAR_TITLE_MIN_BOOKINGS and normalize(title):
+            entries[(normalize(title), TITLE)] = title.strip()
+
+        weight = 1 + bookings
+        with self._lock:
+            self.remove_service(overview_id)
+            for entry, text in entries.items():
+                self._bump(entry, text, weight)
+            self._services[overview_id] = (weight, tuple(entries))
+            if len(self.weights) > self.max_entries * (1 + TRIM_SLACK):
+                self._trim()
+
+    def remove_service(self, overview_id):
+        with self._lock:
+            weight, entries = self._services.pop(overview_id, (0, ()))
+            for entry in entries:
+                self._bump(entry, None, -weight)
+
+    def _bump(self, entry, text, delta):
+        weight = self.weights.get(entry, 0) + delta
+        if weight <= 0 and entry[1] != CATEGORY:
+            self.weights.pop(entry, None)
+            self.display.pop(entry, None)
+            if entry in self._admitted:
+                self._admitted.discard(entry)
+                del self.keys[bisect_left(self.keys, entry)]
+        else:
+            self.weights[entry] = weight
+            if text is not None:
+                self.display.setdefault(entry, text)
+            if entry not in self._admitted and not self._bulk:
+                self._admitted.add(entry)
+                insort(self.keys, entry)
+        for length in range(CACHED_PREFIX_LENGTH + 1):
+            self._top.pop(entry[0][:length], None)
+
+    def _trim(self):
+        """Keep categories plus the heaviest other entries, up to ``max_entries``."""
+        categories = [e for e in self.weights if e[1] == CATEGORY]
+        others = heapq.nlargest(
+            max(0, self.max_entries - len(categories)),
+            (e for e in self.weights if e[1] != CATEGORY),
+            key=self.weights.__getitem__,
+        )
+        kept = set(categories).union(others)
+        # Dropped entries are forgotten everywhere; a service's next set_service re-adds them
+        for entry in self.weights.keys() - kept:
+            del self.weights[entry]
+            self.display.pop(entry, None)
+        for overview_id, (weight, entries) in self._services.items():
+            if not kept.issuperset(entries):
+                self._services[overview_id] = (weight, tuple(e for e in entries if e in kept))
+        self.keys = sorted(kept)
+        self._admitted = kept
+        self._top.clear()
+
+    # ────── Query ──────
+    def complete(self, prefix, k=10):
+        """Top ``k`` ``(display text, kind, weight)`` completions of ``prefix``."""
+        prefix = normalize(prefix)
+        k = min(k, MAX_COMPLETIONS)
+        with self._lock:
+            top = self._top.get(prefix) if len(prefix) <= CACHED_PREFIX_LENGTH else None
+            if top is None:
+                lo = bisect_left(self.keys, (prefix,))
+                hi = bisect_left(self.keys, (prefix + '\uffff',))
+                top = [
+                    (self.display.get(entry, entry[0]), entry[1], self.weights[entry])
+                    for entry in heapq.nlargest(
+                        MAX_COMPLETIONS, self.keys[lo:hi],
+                        key=lambda e: (self.weights[e], e[1] == CATEGORY),
+                    )
+                ]
+                if len(prefix) <= CACHED_PREFIX_LENGTH:
+                    self._top[prefix] = top
+        return top[:k]
+
+
+# ────── Process-wide instance ──────
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_autocomplete():
+    """The process-wide structure, built on first use and rebuilt when stale."""
+    global _index
+    max_age = getattr(settings, 'SERVICE_SEARCH_MAX_AGE', DEFAULT_MAX_AGE)
+    index = _index
+    if index is not None and time.monotonic() - index.loaded_at < max_age:
+        return index
+
+    with _index_lock:
+        if _index is None or time.monotonic() - _index.loaded_at >= max_age:
+            _index = Autocomplete().load()
+        return _index
+
+
+def services_changed(overview_ids):
+    """Signal hook: re-apply services in an already-built structure."""
+    if _index is not None:
+        _index.refresh(overview_ids)
+
+
+def invalidate():
+    """Drop the structure (category renames/deletes); it is rebuilt on next use."""
+    global _index
+    _index = None
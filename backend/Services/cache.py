@@ -0,0 +1,193 @@
+# backend/Services/cache.py
+"""
+Read-through cache of assembled service documents (overview + provider +
+packages + description), as returned by ``service_detail``.
+
+Entries live in the Django cache named by ``SERVICE_CACHE_ALIAS``. A
+local-memory backend with ``MAX_ENTRIES`` evicts least recently used
+entries. Every service has a version stamp, and its document is stored
+under ``doc:<id>:<version>``. Writers never delete documents: signals bump
+the stamp after commit, so the old entry is simply never read again and
+ages out. Readers fetch the stamp *before* querying, so a document built
+from pre-commit rows lands under the old stamp and cannot shadow the new
+data.
+
+A global generation stamp is bumped along with any service's stamp, for
+responses that cover many services (see ``http_cache.py``).
+
+Stamps start at a nanosecond timestamp rather than 0, so a stamp evicted
+and re-created never collides with an older one.
+
+The stamps only invalidate across workers if the cache is shared (Redis,
+``SERVICE_CACHE_URL``). With the per-process local-memory backend, another
+process keeps serving its old documents until they expire, so
+``check_shared_cache`` warns under ``manage.py check --deploy``.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.core import checks
+from django.core.cache import caches
+from django.db.models import Prefetch
+
+from .models import Description, Overview, Package
+
+DEFAULT_ALIAS = 'default'
+KEY_PREFIX = 'service'
+GENERATION_KEY = f'{KEY_PREFIX}:generation'
+
+
+def service_cache():
+    return caches[getattr(settings, 'SERVICE_CACHE_ALIAS', DEFAULT_ALIAS)]
+
+
+@checks.register(checks.Tags.caches, deploy=True)
+def check_shared_cache(app_configs=None, **kwargs):
+    alias = getattr(settings, 'SERVICE_CACHE_ALIAS', DEFAULT_ALIAS)
+    backend = settings.CACHES.get(alias, {}).get('BACKEND', '')
+    if not backend.endswith('.LocMemCache'):
+        return []
+    return [checks.Warning(
+        f"The {alias!r} cache is local to each process: other workers serve stale service documents "
+        f"until they expire.",
+        hint="Set SERVICE_CACHE_URL to a Redis server shared by all workers.",
+        id='services.W001',
+    )]
+
+
+def _version_key(overview_id):
+    return f'{KEY_PREFIX}:ver:{overview_id}'
+
+
+def _document_key(overview_id, version):
+    return f'{KEY_PREFIX}:doc:{overview_id}:{version}'
+
+
+# ────── Hit/miss counters (per process) ──────
+_stats = {'hits': 0, 'misses': 0}
+_stats_lock = threading.Lock()
+
+
+def _count(outcome, n=1):
+    with _stats_lock:
+        _stats[outcome] += n
+
+
+def cache_stats():
+    with _stats_lock:
+        hits, misses = _stats['hits'], _stats['misses']
+    total = hits + misses
+    return {'hits': hits, 'misses': misses, 'hit_rate': round(hits / total, 4) if total else 0.0}
+
+
+def reset_stats():
+    with _stats_lock:
+        _stats.update(hits=0, misses=0)
+
+
+# ────── Version stamps ──────
+def _stamp(cache, key):
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def _bump(cache, key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        # No stamp yet (or evicted): nothing can be cached under a fresh one
+        cache.add(key, time.time_ns(), timeout=None)
+
+
+def service_version(overview_id):
+    return _stamp(service_cache(), _version_key(overview_id))
+
+
+def services_generation():
+    return _stamp(service_cache(), GENERATION_KEY)
+
+
+# ────── Documents ──────
+MAX_BULK_DOCUMENTS = 100
+
+
+def _document(service):
+    descriptions = service.description_list
+    return {
+        'id': service.id,
+        'titleOverview': service.titleOverview,
+        'provider': service.user.username,
+        'provider_id': service.user.id,
+        'description': descriptions[0].description if descriptions else 'No description available',
+        'overall_rating': round(float(service.overall_rating), 1),
+        'rating_count': service.rating_count,
+        'rating_histogram': service.rating_histogram,
+        'packages': [
+            {
+                'id': p.id,
+                'package_type': p.package_type,
+                'title': p.title,
+                'price': float(p.price),
+                'delivery_time': p.delivery_time,
+            } for p in service.packages.all()
+        ],
+    }
+
+
+def build_documents(overview_ids):
+    """
+    ``{id: document}`` straight from the database for the services among
+    ``overview_ids`` that exist: three queries however many ids.
+    """
+    services = Overview.objects.filter(pk__in=overview_ids).select_related('user').prefetch_related(
+        Prefetch('packages', queryset=Package.objects.order_by('id')),
+        Prefetch(
+            'descriptions', to_attr='description_list',
+            queryset=Description.objects.order_by('id').only('id', 'overview_id', 'description'),
+        ),
+    )
+    return {service.id: _document(service) for service in services}
+
+
+def build_document(overview_id):
+    """The service document straight from the database, or None if the service is gone."""
+    return build_documents([overview_id]).get(overview_id)
+
+
+def get_service_documents(overview_ids):
+    """``{id: document}`` for existing services, from cache where current, the rest built in one batch."""
+    cache = service_cache()
+    overview_ids = list(dict.fromkeys(overview_ids))
+    version_keys = {overview_id: _version_key(overview_id) for overview_id in overview_ids}
+    versions = cache.get_many(version_keys.values())
+    for key in set(version_keys.values()) - set(versions):
+        versions[key] = _stamp(cache, key)
+    keys = {overview_id: _document_key(overview_id, versions[version_keys[overview_id]]) for overview_id in overview_ids}
+
+    cached = cache.get_many(keys.values())
+    documents = {overview_id: cached[key] for overview_id, key in keys.items() if key in cached}
+    missing = [overview_id for overview_id in overview_ids if overview_id not in documents]
+    _count('hits', len(documents))
+    _count('misses', len(missing))
+    if missing:
+        built = build_documents(missing)
+        cache.set_many({keys[overview_id]: document for overview_id, document in built.items()})
+        documents.update(built)
+    return documents
+
+
+def get_service_document(overview_id):
+    """The cached document for ``overview_id``, building and storing it on a miss."""
+    return get_service_documents([overview_id]).get(overview_id)
+
+
+def services_changed(overview_ids):
+    """Signal hook: bump the version stamps, orphaning the cached documents."""
+    cache = service_cache()
+    for overview_id in overview_ids:
+        _bump(cache, _version_key(overview_id))
+    _bump(cache, GENERATION_KEY)
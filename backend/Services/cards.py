@@ -0,0 +1,89 @@
+# backend/Services/cards.py
+"""
+Upkeep of the ``ServiceCard`` read model.
+
+A card is rebuilt wholesale from its service's rows (overview, provider,
+category, packages, first gallery image). ``signals.py`` calls in here
+inside the writing transaction, so lists never show a card that disagrees
+with committed data; review aggregates are mirrored by
+``Overview.apply_review_delta`` itself.
+
+Child-row changes (packages, gallery images) only rewrite existing cards.
+They can fire while their service is being cascade-deleted, and inserting
+a card there would resurrect it.
+"""
+from collections import defaultdict
+
+from .models import Gallery, Overview, Package, ServiceCard
+from .serializers import PackageSerializer
+
+BATCH_SIZE = 500
+CARD_FIELDS = [f.name for f in ServiceCard._meta.concrete_fields if not f.primary_key]
+
+
+def build_cards(overview_ids):
+    """Unsaved cards for the existing services among ``overview_ids``."""
+    packages = defaultdict(list)
+    for pkg in Package.objects.filter(overview_id__in=overview_ids).order_by('id').values(
+        'overview_id', *PackageSerializer.Meta.fields
+    ):
+        packages[pkg.pop('overview_id')].append(pkg)
+
+    thumbnails = {}
+    storage = Gallery._meta.get_field('image1').storage
+    for overview_id, name in Gallery.objects.filter(overview_id__in=overview_ids).exclude(
+        image1=''
+    ).exclude(image1__isnull=True).order_by('-id').values_list('overview_id', 'image1'):
+        thumbnails[overview_id] = storage.url(name)     # descending, so the first gallery wins
+
+    rows = Overview.objects.filter(pk__in=overview_ids).values_list(
+        'id', 'titleOverview', 'user_id', 'user__username', 'category_id', 'category__name',
+        'overall_rating', 'rating_count', 'location_lat', 'location_lng', 'geohash', 'is_active',
+    )
+    cards = []
+    for (overview_id, title, user_id, username, category_id, category_name,
+         rating, rating_count, lat, lng, geohash, is_active) in rows:
+        service_packages = packages.get(overview_id, [])
+        cards.append(ServiceCard(
+            overview_id=overview_id, title=title,
+            provider_id=user_id, provider_name=username,
+            category_id=category_id, category_name=category_name,
+            min_price=min((p['price'] for p in service_packages), default=None),
+            min_delivery=min((p['delivery_time'] for p in service_packages), default=None),
+            overall_rating=rating, rating_count=rating_count,
+            thumbnail=thumbnails.get(overview_id, ''),
+            location_lat=lat, location_lng=lng, geohash=geohash, is_active=is_active,
+            packages=service_packages,
+        ))
+    return cards
+
+
+def refresh_cards(overview_ids, create=True):
+    """
+    Rebuild the cards of ``overview_ids``. With ``create=False`` missing
+    cards stay missing (used for child-row changes).
+    """
+    overview_ids = sorted(set(overview_ids))
+    for start in range(0, len(overview_ids), BATCH_SIZE):
+        cards = build_cards(overview_ids[start:start + BATCH_SIZE])
+        if create:
+            ServiceCard.objects.bulk_create(
+                cards, update_conflicts=True, unique_fields=['overview'], update_fields=CARD_FIELDS,
+            )
+        elif cards:
+            ServiceCard.objects.bulk_update(cards, CARD_FIELDS)
+
+
+def rebuild_cards():
+    """Rebuild every card; returns how many services were processed."""
+    overview_ids = list(Overview.objects.values_list('id', flat=True))
+    refresh_cards(overview_ids)
+    return len(overview_ids)
+
+
+def provider_renamed(user_id, username):
+    ServiceCard.objects.filter(provider_id=user_id).exclude(provider_name=username).update(provider_name=username)
+
+
+def category_renamed(category_id, name):
+    ServiceCard.objects.filter(category_id=category_id).exclude(category_name=name).update(category_name=name)
@@ -0,0 +1,201 @@
+# backend/Services/clusters.py
+"""
+Hierarchical grid aggregation of services for zoomed-out map views.
+
+Services are bucketed into geohash-aligned grid cells at every precision
+from 1 to ``MAX_CLUSTER_PRECISION``. Each cell keeps a count, coordinate
+sums (for the centroid) and per-category counts. A cell at precision ``p``
+is its precision-6 cell with the low bits of the row/column indices dropped,
+so one service maps to all its ancestor cells with bit shifts alone.
+
+The aggregates are built from the service snapshot and patched through its
+change notifications, so creating, moving or deactivating a service costs
+O(levels) work instead of a re-aggregation.
+"""
+import threading
+from collections import Counter
+
+from .snapshot import get_snapshot, np
+
+MAX_CLUSTER_PRECISION = 6      # ~1.2km x 0.6km cells
+MAX_CLUSTER_CELLS = 256        # upper bound on clusters per response
+TOP_CATEGORIES = 3
+
+# Map zoom -> finest precision worth showing at that zoom
+ZOOM_PRECISION = [(3, 1), (6, 2), (8, 3), (11, 4), (13, 5)]
+
+
+def level_bits(precision):
+    """``(lat_bits, lng_bits)`` of a geohash cell at ``precision``."""
+    return (5 * precision) // 2, (5 * precision + 1) // 2
+
+
+def precision_for_zoom(zoom):
+    for max_zoom, precision in ZOOM_PRECISION:
+        if zoom < max_zoom:
+            return precision
+    return MAX_CLUSTER_PRECISION
+
+
+def _grid_index(value, origin, span, bits):
+    cells = 1 << bits
+    index = int((value - origin) / span * cells)
+    return min(max(index, 0), cells - 1)
+
+
+def cell_ranges(min_lat, min_lng, max_lat, max_lng, precision):
+    """Row and column index ranges of the cells overlapping a bounding box."""
+    lat_bits, lng_bits = level_bits(precision)
+    rows = range(_grid_index(min_lat, -90.0, 180.0, lat_bits), _grid_index(max_lat, -90.0, 180.0, lat_bits) + 1)
+    cols = range(_grid_index(min_lng, -180.0, 360.0, lng_bits), _grid_index(max_lng, -180.0, 360.0, lng_bits) + 1)
+    return rows, cols
+
+
+class ClusterIndex:
+    """Per-level ``{(row, col): [count, sum_lat, sum_lng, Counter(category_id)]}``."""
+
+    def __init__(self, snapshot):
+        self.snapshot = snapshot
+        self.levels = {p: {} for p in range(1, MAX_CLUSTER_PRECISION + 1)}
+        self._contribution = {}    # overview id -> (lat, lng, category_id) it was counted with
+        self._lock = threading.Lock()
+        with snapshot._lock:
+            self._load(
+                snapshot.column('id'), snapshot.column('lat'),
+                snapshot.column('lng'), snapshot.column('category_id'),
+            )
+            snapshot.subscribe(self._changed)
+
+    def _load(self, ids, lats, lngs, categories):
+        """Bulk-aggregate every level with NumPy group-bys."""
+        self._contribution = dict(zip(ids.tolist(), zip(lats.tolist(), lngs.tolist(), categories.tolist())))
+        if not len(ids):
+            return
+
+        lat_bits, lng_bits = level_bits(MAX_CLUSTER_PRECISION)
+        rows = np.clip(((lats + 90.0) / 180.0 * (1 << lat_bits)).astype(np.int64), 0, (1 << lat_bits) - 1)
+        cols = np.clip(((lngs + 180.0) / 360.0 * (1 << lng_bits)).astype(np.int64), 0, (1 << lng_bits) - 1)
+        n_categories = int(categories.max()) + 1
+
+        for precision in self.levels:
+            p_lat_bits, p_lng_bits = level_bits(precision)
+            keys = ((rows >> (lat_bits - p_lat_bits)) << p_lng_bits) | (cols >> (lng_bits - p_lng_bits))
+            cells, inverse = np.unique(keys, return_inverse=True)
+            counts = np.bincount(inverse)
+            sum_lat = np.bincount(inverse, weights=lats)
+            sum_lng = np.bincount(inverse, weights=lngs)
+
+            pairs, pair_counts = np.unique(inverse * n_categories + categories, return_counts=True)
+            per_cell = [Counter() for _ in range(len(cells))]
+            for pair, pair_count in zip(pairs.tolist(), pair_counts.tolist()):
+                per_cell[pair // n_categories][pair % n_categories] = pair_count
+
+            mask = (1 << p_lng_bits) - 1
+            level = self.levels[precision]
+            for i, key in enumerate(cells.tolist()):
+                level[(key >> p_lng_bits, key & mask)] = [
+                    int(counts[i]), float(sum_lat[i]), float(sum_lng[i]), per_cell[i],
+                ]
+
+    @staticmethod
+    def _cells(lat, lng):
+        lat_bits, lng_bits = level_bits(MAX_CLUSTER_PRECISION)
+        row = _grid_index(lat, -90.0, 180.0, lat_bits)
+        col = _grid_index(lng, -180.0, 360.0, lng_bits)
+        for precision in range(1, MAX_CLUSTER_PRECISION + 1):
+            p_lat_bits, p_lng_bits = level_bits(precision)
+            yield precision, (row >> (lat_bits - p_lat_bits), col >> (lng_bits - p_lng_bits))
+
+    def _add(self, overview_id, lat, lng, category_id):
+        self._contribution[overview_id] = (lat, lng, category_id)
+        for precision, cell in self._cells(lat, lng):
+            bucket = self.levels[precision].get(cell)
+            if bucket is None:
+                bucket = self.levels[precision][cell] = [0, 0.0, 0.0, Counter()]
+            bucket[0] += 1
+            bucket[1] += lat
+            bucket[2] += lng
+            bucket[3][category_id] += 1
+
+    def _discard(self, overview_id):
+        previous = self._contribution.pop(overview_id, None)
+        if previous is None:
+            return
+        lat, lng, category_id = previous
+        for precision, cell in self._cells(lat, lng):
+            bucket = self.levels[precision][cell]
+            bucket[0] -= 1
+            if bucket[0] == 0:
+                del self.levels[precision][cell]
+                continue
+            bucket[1] -= lat
+            bucket[2] -= lng
+            bucket[3][category_id] -= 1
+            if not bucket[3][category_id]:
+                del bucket[3][category_id]
+
+    def _changed(self, overview_id):
+        # Called by the snapshot while it holds its own lock
+        snapshot = self.snapshot
+        with self._lock:
+            self._discard(overview_id)
+            position = snapshot.position(overview_id)
+            if position is not None:
+                self._add(
+                    overview_id,
+                    float(snapshot.column('lat')[position]),
+                    float(snapshot.column('lng')[position]),
+                    int(snapshot.column('category_id')[position]),
+                )
+
+    def clusters(self, min_lat, min_lng, max_lat, max_lng, zoom):
+        """
+        ``(precision, clusters)`` for a viewport. The precision is lowered
+        until the viewport spans at most ``MAX_CLUSTER_CELLS`` cells.
+        """
+        precision = precision_for_zoom(zoom)
+        while True:
+            rows, cols = cell_ranges(min_lat, min_lng, max_lat, max_lng, precision)
+            if len(rows) * len(cols) <= MAX_CLUSTER_CELLS or precision == 1:
+                break
+            precision -= 1
+
+        results = []
+        with self._lock:
+            level = self.levels[precision]
+            for row in rows:
+                for col in cols:
+                    bucket = level.get((row, col))
+                    if bucket is None:
+                        continue
+                    count, sum_lat, sum_lng, categories = bucket
+                    results.append({
+                        'lat': sum_lat / count,
+                        'lng': sum_lng / count,
+                        'count': count,
+                        'top_categories': categories.most_common(TOP_CATEGORIES),
+                    })
+        return precision, results
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_cluster_index():
+    """Cluster index over the current snapshot, or None when NumPy is not installed."""
+    global _index
+    snapshot = get_snapshot()
+    if snapshot is None:
+        return None
+
+    index = _index
+    if index is not None and index.snapshot is snapshot:
+        return index
+
+    with _index_lock:
+        if _index is None or _index.snapshot is not snapshot:
+            if _index is not None:
+                _index.snapshot.unsubscribe(_index._changed)
+            _index = ClusterIndex(snapshot)
+        return _index
@@ -0,0 +1,53 @@
+# backend/Services/dbfunctions.py
+"""
+Database functions for list APIs that project rows with ``.values()``.
+
+``FormatDate`` renders a date or datetime column as display text in the
+query itself, so a 10k-row response doesn't pay for 10k ``strftime`` calls
+on Python ``date`` objects. Datetimes are formatted in UTC, like Python
+``strftime`` on the aware values Django loads.
+"""
+from django.db.models import CharField, Func
+
+# SQLite's strftime has no %b
+_MONTH_ABBRS = 'JanFebMarAprMayJunJulAugSepOctNovDec'
+
+
+class FormatDate(Func):
+    """``FormatDate('created_at', 'short')`` → ``'Jan 05, 2025'``; NULL stays NULL."""
+    arity = 1
+    output_field = CharField()
+
+    # style -> (strftime format, PostgreSQL to_char pattern)
+    STYLES = {
+        'iso': ('%Y-%m-%d', 'YYYY-MM-DD'),
+        'short': ('%b %d, %Y', 'Mon DD, YYYY'),
+    }
+
+    def __init__(self, expression, style='iso', **extra):
+        self.strftime_format, self.to_char_pattern = self.STYLES[style]
+        super().__init__(expression, **extra)
+
+    def as_sql(self, compiler, connection, **extra_context):
+        # MySQL / MariaDB
+        sql, params = compiler.compile(self.source_expressions[0])
+        return f'DATE_FORMAT({sql}, %s)', [*params, self.strftime_format]
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        sql, params = compiler.compile(self.source_expressions[0])
+        return f'to_char({sql}, %s)', [*params, self.to_char_pattern]
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        sql, params = compiler.compile(self.source_expressions[0])
+        head, month, tail = self.strftime_format.partition('%b')
+        parts, part_params = [], []
+        if head:
+            parts.append(f'strftime(%s, {sql})')
+            part_params += [head, *params]
+        if month:
+            parts.append(f"substr('{_MONTH_ABBRS}', strftime(%s, {sql}) * 3 - 2, 3)")
+            part_params += ['%m', *params]
+        if tail:
+            parts.append(f'strftime(%s, {sql})')
+            part_params += [tail, *params]
+        return '(' + ' || '.join(parts) + ')', part_params
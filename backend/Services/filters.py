@@ -0,0 +1,178 @@
+# backend/Services/filters.py
+"""
+Multi-criteria service filtering over the service snapshot's columns.
+
+Each predicate (price, delivery time, rating, category, distance) becomes a
+boolean mask over the snapshot rows, i.e. a bitmap, and combined filters are
+the intersection of those bitmaps. Facet counts use the usual "all other
+filters" rule: the counts for one filter's options are taken over the
+intersection of every *other* active filter, so picking an option never
+hides its alternatives.
+
+Price semantics: ``max_price`` keeps services whose cheapest package costs
+at most that much ("under NPR 2000"), ``min_price`` keeps services with a
+package costing at least that much.
+
+Without NumPy, ``filter_services_orm`` answers the same query from one
+narrow ``values()`` scan.
+"""
+from django.db.models import Max, Min
+
+from .geo import bounding_box, radius_filter
+from .models import Overview
+from .snapshot import np
+from .utils import haversine_distance
+
+# Options offered for each filter, and counted in the facets
+PRICE_OPTIONS = (500, 1000, 2000, 5000, 10000)     # cheapest package <= NPR x
+DELIVERY_OPTIONS = (1, 3, 7, 14)                   # delivered in <= n days
+RATING_OPTIONS = (4, 3, 2, 1)                      # rated >= n
+
+SORTS = ('rating', 'price', 'delivery', 'distance')
+
+
+def _sort_keys(sort, columns, distances):
+    """``np.lexsort`` keys for ``sort``: last key is primary, id breaks ties."""
+    if sort == 'price':
+        return columns['id'], np.nan_to_num(columns['min_price'], nan=np.inf)
+    if sort == 'delivery':
+        return columns['id'], np.nan_to_num(columns['min_delivery'], nan=np.inf)
+    if sort == 'distance' and distances is not None:
+        return columns['id'], distances
+    return columns['id'], -columns['rating']
+
+
+def filter_services(snapshot, category_id=None, min_price=None, max_price=None, max_delivery=None,
+                    min_rating=None, lat=None, lng=None, radius=None, sort='rating', offset=0, limit=20):
+    """
+    ``(count, ids, distances, facets)`` for one page of matching services.
+
+    ``distances`` is None unless lat/lng were given. ``facets`` maps each
+    filter to ``{option: count}`` (``category`` to ``{category id: count}``).
+    """
+    with snapshot._lock:
+        columns = {name: snapshot.column(name) for name in snapshot.COLUMNS}
+        size = len(snapshot)
+        # NaN compares False, so services without packages drop out of price/delivery filters
+        with np.errstate(invalid='ignore'):
+            masks = {}
+            if category_id is not None:
+                masks['category'] = columns['category_id'] == category_id
+            if min_price is not None:
+                masks['min_price'] = columns['max_price'] >= min_price
+            if max_price is not None:
+                masks['max_price'] = columns['min_price'] <= max_price
+            if max_delivery is not None:
+                masks['max_delivery'] = columns['min_delivery'] <= max_delivery
+            if min_rating is not None:
+                masks['min_rating'] = columns['rating'] >= min_rating
+
+            distances = None
+            if lat is not None and lng is not None:
+                distances = np.full(size, np.inf)
+                if radius is not None:
+                    # Haversine only for rows inside the bounding box
+                    min_lat, min_lng, max_lat, max_lng = bounding_box(lat, lng, radius)
+                    lats, lngs = columns['lat'], columns['lng']
+                    rows = np.flatnonzero((lats >= min_lat) & (lats <= max_lat) & (lngs >= min_lng) & (lngs <= max_lng))
+                    distances[rows] = snapshot.distances(lat, lng, rows)
+                    masks['radius'] = distances <= radius
+                else:
+                    distances = snapshot.distances(lat, lng)
+
+            def others(excluded):
+                combined = np.ones(size, dtype=bool)
+                for name, mask in masks.items():
+                    if name != excluded:
+                        combined &= mask
+                return combined
+
+            facets = {}
+            base = others('category')
+            by_category = np.bincount(columns['category_id'][base]) if base.any() else np.array([])
+            facets['category'] = {i: int(n) for i, n in enumerate(by_category.tolist()) if n}
+            base = others('max_price')
+            facets['max_price'] = {p: int((base & (columns['min_price'] <= p)).sum()) for p in PRICE_OPTIONS}
+            base = others('max_delivery')
+            facets['max_delivery'] = {d: int((base & (columns['min_delivery'] <= d)).sum()) for d in DELIVERY_OPTIONS}
+            base = others('min_rating')
+            facets['min_rating'] = {r: int((base & (columns['rating'] >= r)).sum()) for r in RATING_OPTIONS}
+
+            rows = np.flatnonzero(others(None))
+            count = len(rows)
+            keys = _sort_keys(sort, columns, distances)
+            needed = offset + limit
+            if needed < count:
+                # Only rows up to the page's last sort value need a full sort
+                primary = keys[-1][rows]
+                rows = rows[primary <= np.partition(primary, needed - 1)[needed - 1]]
+            rows = rows[np.lexsort([key[rows] for key in keys])]
+            page = rows[offset:offset + limit]
+            ids = columns['id'][page].tolist()
+            page_distances = distances[page].tolist() if distances is not None else None
+        return count, ids, page_distances, facets
+
+
+def filter_services_orm(category_id=None, min_price=None, max_price=None, max_delivery=None,
+                        min_rating=None, lat=None, lng=None, radius=None, sort='rating', offset=0, limit=20):
+    """Same contract as ``filter_services``: one narrow values() scan, filtered in Python."""
+    services = Overview.objects.filter(is_active=True)
+    if lat is not None and lng is not None and radius is not None:
+        services = services.filter(radius_filter(lat, lng, radius))
+    rows = services.annotate(
+        min_price=Min('packages__price'),
+        max_price=Max('packages__price'),
+        min_delivery=Min('packages__delivery_time'),
+    ).values_list(
+        'id', 'category_id', 'overall_rating', 'min_price', 'max_price', 'min_delivery',
+        'location_lat', 'location_lng',
+    )
+
+    checks = {}
+    if category_id is not None:
+        checks['category'] = lambda r: r['category_id'] == category_id
+    if min_price is not None:
+        checks['min_price'] = lambda r: r['max_price'] is not None and r['max_price'] >= min_price
+    if max_price is not None:
+        checks['max_price'] = lambda r: r['min_price'] is not None and r['min_price'] <= max_price
+    if max_delivery is not None:
+        checks['max_delivery'] = lambda r: r['min_delivery'] is not None and r['min_delivery'] <= max_delivery
+    if min_rating is not None:
+        checks['min_rating'] = lambda r: r['rating'] >= min_rating
+    if radius is not None and lat is not None and lng is not None:
+        checks['radius'] = lambda r: r['distance'] <= radius
+
+    records = []
+    for overview_id, category, rating, low, high, delivery, s_lat, s_lng in rows:
+        records.append({
+            'id': overview_id, 'category_id': category, 'rating': float(rating or 0),
+            'min_price': low, 'max_price': high, 'min_delivery': delivery,
+            'distance': haversine_distance(lat, lng, s_lat, s_lng) if lat is not None and lng is not None else None,
+        })
+
+    def others(excluded):
+        return [r for r in records if all(check(r) for name, check in checks.items() if name != excluded)]
+
+    facets = {'category': {}}
+    for r in others('category'):
+        facets['category'][r['category_id']] = facets['category'].get(r['category_id'], 0) + 1
+    base = others('max_price')
+    facets['max_price'] = {p: sum(1 for r in base if r['min_price'] is not None and r['min_price'] <= p) for p in PRICE_OPTIONS}
+    base = others('max_delivery')
+    facets['max_delivery'] = {d: sum(1 for r in base if r['min_delivery'] is not None and r['min_delivery'] <= d) for d in DELIVERY_OPTIONS}
+    base = others('min_rating')
+    facets['min_rating'] = {o: sum(1 for r in base if r['rating'] >= o) for o in RATING_OPTIONS}
+
+    matching = others(None)
+    if sort == 'price':
+        matching.sort(key=lambda r: (r['min_price'] is None, r['min_price'] or 0, r['id']))
+    elif sort == 'delivery':
+        matching.sort(key=lambda r: (r['min_delivery'] is None, r['min_delivery'] or 0, r['id']))
+    elif sort == 'distance' and lat is not None and lng is not None:
+        matching.sort(key=lambda r: (r['distance'], r['id']))
+    else:
+        matching.sort(key=lambda r: (-r['rating'], r['id']))
+
+    page = matching[offset:offset + limit]
+    distances = [r['distance'] for r in page] if lat is not None and lng is not None else None
+    return len(matching), [r['id'] for r in page], distances, facets
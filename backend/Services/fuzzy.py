@@ -0,0 +1,199 @@
+# backend/Services/fuzzy.py
+"""
+Trigram similarity index for typo-tolerant search ("plumer" -> "plumber").
+
+Documents are services (title + tags), skills and usernames. Their words
+form a vocabulary, and every vocabulary word is indexed by its padded
+trigrams. A query word is matched against the vocabulary by merging the
+posting lists of its trigrams, scored with trigram Jaccard similarity (as
+in pg_trgm). Prefix filtering keeps that merge sub-linear: a word reaching
+the threshold must share at least ``m`` trigrams with the query, so it
+must appear in one of the ``len(grams) - m + 1`` rarest posting lists, and
+only those lists are scanned for candidates.
+
+Documents then score the sum of their best word similarity per query word.
+"""
+import heapq
+import math
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+
+from Home.models import Skill
+from .models import Overview
+from .search import DEFAULT_MAX_AGE, tokenize
+
+DEFAULT_THRESHOLD = 0.3
+DEFAULT_MAX_RESULTS = 50
+MAX_WORD_MATCHES = 20      # vocabulary words kept per query word
+
+KINDS = ('service', 'skill', 'user')
+
+
+def trigrams(word):
+    """Padded trigrams of a word: ``'tap'`` -> ``{'  t', ' ta', 'tap', 'ap '}``."""
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TrigramIndex:
+    """
+    ``grams``: trigram -> set of words, ``words``: word -> set of document
+    keys. Document keys are ``(kind, id)`` pairs.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.grams = defaultdict(set)
+        self.words = {}
+        self.word_size = {}     # word -> number of distinct trigrams
+        self.doc_words = {}
+        self.loaded_at = None
+
+    def __len__(self):
+        return len(self.doc_words)
+
+    # ────── Loading ──────
+    @staticmethod
+    def _documents(kind, ids=None):
+        if kind == 'service':
+            rows = Overview.objects.filter(is_active=True)
+            fields = ('id', 'titleOverview', 'search_tags')
+        elif kind == 'skill':
+            rows = Skill.objects.all()
+            fields = ('id', 'name')
+        else:
+            rows = get_user_model().objects.filter(is_active=True)
+            fields = ('id', 'username')
+        if ids is not None:
+            rows = rows.filter(pk__in=ids)
+        for pk, *texts in rows.values_list(*fields).iterator(chunk_size=2000):
+            yield pk, ' '.join((t or '').replace(',', ' ') for t in texts)
+
+    def load(self):
+        with self._lock:
+            for kind in KINDS:
+                for pk, text in self._documents(kind):
+                    self.add(kind, pk, text)
+            self.loaded_at = time.monotonic()
+        return self
+
+    def refresh(self, kind, ids):
+        """Re-read documents of one kind from the database and re-index (or drop) them."""
+        ids = set(ids)
+        found = dict(self._documents(kind, ids))
+        with self._lock:
+            for pk in ids:
+                if pk in found:
+                    self.add(kind, pk, found[pk])
+                else:
+                    self.remove(kind, pk)
+
+    # ────── Mutation ──────
+    def add(self, kind, pk, text):
+        key = (kind, pk)
+        words = frozenset(tokenize(text))
+        with self._lock:
+            self.remove(kind, pk)
+            self.doc_words[key] = words
+            for word in words:
+                docs = self.words.get(word)
+                if docs is None:
+                    docs = self.words[word] = set()
+                    grams = trigrams(word)
+                    self.word_size[word] = len(grams)
+                    for gram in grams:
+                        self.grams[gram].add(word)
+                docs.add(key)
+
+    def remove(self, kind, pk):
+        with self._lock:
+            for word in self.doc_words.pop((kind, pk), ()):
+                docs = self.words[word]
+                docs.discard((kind, pk))
+                if docs:
+                    continue
+                # Last document using the word: drop it from the vocabulary
+                del self.words[word]
+                del self.word_size[word]
+                for gram in trigrams(word):
+                    holders = self.grams[gram]
+                    holders.discard(word)
+                    if not holders:
+                        del self.grams[gram]
+
+    # ────── Query ──────
+    def similar_words(self, word, threshold):
+        """``[(vocabulary word, similarity), ...]`` best first, similarity >= threshold."""
+        query = trigrams(word)
+        lists = sorted((self.grams.get(g, ()) for g in query), key=len)
+        needed = max(1, math.ceil(threshold * len(query)))
+
+        # Any word with >= ``needed`` shared trigrams is in one of these lists
+        candidates = set()
+        for postings in lists[:len(query) - needed + 1]:
+            candidates.update(postings)
+
+        matches = []
+        for candidate in candidates:
+            shared = sum(1 for postings in lists if candidate in postings)
+            if shared < needed:
+                continue
+            similarity = shared / (len(query) + self.word_size[candidate] - shared)
+            if similarity >= threshold:
+                matches.append((candidate, similarity))
+        matches.sort(key=lambda item: (-item[1], item[0]))
+        return matches[:MAX_WORD_MATCHES]
+
+    def search(self, query, kinds=KINDS, threshold=None, limit=None):
+        """``[(kind, id, score), ...]`` best first."""
+        if threshold is None:
+            threshold = getattr(settings, 'FUZZY_SEARCH_THRESHOLD', DEFAULT_THRESHOLD)
+        if limit is None:
+            limit = getattr(settings, 'FUZZY_SEARCH_MAX_RESULTS', DEFAULT_MAX_RESULTS)
+
+        scores = defaultdict(float)
+        with self._lock:
+            for term in set(tokenize(query)):
+                best = {}
+                for word, similarity in self.similar_words(term, threshold):
+                    for key in self.words[word]:
+                        if key[0] in kinds and similarity > best.get(key, 0.0):
+                            best[key] = similarity
+                for key, similarity in best.items():
+                    scores[key] += similarity
+
+        ranked = heapq.nsmallest(limit, scores.items(), key=lambda item: (-item[1], item[0]))
+        return [(kind, pk, score) for (kind, pk), score in ranked]
+
+
+# ────── Process-wide instance ──────
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_fuzzy_index():
+    """The process-wide index, built on first use and rebuilt when stale."""
+    global _index
+    max_age = getattr(settings, 'SERVICE_SEARCH_MAX_AGE', DEFAULT_MAX_AGE)
+    index = _index
+    if index is not None and time.monotonic() - index.loaded_at < max_age:
+        return index
+
+    with _index_lock:
+        if _index is None or time.monotonic() - _index.loaded_at >= max_age:
+            _index = TrigramIndex().load()
+        return _index
+
+
+def fuzzy_search(query, kinds=KINDS, threshold=None, limit=None):
+    return get_fuzzy_index().search(query, kinds=kinds, threshold=threshold, limit=limit)
+
+
+def documents_changed(kind, ids):
+    """Signal hook: re-index documents in an already-built index."""
+    if _index is not None:
+        _index.refresh(kind, ids)
@@ -0,0 +1,125 @@
+# backend/Services/geo.py
+"""
+Geohash helpers for the service location index.
+
+Every Overview stores the geohash of its coordinates, so a radius search can
+be narrowed to a handful of geohash prefixes (B-tree range scans) plus a
+lat/lng bounding box before the exact haversine check runs.
+"""
+from math import asin, cos, degrees, radians, sin
+
+from django.db.models import Q
+
+EARTH_RADIUS_KM = 6371.0
+GEOHASH_PRECISION = 9          # ~4.8m x 4.8m cells
+MAX_COVERING_CELLS = 16
+
+_BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+# Sorts after every geohash character, used as the exclusive upper bound
+# of a prefix range: prefix <= geohash < prefix + '~'
+_PREFIX_END = '~'
+
+
+def encode(lat, lng, precision=GEOHASH_PRECISION):
+    """Encode a coordinate as a geohash string of ``precision`` characters."""
+    lat_lo, lat_hi = -90.0, 90.0
+    lng_lo, lng_hi = -180.0, 180.0
+    chars = []
+    bits = bit_count = 0
+    even = True  # geohash interleaves bits starting with longitude
+
+    while len(chars) < precision:
+        if even:
+            mid = (lng_lo + lng_hi) / 2
+            if lng >= mid:
+                bits, lng_lo = (bits << 1) | 1, mid
+            else:
+                bits, lng_hi = bits << 1, mid
+        else:
+            mid = (lat_lo + lat_hi) / 2
+            if lat >= mid:
+                bits, lat_lo = (bits << 1) | 1, mid
+            else:
+                bits, lat_hi = bits << 1, mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(_BASE32[bits])
+            bits = bit_count = 0
+
+    return ''.join(chars)
+
+
+def cell_size(precision):
+    """Return ``(height, width)`` in degrees of a cell at ``precision``."""
+    lng_bits = (5 * precision + 1) // 2
+    lat_bits = (5 * precision) // 2
+    return 180.0 / (1 << lat_bits), 360.0 / (1 << lng_bits)
+
+
+def bounding_box(lat, lng, radius_km):
+    """
+    Smallest lat/lng box containing the circle of ``radius_km`` around a
+    point, as ``(min_lat, min_lng, max_lat, max_lng)``.
+    """
+    angular = radius_km / EARTH_RADIUS_KM
+    dlat = degrees(angular)
+    min_lat, max_lat = lat - dlat, lat + dlat
+
+    if min_lat <= -90 or max_lat >= 90 or angular >= cos(radians(lat)):
+        # Circle touches a pole: every longitude is in range
+        return max(min_lat, -90.0), -180.0, min(max_lat, 90.0), 180.0
+
+    dlng = degrees(asin(sin(angular) / cos(radians(lat))))
+    return min_lat, max(lng - dlng, -180.0), max_lat, min(lng + dlng, 180.0)
+
+
+def covering_cells(min_lat, min_lng, max_lat, max_lng, max_cells=MAX_COVERING_CELLS):
+    """
+    Geohash cells covering a bounding box, using the finest precision that
+    needs at most ``max_cells`` cells.
+    """
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        height, width = cell_size(precision)
+        row_lo, row_hi = _cell_span(min_lat, max_lat, -90.0, height, precision, lat=True)
+        col_lo, col_hi = _cell_span(min_lng, max_lng, -180.0, width, precision, lat=False)
+        if (row_hi - row_lo + 1) * (col_hi - col_lo + 1) <= max_cells:
+            break
+
+    cells = set()
+    for row in range(row_lo, row_hi + 1):
+        center_lat = -90.0 + (row + 0.5) * height
+        for col in range(col_lo, col_hi + 1):
+            center_lng = -180.0 + (col + 0.5) * width
+            cells.add(encode(center_lat, center_lng, precision))
+    return sorted(cells)
+
+
+def _cell_span(lo, hi, origin, size, precision, lat):
+    bits = (5 * precision) // 2 if lat else (5 * precision + 1) // 2
+    last = (1 << bits) - 1
+    first_idx = min(int((lo - origin) // size), last)
+    last_idx = min(int((hi - origin) // size), last)
+    return max(first_idx, 0), max(last_idx, 0)
+
+
+def prefix_range(prefix, field='geohash'):
+    """``Q`` matching every geohash that starts with ``prefix`` via an index range."""
+    return Q(**{f'{field}__gte': prefix, f'{field}__lt': prefix + _PREFIX_END})
+
+
+def radius_filter(lat, lng, radius_km):
+    """
+    Index-friendly prefilter for services within ``radius_km`` of a point.
+
+    Matches a superset of the circle; callers still run the exact haversine
+    check on the (small) candidate set.
+    """
+    min_lat, min_lng, max_lat, max_lng = bounding_box(lat, lng, radius_km)
+    cells = Q()
+    for cell in covering_cells(min_lat, min_lng, max_lat, max_lng):
+        cells |= prefix_range(cell)
+    return cells & Q(
+        location_lat__range=(min_lat, max_lat),
+        location_lng__range=(min_lng, max_lng),
+    )
@@ -0,0 +1,161 @@
+# backend/Services/http_cache.py
+"""
+Response caching for the public, read-only service APIs.
+
+``@cache_response`` wraps a DRF function view (innermost, under
+``@api_view``/``@permission_classes``):
+
+* Query parameters are normalised before the view sees them. Only declared
+  parameters survive, each passes through its normaliser (e.g. lat/lng
+  rounded to ~100 m), and the result, sorted, is the cache key. Cache
+  busters and parameter order therefore don't fragment the cache.
+* The ETag is a hash of the key and the content version (a service's
+  version stamp or the global services generation from ``cache.py``).
+  Equal version means byte-identical content, so the ETag is strong, and
+  ``If-None-Match`` is answered with 304.
+* An entry is fresh for ``HTTP_CACHE_MAX_AGE`` seconds while its version is
+  current. Past that (or once the version moved on), it is still served for
+  up to ``HTTP_CACHE_STALE_TTL`` seconds while one background refresh per
+  key recomputes it (stale-while-revalidate). Older entries are recomputed
+  inline.
+"""
+import hashlib
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.http import QueryDict
+from django.utils.http import parse_etags
+from rest_framework.response import Response
+
+from .cache import service_cache, service_version, services_generation
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_AGE = 60
+DEFAULT_STALE_TTL = 300
+REFRESH_LOCK_TIMEOUT = 30        # seconds; a crashed refresh frees its key after this
+KEY_PREFIX = 'http'
+
+_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='http-cache-refresh')
+
+
+# ────── Parameter normalisers ──────
+def rounded(digits):
+    return lambda value: str(round(float(value), digits))
+
+
+def bounded_int(low, high):
+    return lambda value: str(max(low, min(int(value), high)))
+
+
+def sorted_csv(value):
+    return ','.join(sorted({part.strip() for part in value.split(',') if part.strip()}))
+
+
+def normalize_params(query, normalizers):
+    """``QueryDict`` of the declared params only, normalised; invalid values are kept verbatim."""
+    params = QueryDict(mutable=True)
+    for name in sorted(normalizers):
+        value = query.get(name)
+        if value in (None, ''):
+            continue
+        normalize = normalizers[name] or str
+        try:
+            params[name] = normalize(value)
+        except (TypeError, ValueError):
+            params[name] = value        # let the view report the error
+    return params
+
+
+def _etag(key, version):
+    return '"%s"' % hashlib.sha1(f'{key}|{version}'.encode()).hexdigest()[:32]
+
+
+def submit_refresh(job):
+    _executor.submit(job)
+
+
+# ────── Decorator ──────
+def cache_response(name, version, params=None):
+    """
+    ``version(request, *args, **kwargs)`` returns the content version;
+    ``params`` maps each query parameter the view reads to a normaliser
+    (None to keep the value as-is).
+    """
+    normalizers = params or {}
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+
+            query = normalize_params(request.query_params, normalizers)
+            request._request.GET = query
+            key = ':'.join([KEY_PREFIX, name, *(str(v) for v in args),
+                            *(f'{k}={v}' for k, v in sorted(kwargs.items())), query.urlencode()])
+            cache = service_cache()
+            max_age = getattr(settings, 'HTTP_CACHE_MAX_AGE', DEFAULT_MAX_AGE)
+            stale_ttl = getattr(settings, 'HTTP_CACHE_STALE_TTL', DEFAULT_STALE_TTL)
+
+            current = version(request, *args, **kwargs)
+            etag = _etag(key, current)
+            entry = cache.get(key)
+            age = time.time() - entry['stored_at'] if entry else None
+
+            def compute(as_of):
+                response = view(request, *args, **kwargs)
+                if response.status_code == 200:
+                    cache.set(key, {
+                        'etag': _etag(key, as_of), 'data': response.data, 'stored_at': time.time(),
+                    }, timeout=max_age + stale_ttl)
+                return response
+
+            if entry and entry['etag'] == etag and age < max_age:
+                served, data = 'hit', entry['data']
+            elif entry and age < max_age + stale_ttl:
+                served, data = 'stale', entry['data']
+                etag = entry['etag']
+                lock_key = f'{key}:refreshing'
+                if cache.add(lock_key, 1, timeout=REFRESH_LOCK_TIMEOUT):
+                    def refresh():
+                        try:
+                            compute(version(request, *args, **kwargs))
+                        except Exception:
+                            logger.exception("Background refresh of %s failed", key)
+                        finally:
+                            cache.delete(lock_key)
+                            close_old_connections()
+                    submit_refresh(refresh)
+            else:
+                response = compute(current)
+                if response.status_code != 200:
+                    return response
+                served, data = 'miss', response.data
+
+            client_etags = parse_etags(request.headers.get('If-None-Match', ''))
+            if etag in client_etags or '*' in client_etags:
+                response = Response(status=304)
+            else:
+                response = Response(data)
+            response['ETag'] = etag
+            response['Cache-Control'] = f'public, max-age={max_age}, stale-while-revalidate={stale_ttl}'
+            response['X-Cache'] = served.upper()
+            return response
+        return wrapper
+    return decorator
+
+
+# ────── Content versions ──────
+def services_version(request, *args, **kwargs):
+    """Lists and searches: any service change moves every list on."""
+    return services_generation()
+
+
+def service_version_of(kwarg):
+    """One service's stamp, read from the view's ``kwarg`` URL argument."""
+    return lambda request, *args, **kwargs: service_version(kwargs[kwarg])
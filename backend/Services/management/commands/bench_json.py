@@ -0,0 +1,185 @@
+# backend/Services/management/commands/bench_json.py
+"""
+Benchmark the list APIs: per-instance dicts + strftime + DRF's JSONRenderer
+vs column projections with database-side dates + the orjson renderer.
+
+    python manage.py bench_json --rows 10000
+
+Synthetic bookings and reviews are created inside a transaction that is
+rolled back, so the command is safe to run against a development database.
+"""
+import random
+import time
+import uuid
+from datetime import date, timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from services import views
+from services.cache import service_cache
+from services.cards import refresh_cards
+from services.models import Booking, Category, Overview, Package, Review, ServiceCard
+from sfa_core.renderers import ORJSONRenderer
+
+STATUSES = ('pending', 'confirmed', 'completed', 'cancelled')
+
+
+class Command(BaseCommand):
+    help = "Compare ORM-instance list serialization with projected rows and orjson"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10_000)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        repeat = options['repeat']
+        factory = APIRequestFactory()
+
+        self.stdout.write(
+            f"{'endpoint':<20} {'rows':>6} {'before ms':>10} {'(render)':>9} {'after ms':>9} {'(render)':>9} {'speedup':>8}"
+        )
+        with transaction.atomic():
+            seller, buyer, service = self._populate(options['rows'], rng)
+            cases = [
+                ('user_orders', self._legacy_user_orders, views.user_orders, buyer, {}),
+                ('seller_bookings', self._legacy_seller_bookings, views.seller_bookings_api, seller, {}),
+                ('admin_all_bookings', self._legacy_admin_bookings, views.admin_all_bookings, buyer, {}),
+                ('service_reviews', self._legacy_reviews, views.service_reviews, buyer, {'service_id': service.pk}),
+            ]
+            for name, legacy, view, user, kwargs in cases:
+                def before():
+                    return legacy(user, **kwargs)
+
+                def after():
+                    service_cache().clear()     # measure the view, not the response cache
+                    request = factory.get('/')
+                    force_authenticate(request, user)
+                    return view(request, **kwargs).data
+
+                before_ms, before_render_ms, rows = self._time(before, JSONRenderer(), repeat)
+                after_ms, after_render_ms, _ = self._time(after, ORJSONRenderer(), repeat)
+                self.stdout.write(
+                    f"{name:<20} {rows:>6} {before_ms:>10.1f} {before_render_ms:>9.1f} "
+                    f"{after_ms:>9.1f} {after_render_ms:>9.1f} {before_ms / after_ms:>7.1f}x"
+                )
+            transaction.set_rollback(True)
+
+    @staticmethod
+    def _time(build, renderer, repeat):
+        total = render = 0.0
+        for _ in range(repeat):
+            start = time.perf_counter()
+            data = build()
+            rendered = time.perf_counter()
+            renderer.render(data)
+            end = time.perf_counter()
+            total += end - start
+            render += end - rendered
+        return total * 1000 / repeat, render * 1000 / repeat, len(data)
+
+    def _populate(self, rows, rng):
+        User = get_user_model()
+        tag = uuid.uuid4().hex[:8]
+        seller = User.objects.create(username=f"bench-seller-{tag}")
+        buyer = User.objects.create(username=f"bench-buyer-{tag}", is_staff=True)
+        category = Category.objects.create(name=f"bench-{tag}")
+        service = Overview.objects.create(user=seller, category=category, titleOverview="Bench service")
+        packages = Package.objects.bulk_create([
+            Package(overview=service, package_type=kind, title=f"{kind} package", price=price, delivery_time=days)
+            for kind, price, days in (('basic', 500, 5), ('standard', 1500, 3), ('premium', 4000, 1))
+        ])
+        refresh_cards([service.pk])
+
+        start = date(2025, 1, 1)
+        Booking.objects.bulk_create([
+            Booking(
+                buyer=buyer, overview=service, package=rng.choice(packages + [None]),
+                preferred_date=start + timedelta(days=rng.randrange(365)),
+                status=rng.choice(STATUSES), message=rng.choice(('', 'Please call first')),
+            ) for _ in range(rows)
+        ], batch_size=2000)
+
+        reviewers = User.objects.bulk_create(
+            [User(username=f"bench-{tag}-{i}") for i in range(rows)], batch_size=2000,
+        )
+        Review.objects.bulk_create([
+            Review(service=service, user=user, rating=rng.randint(1, 5), comment="Good work, would hire again")
+            for user in reviewers
+        ], batch_size=2000)
+        return seller, buyer, service
+
+    # ────── Pre-projection implementations ──────
+    @staticmethod
+    def _legacy_user_orders(user):
+        bookings = list(Booking.objects.filter(buyer=user).values(
+            'id', 'overview_id', 'package_id', 'preferred_date', 'status', 'message',
+        ).order_by('-created_at'))
+        cards = ServiceCard.objects.only('title', 'provider_name', 'packages').in_bulk(
+            {b['overview_id'] for b in bookings}
+        )
+        data = []
+        for b in bookings:
+            card = cards.get(b['overview_id'])
+            if not card:
+                continue
+            package = next((p for p in card.packages if p['id'] == b['package_id']), None)
+            data.append({
+                'id': b['id'],
+                'service_title': card.title or "Unknown Service",
+                'provider': card.provider_name,
+                'provider_avatar': card.provider_name[0].upper() if card.provider_name else "X",
+                'package': package['package_type'].capitalize() if package else "Standard",
+                'price': float(package['price']) if package else 0,
+                'date': str(b['preferred_date'])[:10] if b['preferred_date'] else "Not set",
+                'time': str(b['preferred_date'])[11:16] if b['preferred_date'] and len(str(b['preferred_date'])) > 10 else "Anytime",
+                'status': b['status'].capitalize(),
+                'message': b['message'] or "No message"
+            })
+        return data
+
+    @staticmethod
+    def _legacy_seller_bookings(user):
+        bookings = Booking.objects.filter(
+            overview__user=user
+        ).select_related('buyer', 'overview', 'package').order_by('-created_at')
+        return [{
+            'id': b.id,
+            'customer': b.buyer.username,
+            'customer_avatar': b.buyer.username[0].upper(),
+            'service': b.overview.titleOverview,
+            'package': b.package.package_type.capitalize() if b.package else 'Basic',
+            'price': float(b.package.price) if b.package and hasattr(b.package, 'price') else 0.0,
+            'date': b.preferred_date.strftime('%Y-%m-%d') if b.preferred_date else 'Not set',
+            'status': b.status,
+            'message': getattr(b, 'message', '') or 'No message'
+        } for b in bookings]
+
+    @staticmethod
+    def _legacy_admin_bookings(user):
+        bookings = Booking.objects.all().select_related('buyer', 'overview', 'package', 'overview__user')
+        return [{
+            'id': b.id,
+            'customer': b.buyer.username,
+            'freelancer': b.overview.user.username if b.overview and b.overview.user else "N/A",
+            'service': b.overview.titleOverview if b.overview else "Deleted",
+            'price': float(b.package.price) if b.package else 0,
+            'status': b.status,
+            'date': b.preferred_date.strftime('%b %d, %Y') if b.preferred_date else "—"
+        } for b in bookings]
+
+    @staticmethod
+    def _legacy_reviews(user, service_id):
+        reviews = Review.objects.filter(service_id=service_id).select_related('user')
+        return [{
+            'id': r.id,
+            'reviewer': r.user.username if r.user else "Anonymous",
+            'rating': float(r.rating or 0),
+            'comment': r.comment or "",
+            'created_at': r.created_at.strftime("%b %d, %Y") if r.created_at else "Just now"
+        } for r in reviews]
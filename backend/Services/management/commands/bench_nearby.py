@@ -0,0 +1,105 @@
+# backend/Services/management/commands/bench_nearby.py
+"""
+Benchmark the nearby-services lookup: full-table haversine scan vs the
+geohash + bounding-box prefilter.
+
+    python manage.py bench_nearby --sizes 10000 100000 1000000
+
+Synthetic services are created inside a transaction that is rolled back,
+so the command is safe to run against a development database.
+"""
+import random
+import time
+import uuid
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from services import geo
+from services.models import Category, Overview
+from services.utils import haversine_distance
+
+# Nepal, roughly
+LAT_RANGE = (26.3, 30.4)
+LNG_RANGE = (80.0, 88.2)
+
+
+class Command(BaseCommand):
+    help = "Compare the full-scan and geohash-indexed nearby service queries"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', nargs='+', type=int, default=[10_000, 100_000, 1_000_000])
+        parser.add_argument('--queries', type=int, default=50, help="Indexed queries per size")
+        parser.add_argument('--scan-queries', type=int, default=3, help="Full-scan queries per size")
+        parser.add_argument('--radius', type=float, default=5.0, help="Search radius in km")
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        radius = options['radius']
+
+        self.stdout.write(f"{'services':>10} {'scan ms':>10} {'indexed ms':>11} {'speedup':>8} {'hits':>6}")
+        for size in options['sizes']:
+            with transaction.atomic():
+                self._populate(size, rng)
+                points = [self._random_point(rng) for _ in range(max(options['queries'], options['scan_queries']))]
+
+                scan_ms, scan_hits = self._time(self._full_scan, points[:options['scan_queries']], radius)
+                indexed_ms, indexed_hits = self._time(self._indexed, points[:options['queries']], radius)
+
+                speedup = scan_ms / indexed_ms if indexed_ms else float('inf')
+                self.stdout.write(
+                    f"{size:>10} {scan_ms:>10.2f} {indexed_ms:>11.2f} {speedup:>7.1f}x {indexed_hits:>6.1f}"
+                )
+                transaction.set_rollback(True)
+
+    def _populate(self, size, rng):
+        user = get_user_model().objects.create(username=f"bench-{uuid.uuid4().hex[:12]}")
+        category = Category.objects.create(name=f"bench-{uuid.uuid4().hex[:12]}")
+
+        batch = []
+        for i in range(size):
+            lat, lng = self._random_point(rng)
+            batch.append(Overview(
+                user=user, category=category, titleOverview=f"Bench service {i}",
+                location_lat=lat, location_lng=lng, geohash=geo.encode(lat, lng),
+            ))
+            if len(batch) == 5000:
+                Overview.objects.bulk_create(batch)
+                batch = []
+        if batch:
+            Overview.objects.bulk_create(batch)
+
+    @staticmethod
+    def _random_point(rng):
+        return rng.uniform(*LAT_RANGE), rng.uniform(*LNG_RANGE)
+
+    @staticmethod
+    def _time(func, points, radius):
+        if not points:
+            return 0.0, 0.0
+        hits = 0
+        start = time.perf_counter()
+        for lat, lng in points:
+            hits += func(lat, lng, radius)
+        elapsed = time.perf_counter() - start
+        return elapsed * 1000 / len(points), hits / len(points)
+
+    @staticmethod
+    def _full_scan(lat, lng, radius):
+        # Mirrors the pre-index nearby_services_api loop
+        hits = 0
+        for service in Overview.objects.filter(is_active=True):
+            if haversine_distance(lat, lng, service.location_lat, service.location_lng) <= radius:
+                hits += 1
+        return hits
+
+    @staticmethod
+    def _indexed(lat, lng, radius):
+        hits = 0
+        candidates = Overview.objects.filter(geo.radius_filter(lat, lng, radius), is_active=True)
+        for service in candidates:
+            if haversine_distance(lat, lng, service.location_lat, service.location_lng) <= radius:
+                hits += 1
+        return hits
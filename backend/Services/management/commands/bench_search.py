@@ -0,0 +1,93 @@
+# backend/Services/management/commands/bench_search.py
+"""
+Benchmark service search: icontains LIKE scans vs the BM25 inverted index.
+
+    python manage.py bench_search --sizes 10000 100000
+
+Synthetic services are created inside a transaction that is rolled back.
+"""
+import random
+import time
+import uuid
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+
+from services.models import Category, Description, Overview
+from services.search import SearchIndex
+
+WORDS = (
+    'plumber electrician carpenter painter tutor driver cleaner mechanic cook '
+    'photographer designer developer website logo mobile repair wiring tap pipe '
+    'kathmandu lalitpur bhaktapur pokhara home office fast cheap expert certified '
+    'wedding event math science english nepali guitar yoga fitness laptop phone'
+).split()
+VOCABULARY = WORDS + [f"term{i}" for i in range(5000)]
+# Zipf-like word frequencies so descriptions look like natural text
+ZIPF_WEIGHTS = [1 / (rank + 1) for rank in range(len(VOCABULARY))]
+
+
+class Command(BaseCommand):
+    help = "Compare icontains search with the in-process full-text index"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', nargs='+', type=int, default=[10_000, 100_000])
+        parser.add_argument('--queries', type=int, default=50)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        queries = [' '.join(rng.sample(WORDS, rng.choice((1, 2)))) for _ in range(options['queries'])]
+
+        self.stdout.write(f"{'services':>10} {'icontains ms':>13} {'index ms':>9} {'build s':>8} {'speedup':>8}")
+        for size in options['sizes']:
+            with transaction.atomic():
+                self._populate(size, rng)
+
+                start = time.perf_counter()
+                for q in queries:
+                    self._icontains(q)
+                like_ms = (time.perf_counter() - start) * 1000 / len(queries)
+
+                start = time.perf_counter()
+                index = SearchIndex().load()
+                build_s = time.perf_counter() - start
+
+                start = time.perf_counter()
+                for q in queries:
+                    index.search(q, limit=200)
+                index_ms = (time.perf_counter() - start) * 1000 / len(queries)
+
+                speedup = like_ms / index_ms if index_ms else float('inf')
+                self.stdout.write(f"{size:>10} {like_ms:>13.2f} {index_ms:>9.2f} {build_s:>8.2f} {speedup:>7.1f}x")
+                transaction.set_rollback(True)
+
+    def _populate(self, size, rng):
+        user = get_user_model().objects.create(username=f"bench-{uuid.uuid4().hex[:12]}")
+        categories = [Category.objects.create(name=f"bench-{uuid.uuid4().hex[:8]}-{w}") for w in WORDS[:8]]
+
+        for start in range(0, size, 5000):
+            overviews = Overview.objects.bulk_create([
+                Overview(
+                    user=user, category=rng.choice(categories),
+                    titleOverview=' '.join(rng.sample(WORDS, 2) + rng.choices(VOCABULARY, ZIPF_WEIGHTS, k=2)),
+                    search_tags=','.join(rng.sample(WORDS, 3)),
+                )
+                for _ in range(start, min(start + 5000, size))
+            ])
+            Description.objects.bulk_create([
+                Description(overview=o, description=' '.join(rng.choices(VOCABULARY, ZIPF_WEIGHTS, k=40)))
+                for o in overviews
+            ])
+
+    @staticmethod
+    def _icontains(q):
+        # The pre-index intro_home filter; the template rendered every match
+        return list(
+            Overview.objects.filter(is_active=True)
+            .filter(Q(titleOverview__icontains=q) | Q(descriptions__description__icontains=q))
+            .distinct()
+            .values_list('id', flat=True)
+        )
@@ -0,0 +1,22 @@
+# backend/Services/management/commands/rebuild_service_cards.py
+"""
+Rebuild the ServiceCard read model from the source tables.
+
+    python manage.py rebuild_service_cards
+
+Cards are kept current by signals; run this after bulk imports or raw SQL
+edits, which bypass them.
+"""
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from services.cards import rebuild_cards
+
+
+class Command(BaseCommand):
+    help = "Rebuild every service's listing card"
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            count = rebuild_cards()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {count} service card(s)"))
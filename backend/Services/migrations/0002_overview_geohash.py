@@ -0,0 +1,65 @@
+from django.db import migrations, models
+
+# Frozen copy of services.geo.encode: migrations must not depend on app code
+# that may change or move later.
+_BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+
+def encode(lat, lng, precision=9):
+    lat_lo, lat_hi = -90.0, 90.0
+    lng_lo, lng_hi = -180.0, 180.0
+    chars = []
+    bits = bit_count = 0
+    even = True  # geohash interleaves bits starting with longitude
+
+    while len(chars) < precision:
+        if even:
+            mid = (lng_lo + lng_hi) / 2
+            if lng >= mid:
+                bits, lng_lo = (bits << 1) | 1, mid
+            else:
+                bits, lng_hi = bits << 1, mid
+        else:
+            mid = (lat_lo + lat_hi) / 2
+            if lat >= mid:
+                bits, lat_lo = (bits << 1) | 1, mid
+            else:
+                bits, lat_hi = bits << 1, mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(_BASE32[bits])
+            bits = bit_count = 0
+
+    return ''.join(chars)
+
+
+def backfill_geohash(apps, schema_editor):
+    Overview = apps.get_model('services', 'Overview')
+    batch = []
+    for overview in Overview.objects.only('id', 'location_lat', 'location_lng').iterator(chunk_size=2000):
+        if overview.location_lat is None or overview.location_lng is None:
+            continue
+        overview.geohash = encode(overview.location_lat, overview.location_lng)
+        batch.append(overview)
+        if len(batch) >= 2000:
+            Overview.objects.bulk_update(batch, ['geohash'])
+            batch = []
+    if batch:
+        Overview.objects.bulk_update(batch, ['geohash'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('services', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='overview',
+            name='geohash',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=9),
+        ),
+        migrations.RunPython(backfill_geohash, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,77 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def parse_tags(search_tags):
+    """Frozen copy of services.models.parse_tags."""
+    names = []
+    for tag in (search_tags or '').split(','):
+        name = ' '.join(tag.lower().split())[:50]
+        if name and name not in names:
+            names.append(name)
+    return names
+
+
+def backfill_tags(apps, schema_editor):
+    Overview = apps.get_model('services', 'Overview')
+    Tag = apps.get_model('services', 'Tag')
+    ServiceTag = apps.get_model('services', 'ServiceTag')
+
+    def flush(batch):
+        names = {name for _, tag_names in batch for name in tag_names}
+        Tag.objects.bulk_create([Tag(name=name) for name in names], ignore_conflicts=True)
+        tag_ids = dict(Tag.objects.filter(name__in=names).values_list('name', 'id'))
+        ServiceTag.objects.bulk_create(
+            [ServiceTag(overview_id=overview_id, tag_id=tag_ids[name])
+             for overview_id, tag_names in batch for name in tag_names],
+            ignore_conflicts=True,
+        )
+
+    batch = []
+    rows = Overview.objects.exclude(search_tags='').values_list('id', 'search_tags')
+    for overview_id, search_tags in rows.iterator(chunk_size=2000):
+        batch.append((overview_id, parse_tags(search_tags)))
+        if len(batch) >= 2000:
+            flush(batch)
+            batch = []
+    if batch:
+        flush(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('services', '0002_overview_geohash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ServiceTag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('overview', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='service_tags', to='services.overview')),
+                ('tag', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='service_tags', to='services.tag')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='overview',
+            name='tags',
+            field=models.ManyToManyField(blank=True, related_name='services', through='services.ServiceTag', to='services.tag'),
+        ),
+        migrations.AddIndex(
+            model_name='servicetag',
+            index=models.Index(fields=['tag', 'overview'], name='services_se_tag_id_4b4cd5_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='servicetag',
+            unique_together={('overview', 'tag')},
+        ),
+        migrations.RunPython(backfill_tags, migrations.RunPython.noop),
+    ]
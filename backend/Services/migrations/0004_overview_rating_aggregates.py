@@ -0,0 +1,75 @@
+from collections import defaultdict
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_rating_aggregates(apps, schema_editor):
+    Overview = apps.get_model('services', 'Overview')
+    Review = apps.get_model('services', 'Review')
+
+    stars = defaultdict(dict)
+    for service_id, rating, n in Review.objects.values_list('service_id', 'rating').annotate(n=Count('id')):
+        stars[service_id][rating] = n
+
+    batch = []
+    fields = ['rating_sum', 'rating_count', 'overall_rating'] + [f'rating_{star}' for star in range(1, 6)]
+    for overview in Overview.objects.filter(id__in=list(stars)).only('id').iterator(chunk_size=2000):
+        histogram = stars[overview.id]
+        overview.rating_count = sum(histogram.values())
+        overview.rating_sum = sum(star * n for star, n in histogram.items())
+        overview.overall_rating = round(overview.rating_sum / overview.rating_count, 2)
+        for star in range(1, 6):
+            setattr(overview, f'rating_{star}', histogram.get(star, 0))
+        batch.append(overview)
+        if len(batch) >= 2000:
+            Overview.objects.bulk_update(batch, fields)
+            batch = []
+    if batch:
+        Overview.objects.bulk_update(batch, fields)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('services', '0003_tags'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='overview',
+            name='rating_1',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='overview',
+            name='rating_2',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='overview',
+            name='rating_3',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='overview',
+            name='rating_4',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='overview',
+            name='rating_5',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='overview',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='overview',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_rating_aggregates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,79 @@
+from collections import defaultdict
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+PACKAGE_FIELDS = ['id', 'package_type', 'title', 'price', 'delivery_time', 'revisions']
+
+
+def backfill_service_cards(apps, schema_editor):
+    Overview = apps.get_model('services', 'Overview')
+    Package = apps.get_model('services', 'Package')
+    Gallery = apps.get_model('services', 'Gallery')
+    ServiceCard = apps.get_model('services', 'ServiceCard')
+
+    packages = defaultdict(list)
+    for pkg in Package.objects.order_by('id').values('overview_id', *PACKAGE_FIELDS).iterator(chunk_size=2000):
+        packages[pkg.pop('overview_id')].append(pkg)
+    storage = Gallery._meta.get_field('image1').storage
+    thumbnails = {}
+    images = Gallery.objects.exclude(image1='').exclude(image1__isnull=True).order_by('-id')
+    for overview_id, name in images.values_list('overview_id', 'image1'):
+        thumbnails[overview_id] = storage.url(name)
+
+    rows = Overview.objects.values_list(
+        'id', 'titleOverview', 'user_id', 'user__username', 'category_id', 'category__name',
+        'overall_rating', 'rating_count', 'location_lat', 'location_lng', 'geohash', 'is_active',
+    )
+    batch = []
+    for (overview_id, title, user_id, username, category_id, category_name,
+         rating, rating_count, lat, lng, geohash, is_active) in rows.iterator(chunk_size=2000):
+        service_packages = packages.get(overview_id, [])
+        batch.append(ServiceCard(
+            overview_id=overview_id, title=title, provider_id=user_id, provider_name=username,
+            category_id=category_id, category_name=category_name,
+            min_price=min((p['price'] for p in service_packages), default=None),
+            min_delivery=min((p['delivery_time'] for p in service_packages), default=None),
+            overall_rating=rating, rating_count=rating_count, thumbnail=thumbnails.get(overview_id, ''),
+            location_lat=lat, location_lng=lng, geohash=geohash, is_active=is_active,
+            packages=service_packages,
+        ))
+        if len(batch) >= 2000:
+            ServiceCard.objects.bulk_create(batch)
+            batch = []
+    if batch:
+        ServiceCard.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('services', '0004_overview_rating_aggregates'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ServiceCard',
+            fields=[
+                ('overview', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='card', serialize=False, to='services.overview')),
+                ('title', models.CharField(max_length=100)),
+                ('provider_name', models.CharField(max_length=150)),
+                ('category_name', models.CharField(max_length=100)),
+                ('min_price', models.IntegerField(blank=True, null=True)),
+                ('min_delivery', models.PositiveIntegerField(blank=True, null=True)),
+                ('overall_rating', models.DecimalField(decimal_places=2, default=0.0, max_digits=3)),
+                ('rating_count', models.PositiveIntegerField(default=0)),
+                ('thumbnail', models.CharField(blank=True, max_length=255)),
+                ('location_lat', models.FloatField()),
+                ('location_lng', models.FloatField()),
+                ('geohash', models.CharField(blank=True, db_index=True, max_length=9)),
+                ('is_active', models.BooleanField(default=True)),
+                ('packages', models.JSONField(blank=True, default=list)),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='services.category')),
+                ('provider', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.RunPython(backfill_service_cards, migrations.RunPython.noop),
+    ]
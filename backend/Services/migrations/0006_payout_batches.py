@@ -0,0 +1,27 @@
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('services', '0005_service_cards'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='payout',
+            name='batch_ref',
+            field=models.CharField(blank=True, db_index=True, max_length=40),
+        ),
+        migrations.AddField(
+            model_name='payout',
+            name='processed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='payout',
+            index=models.Index(fields=['status', 'id'], name='payout_pending_idx'),
+        ),
+    ]
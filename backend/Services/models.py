@@ -1,7 +1,11 @@
 from django.conf import settings
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Case, Count, F, FloatField, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Cast, Round
 from django.core.validators import MinValueValidator, MaxValueValidator
 
+from . import geo
+
 
 class Category(models.Model):
     name = models.CharField(max_length=100, unique=True)
@@ -10,35 +14,140 @@ class Category(models.Model):
         return self.name
 
 
+class Tag(models.Model):
+    name = models.CharField(max_length=50, unique=True)
+
+    def __str__(self):
+        return self.name
+
+
+def parse_tags(search_tags):
+    """Normalised, de-duplicated tag names from a comma-separated string."""
+    names = []
+    for tag in (search_tags or '').split(','):
+        name = ' '.join(tag.lower().split())[:50]
+        if name and name not in names:
+            names.append(name)
+    return names
+
+
+# Per-star review histogram columns on Overview
+STAR_FIELDS = {star: f'rating_{star}' for star in range(1, 6)}
+
+
 class Overview(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     titleOverview = models.CharField(max_length=100)
     category = models.ForeignKey(Category, on_delete=models.CASCADE)
     overall_rating = models.DecimalField(max_digits=3, decimal_places=2, default=0.00)
+    # Running review aggregates, adjusted per review with F() updates
+    rating_sum = models.PositiveIntegerField(default=0)
+    rating_count = models.PositiveIntegerField(default=0)
+    rating_1 = models.PositiveIntegerField(default=0)
+    rating_2 = models.PositiveIntegerField(default=0)
+    rating_3 = models.PositiveIntegerField(default=0)
+    rating_4 = models.PositiveIntegerField(default=0)
+    rating_5 = models.PositiveIntegerField(default=0)
     search_tags = models.CharField(max_length=200, blank=True)
     location_lat = models.FloatField(default=27.7)
     location_lng = models.FloatField(default=85.7)
+    # Spatial index for radius search — kept in sync with location_lat/lng in save()
+    geohash = models.CharField(max_length=geo.GEOHASH_PRECISION, blank=True, db_index=True, editable=False)
     is_active = models.BooleanField(default=True)
+    # Normalised copy of search_tags for indexed filtering and facet counts
+    tags = models.ManyToManyField(Tag, through='ServiceTag', related_name='services', blank=True)
 
     def save(self, *args, **kwargs):
         if self.search_tags:
             tags = [tag.strip() for tag in self.search_tags.split(',') if tag.strip()]
             self.search_tags = ','.join(tags)
+        if self.location_lat is not None and self.location_lng is not None:
+            self.geohash = geo.encode(self.location_lat, self.location_lng)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'location_lat', 'location_lng'} & set(update_fields):
+            kwargs['update_fields'] = set(update_fields) | {'geohash'}
         super().save(*args, **kwargs)
+        if update_fields is None or 'search_tags' in update_fields:
+            self.sync_tags()
+
+    def sync_tags(self):
+        """Make the tag relations match ``search_tags``."""
+        names = parse_tags(self.search_tags)
+        current = dict(ServiceTag.objects.filter(overview=self).values_list('tag__name', 'id'))
+        stale = [link_id for name, link_id in current.items() if name not in names]
+        if stale:
+            ServiceTag.objects.filter(id__in=stale).delete()
+
+        missing = [name for name in names if name not in current]
+        if missing:
+            Tag.objects.bulk_create([Tag(name=name) for name in missing], ignore_conflicts=True)
+            ServiceTag.objects.bulk_create([
+                ServiceTag(overview=self, tag_id=tag_id)
+                for tag_id in Tag.objects.filter(name__in=missing).values_list('id', flat=True)
+            ])
+
+    @property
+    def rating_histogram(self):
+        return {star: getattr(self, field) for star, field in STAR_FIELDS.items()}
+
+    @classmethod
+    def apply_review_delta(cls, overview_id, added=None, removed=None):
+        """Count one review's stars in (``added``) and/or out (``removed``) without reading any rows."""
+        changes = {}
+        for stars, sign in ((added, 1), (removed, -1)):
+            if stars is None:
+                continue
+            field = STAR_FIELDS[int(stars)]
+            changes[field] = changes.get(field, F(field)) + sign
+            changes['rating_sum'] = changes.get('rating_sum', F('rating_sum')) + sign * int(stars)
+            changes['rating_count'] = changes.get('rating_count', F('rating_count')) + sign
+        if not changes:
+            return
+        services = cls.objects.filter(pk=overview_id)
+        with transaction.atomic():
+            services.update(**changes)
+            # Separate statement: some databases evaluate SET clauses left to right
+            services.update(overall_rating=Case(
+                When(rating_count=0, then=Value(0.0)),
+                default=Round(Cast(F('rating_sum'), FloatField()) / F('rating_count'), 2),
+                output_field=FloatField(),
+            ))
+            # Mirror onto the listing card; a no-op while the service is being deleted
+            source = cls.objects.filter(pk=OuterRef('pk'))
+            ServiceCard.objects.filter(pk=overview_id).update(
+                overall_rating=Subquery(source.values('overall_rating')[:1]),
+                rating_count=Subquery(source.values('rating_count')[:1]),
+            )
 
     def update_rating(self):
-        reviews = self.reviews.all()
-        if reviews.exists():
-            avg = sum(review.rating for review in reviews) / reviews.count()
-            self.overall_rating = round(avg, 2)
-        else:
-            self.overall_rating = 0.00
-        self.save()
+        """Rebuild the review aggregates from scratch (repairs drift)."""
+        totals = self.reviews.aggregate(
+            rating_sum=Sum('rating', default=0),
+            rating_count=Count('id'),
+            **{field: Count('id', filter=Q(rating=star)) for star, field in STAR_FIELDS.items()},
+        )
+        for field, value in totals.items():
+            setattr(self, field, value)
+        self.overall_rating = round(totals['rating_sum'] / totals['rating_count'], 2) if totals['rating_count'] else 0
+        self.save(update_fields=[*totals, 'overall_rating'])
 
     def __str__(self):
         return self.titleOverview
 
 
+class ServiceTag(models.Model):
+    overview = models.ForeignKey(Overview, on_delete=models.CASCADE, related_name='service_tags')
+    tag = models.ForeignKey(Tag, on_delete=models.CASCADE, related_name='service_tags')
+
+    class Meta:
+        unique_together = ['overview', 'tag']
+        # Tag-first index for "services with tag X" lookups and facet counts
+        indexes = [models.Index(fields=['tag', 'overview'])]
+
+    def __str__(self):
+        return f"{self.overview_id} - {self.tag_id}"
+
+
 class Package(models.Model):
     PACKAGE_TYPE = [
         ('basic', 'Basic'),
@@ -115,9 +224,19 @@ class Review(models.Model):
         ordering = ['-created_at']
 
     def save(self, *args, **kwargs):
-        super().save(*args, **kwargs)
-        # Update the service's overall rating
-        self.service.update_rating()
+        with transaction.atomic():
+            previous = None
+            if self.pk is not None:
+                previous = Review.objects.filter(pk=self.pk).values_list('service_id', 'rating').first()
+            super().save(*args, **kwargs)
+            # Adjust the service's rating aggregates by this review's change only
+            if previous is None:
+                Overview.apply_review_delta(self.service_id, added=self.rating)
+            elif previous[0] != self.service_id:
+                Overview.apply_review_delta(previous[0], removed=previous[1])
+                Overview.apply_review_delta(self.service_id, added=self.rating)
+            elif previous[1] != self.rating:
+                Overview.apply_review_delta(self.service_id, added=self.rating, removed=previous[1])
 
     def __str__(self):
         return f"{self.user.username} - {self.rating} stars for {self.service.titleOverview}"
@@ -157,6 +276,39 @@ class Payout(models.Model):
     esewa_id = models.CharField(max_length=20)
     status = models.CharField(max_length=20, default='pending')
     created_at = models.DateTimeField(auto_now_add=True)
-    
+    # Set when a settlement worker claims it (payments/settlement.py)
+    batch_ref = models.CharField(max_length=40, blank=True, db_index=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['status', 'id'], name='payout_pending_idx')]
+
+    def __str__(self):
+        return f"Payout ${self.amount} for {self.seller.username}"
+
+class ServiceCard(models.Model):
+    """
+    One flat row per service with everything a listing card shows, so list
+    endpoints read a single table. Maintained by ``cards.refresh_cards``
+    from the signals in ``signals.py``; never edit it directly.
+    """
+    overview = models.OneToOneField(Overview, on_delete=models.CASCADE, primary_key=True, related_name='card')
+    title = models.CharField(max_length=100)
+    provider = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+')
+    provider_name = models.CharField(max_length=150)
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='+')
+    category_name = models.CharField(max_length=100)
+    min_price = models.IntegerField(null=True, blank=True)
+    min_delivery = models.PositiveIntegerField(null=True, blank=True)
+    overall_rating = models.DecimalField(max_digits=3, decimal_places=2, default=0.00)
+    rating_count = models.PositiveIntegerField(default=0)
+    thumbnail = models.CharField(max_length=255, blank=True)
+    location_lat = models.FloatField()
+    location_lng = models.FloatField()
+    geohash = models.CharField(max_length=geo.GEOHASH_PRECISION, blank=True, db_index=True)
+    is_active = models.BooleanField(default=True)
+    # Serialized packages, in PackageSerializer's shape
+    packages = models.JSONField(default=list, blank=True)
+
     def __str__(self):
-        return f"Payout ${self.amount} for {self.seller.username}"
\ No newline at end of file
+        return self.title
@@ -0,0 +1,211 @@
+# backend/Services/nearest.py
+"""
+k-nearest-neighbour search over the service snapshot.
+
+Coordinates are projected onto the unit sphere, where straight-line (chord)
+distance orders points exactly like great-circle distance, and indexed with
+a static KD-tree. Rows patched in the snapshot after the tree was built are
+masked out of the tree and checked directly ("dirty overlay"); the tree is
+rebuilt once the overlay grows past a fraction of the catalogue.
+"""
+import heapq
+import math
+import threading
+
+from .geo import EARTH_RADIUS_KM
+from .snapshot import get_snapshot, np
+
+LEAF_SIZE = 32
+REBUILD_MIN_DIRTY = 256
+REBUILD_DIRTY_FRACTION = 0.01
+
+
+def to_unit_xyz(lats, lngs):
+    lat, lng = np.radians(lats), np.radians(lngs)
+    cos_lat = np.cos(lat)
+    return np.column_stack((cos_lat * np.cos(lng), cos_lat * np.sin(lng), np.sin(lat)))
+
+
+def km_to_chord(km):
+    return 2 * math.sin(min(km / (2 * EARTH_RADIUS_KM), math.pi / 2))
+
+
+def chord_to_km(chord):
+    return 2 * EARTH_RADIUS_KM * math.asin(min(chord / 2, 1.0))
+
+
+class KDTree:
+    """Static KD-tree with per-node bounding boxes, built with ``argpartition``."""
+
+    def __init__(self, points, leaf_size=LEAF_SIZE):
+        self.points = points
+        self.perm = np.arange(len(points))
+        self.start, self.end, self.left, self.right = [], [], [], []
+        lows, highs = [], []
+
+        def new_node(start, end):
+            block = points[self.perm[start:end]]
+            self.start.append(start)
+            self.end.append(end)
+            self.left.append(-1)
+            self.right.append(-1)
+            lows.append(block.min(axis=0))
+            highs.append(block.max(axis=0))
+            return len(self.start) - 1
+
+        stack = [new_node(0, len(points))] if len(points) else []
+        while stack:
+            node = stack.pop()
+            start, end = self.start[node], self.end[node]
+            if end - start <= leaf_size:
+                continue
+            axis = int(np.argmax(highs[node] - lows[node]))
+            mid = (start + end) // 2
+            block = self.perm[start:end]
+            self.perm[start:end] = block[np.argpartition(points[block, axis], mid - start)]
+            self.left[node] = new_node(start, mid)
+            self.right[node] = new_node(mid, end)
+            stack.extend((self.left[node], self.right[node]))
+
+        self.low = np.array(lows).reshape(-1, 3)
+        self.high = np.array(highs).reshape(-1, 3)
+
+    def _box_distance(self, node, point):
+        gap = np.maximum(0.0, np.maximum(self.low[node] - point, point - self.high[node]))
+        return float(np.sqrt(gap @ gap))
+
+    def query(self, point, k, max_distance=math.inf, accept=None):
+        """
+        The ``k`` rows closest to ``point`` as ``[(distance, row), ...]``.
+
+        ``accept(rows)`` may return a boolean mask to skip rows (filters).
+        """
+        if k <= 0 or not self.start:
+            return []
+        best = []   # max-heap via negated distance
+        bound = max_distance
+        frontier = [(self._box_distance(0, point), 0)]
+
+        while frontier:
+            box_distance, node = heapq.heappop(frontier)
+            if box_distance > bound:
+                break
+            if self.left[node] < 0:
+                rows = self.perm[self.start[node]:self.end[node]]
+                if accept is not None:
+                    rows = rows[accept(rows)]
+                diff = self.points[rows] - point
+                dists = np.sqrt(np.einsum('ij,ij->i', diff, diff))
+                keep = dists <= bound
+                for dist, row in zip(dists[keep].tolist(), rows[keep].tolist()):
+                    if len(best) < k:
+                        heapq.heappush(best, (-dist, row))
+                    elif dist < -best[0][0]:
+                        heapq.heapreplace(best, (-dist, row))
+                if len(best) == k:
+                    bound = min(bound, -best[0][0])
+            else:
+                for child in (self.left[node], self.right[node]):
+                    child_distance = self._box_distance(child, point)
+                    if child_distance <= bound:
+                        heapq.heappush(frontier, (child_distance, child))
+
+        return sorted((-neg, row) for neg, row in best)
+
+
+class NearestServices:
+    """KD-tree over a frozen copy of the snapshot plus an overlay of changed rows."""
+
+    def __init__(self, snapshot):
+        self.snapshot = snapshot
+        self._lock = threading.Lock()
+        with snapshot._lock:
+            self.ids = snapshot.column('id').copy()
+            self.category_id = snapshot.column('category_id').copy()
+            self.min_price = snapshot.column('min_price').copy()
+            xyz = to_unit_xyz(snapshot.column('lat'), snapshot.column('lng'))
+            self._row_of = {overview_id: row for row, overview_id in enumerate(self.ids.tolist())}
+            self.dead = np.zeros(len(self.ids), dtype=bool)
+            self.dirty = set()
+            snapshot.subscribe(self._mark_dirty)
+        self.tree = KDTree(xyz)
+
+    def _mark_dirty(self, overview_id):
+        with self._lock:
+            self.dirty.add(overview_id)
+            row = self._row_of.get(overview_id)
+            if row is not None:
+                self.dead[row] = True
+
+    @property
+    def stale(self):
+        return len(self.dirty) > max(REBUILD_MIN_DIRTY, len(self.ids) * REBUILD_DIRTY_FRACTION)
+
+    def nearest(self, lat, lng, k, category_id=None, min_price=None, max_price=None, max_distance=None):
+        """Ids and distances (km) of the ``k`` closest matching services, nearest first."""
+        point = to_unit_xyz(lat, lng)[0]
+        max_chord = km_to_chord(max_distance) if max_distance is not None else math.inf
+
+        def matches(category, price):
+            ok = np.ones(len(category), dtype=bool)
+            if category_id is not None:
+                ok &= category == category_id
+            if min_price is not None:
+                ok &= price >= min_price     # NaN (no packages) never matches
+            if max_price is not None:
+                ok &= price <= max_price
+            return ok
+
+        def accept(rows):
+            return ~self.dead[rows] & matches(self.category_id[rows], self.min_price[rows])
+
+        found = self.tree.query(point, k, max_chord, accept)
+        results = [(dist, int(self.ids[row])) for dist, row in found]
+
+        # Rows changed since the tree was built: check their current values directly
+        with self._lock:
+            dirty = list(self.dirty)
+        snapshot = self.snapshot
+        with snapshot._lock:
+            rows = [pos for pos in map(snapshot.position, dirty) if pos is not None]
+            if rows:
+                rows = np.array(rows)
+                ok = matches(snapshot.column('category_id')[rows], snapshot.column('min_price')[rows])
+                rows = rows[ok]
+                xyz = to_unit_xyz(snapshot.column('lat')[rows], snapshot.column('lng')[rows])
+                dists = np.sqrt(((xyz - point) ** 2).sum(axis=1))
+                ids = snapshot.column('id')[rows]
+                results.extend(
+                    (dist, overview_id)
+                    for dist, overview_id in zip(dists.tolist(), ids.tolist())
+                    if dist <= max_chord
+                )
+
+        results = heapq.nsmallest(k, results)
+        return [overview_id for _, overview_id in results], [chord_to_km(dist) for dist, _ in results]
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_nearest_index():
+    """
+    Index over the current snapshot, rebuilt when the snapshot was reloaded
+    or too many rows changed. Returns None when NumPy is not installed.
+    """
+    global _index
+    snapshot = get_snapshot()
+    if snapshot is None:
+        return None
+
+    index = _index
+    if index is not None and index.snapshot is snapshot and not index.stale:
+        return index
+
+    with _index_lock:
+        if _index is None or _index.snapshot is not snapshot or _index.stale:
+            if _index is not None:
+                _index.snapshot.unsubscribe(_index._mark_dirty)
+            _index = NearestServices(snapshot)
+        return _index
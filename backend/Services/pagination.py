@@ -0,0 +1,17 @@
+# backend/Services/pagination.py
+"""
+Keyset (cursor) pagination for service listings.
+
+Pages of ServiceCard rows are cut with ``WHERE overview_id < last_seen_id
+ORDER BY overview_id DESC`` rather than OFFSET, so every page costs the same
+index range scan however deep the client scrolls, and rows inserted
+meanwhile never shift or repeat a page.
+"""
+from rest_framework.pagination import CursorPagination
+
+
+class ServiceCursorPagination(CursorPagination):
+    ordering = '-overview_id'        # unique and immutable, so cursors stay stable
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
@@ -0,0 +1,183 @@
+# backend/Services/search.py
+"""
+In-process full-text index over services with BM25 ranking.
+
+Indexes ``Overview.titleOverview``, ``Overview.search_tags``,
+``Description.description`` and ``Category.name``. Fields are weighted
+(title and tags count more than body text) by scaling their term
+frequencies before BM25 scoring. The index is built lazily, patched from
+model signals and reloaded after ``SERVICE_SEARCH_MAX_AGE`` seconds.
+"""
+import heapq
+import math
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db.models import Q
+
+from .models import Description, Overview
+
+DEFAULT_MAX_AGE = 300  # seconds
+
+FIELD_WEIGHTS = {
+    'title': 3.0,
+    'tags': 2.0,
+    'category': 2.0,
+    'description': 1.0,
+}
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+STOPWORDS = frozenset({
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for', 'from', 'in', 'is',
+    'it', 'of', 'on', 'or', 'the', 'to', 'with', 'i', 'we', 'you', 'your', 'my',
+})
+
+
+def tokenize(text):
+    return [t for t in _TOKEN_RE.findall((text or '').lower()) if t not in STOPWORDS]
+
+
+class SearchIndex:
+    """Inverted index: term -> {overview id: weighted term frequency}."""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.postings = defaultdict(dict)
+        self.doc_length = {}
+        self.doc_terms = {}
+        self.doc_category = {}
+        self.total_length = 0.0
+        self.loaded_at = None
+
+    def __len__(self):
+        return len(self.doc_length)
+
+    # ────── Loading ──────
+    @staticmethod
+    def _documents(overview_filter):
+        services = Overview.objects.filter(overview_filter, is_active=True)
+        descriptions = defaultdict(list)
+        for overview_id, text in Description.objects.filter(overview__in=services).values_list('overview_id', 'description'):
+            descriptions[overview_id].append(text)
+
+        for overview_id, title, tags, category in services.values_list(
+            'id', 'titleOverview', 'search_tags', 'category__name'
+        ).iterator(chunk_size=2000):
+            yield overview_id, {
+                'title': title,
+                'tags': (tags or '').replace(',', ' '),
+                'category': category,
+                'description': ' '.join(descriptions.get(overview_id, ())),
+            }
+
+    def load(self):
+        with self._lock:
+            for overview_id, fields in self._documents(Q()):
+                self.add(overview_id, fields)
+            self.loaded_at = time.monotonic()
+        return self
+
+    def refresh(self, overview_ids):
+        """Re-read services from the database and re-index (or drop) them."""
+        overview_ids = set(overview_ids)
+        found = dict(self._documents(Q(pk__in=overview_ids)))
+        with self._lock:
+            for overview_id in overview_ids:
+                self.remove(overview_id)
+                if overview_id in found:
+                    self.add(overview_id, found[overview_id])
+
+    # ────── Mutation ──────
+    def add(self, overview_id, fields):
+        frequencies = Counter()
+        for field, text in fields.items():
+            weight = FIELD_WEIGHTS[field]
+            for term in tokenize(text):
+                frequencies[term] += weight
+
+        with self._lock:
+            self.remove(overview_id)
+            for term, tf in frequencies.items():
+                self.postings[term][overview_id] = tf
+            length = sum(frequencies.values())
+            self.doc_length[overview_id] = length
+            self.doc_terms[overview_id] = tuple(frequencies)
+            self.doc_category[overview_id] = (fields.get('category') or '').lower()
+            self.total_length += length
+
+    def remove(self, overview_id):
+        with self._lock:
+            length = self.doc_length.pop(overview_id, None)
+            if length is None:
+                return
+            self.total_length -= length
+            self.doc_category.pop(overview_id, None)
+            for term in self.doc_terms.pop(overview_id, ()):
+                docs = self.postings[term]
+                docs.pop(overview_id, None)
+                if not docs:
+                    del self.postings[term]
+
+    # ────── Query ──────
+    def search(self, query, category=None, limit=None):
+        """``[(overview_id, score), ...]`` best first, for any query term match."""
+        terms = set(tokenize(query))
+        category = category.lower() if category and category != 'all' else None
+
+        with self._lock:
+            n_docs = len(self.doc_length)
+            if not terms or not n_docs:
+                return []
+            avg_length = self.total_length / n_docs
+            scores = defaultdict(float)
+            for term in terms:
+                docs = self.postings.get(term)
+                if not docs:
+                    continue
+                idf = math.log(1 + (n_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+                for overview_id, tf in docs.items():
+                    norm = BM25_K1 * (1 - BM25_B + BM25_B * self.doc_length[overview_id] / avg_length)
+                    scores[overview_id] += idf * tf * (BM25_K1 + 1) / (tf + norm)
+
+            if category:
+                scores = {i: s for i, s in scores.items() if self.doc_category.get(i) == category}
+
+        key = lambda item: (-item[1], item[0])
+        if limit:
+            return heapq.nsmallest(limit, scores.items(), key=key)
+        return sorted(scores.items(), key=key)
+
+
+# ────── Process-wide instance ──────
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_search_index():
+    """The process-wide index, built on first use and rebuilt when stale."""
+    global _index
+    max_age = getattr(settings, 'SERVICE_SEARCH_MAX_AGE', DEFAULT_MAX_AGE)
+    index = _index
+    if index is not None and time.monotonic() - index.loaded_at < max_age:
+        return index
+
+    with _index_lock:
+        if _index is None or time.monotonic() - _index.loaded_at >= max_age:
+            _index = SearchIndex().load()
+        return _index
+
+
+def search_services(query, category=None, limit=None):
+    return get_search_index().search(query, category=category, limit=limit)
+
+
+def services_changed(overview_ids):
+    """Signal hook: re-index services in an already-built index."""
+    if _index is not None:
+        _index.refresh(overview_ids)
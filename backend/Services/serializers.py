@@ -1,6 +1,6 @@
 # backend/Services/serializers.py
 from rest_framework import serializers
-from .models import Overview, Package
+from .models import Overview, Package, ServiceCard
 
 class PackageSerializer(serializers.ModelSerializer):
     class Meta:
@@ -18,10 +18,73 @@ class ServiceSerializer(serializers.ModelSerializer):
     class Meta:
         model = Overview
         fields = [
-            'id', 'titleOverview', 'provider', 'category', 'overall_rating',
+            'id', 'titleOverview', 'provider', 'category', 'overall_rating', 'rating_count',
             'location_lat', 'location_lng', 'packages', 'distance_km'
         ]
 
+    def __init__(self, *args, fields=None, **kwargs):
+        # Sparse fieldsets: ServiceSerializer(..., fields=['id', 'titleOverview'])
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
     # ADD THIS METHOD
     def get_distance_km(self, obj):
-        return getattr(obj, 'distance_km', None)
\ No newline at end of file
+        return getattr(obj, 'distance_km', None)
+
+# ────── Row-based serialization (no model instances) ──────
+ROW_BATCH_SIZE = 500
+
+# ServiceSerializer field -> ServiceCard column
+CARD_COLUMNS = {
+    'id': 'overview_id',
+    'titleOverview': 'title',
+    'provider': 'provider_name',
+    'category': 'category_name',
+    'overall_rating': 'overall_rating',
+    'rating_count': 'rating_count',
+    'location_lat': 'location_lat',
+    'location_lng': 'location_lng',
+    'packages': 'packages',
+}
+
+
+def card_columns(fields=None):
+    """ServiceCard columns needed to render ``fields`` (all fields when None)."""
+    wanted = CARD_COLUMNS if fields is None else [f for f in CARD_COLUMNS if f in fields]
+    return ['overview_id', *(CARD_COLUMNS[f] for f in wanted if f != 'id')]
+
+
+def serialize_card(row, fields=None, distance=None):
+    """One ``ServiceSerializer``-shaped dict from a ``ServiceCard.values()`` row."""
+    data = {}
+    for name in ServiceSerializer.Meta.fields:
+        if fields is not None and name not in fields:
+            continue
+        if name == 'distance_km':
+            data[name] = round(distance, 2) if distance is not None else None
+        elif name == 'overall_rating':
+            data[name] = str(row['overall_rating'])
+        else:
+            data[name] = row[CARD_COLUMNS[name]]
+    return data
+
+
+def serialize_service_rows(ids, distances=None):
+    """
+    Same shape as ``ServiceSerializer(many=True).data`` for the given ids, in
+    the given order, read from the ServiceCard table alone.
+    """
+    rows = {}
+    for start in range(0, len(ids), ROW_BATCH_SIZE):
+        for row in ServiceCard.objects.filter(pk__in=ids[start:start + ROW_BATCH_SIZE]).values(*card_columns()):
+            rows[row['overview_id']] = row
+
+    data = []
+    for position, overview_id in enumerate(ids):
+        row = rows.get(overview_id)
+        if row is None:
+            continue  # deleted since the id list was built
+        data.append(serialize_card(row, distance=distances[position] if distances is not None else None))
+    return data
@@ -0,0 +1,138 @@
+# backend/Services/signals.py
+"""
+Keeps the in-process service indexes in step with the database.
+
+Handlers run after the surrounding transaction commits so the indexes never
+see rows that are later rolled back. The ``ServiceCard`` read model is a
+table, so it is instead rewritten inside the same transaction.
+"""
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from Home.models import Skill
+from . import autocomplete, cache, cards, fuzzy, search, snapshot
+from .models import Booking, Category, Description, Gallery, Overview, Package, Review
+
+
+def _service_changed(overview_id):
+    def apply():
+        snapshot.service_changed(overview_id)
+        search.services_changed([overview_id])
+        fuzzy.documents_changed('service', [overview_id])
+        autocomplete.services_changed([overview_id])
+        cache.services_changed([overview_id])
+    transaction.on_commit(apply)
+
+
+@receiver(post_save, sender=Overview)
+def overview_saved(sender, instance, **kwargs):
+    cards.refresh_cards([instance.pk])
+    _service_changed(instance.pk)
+
+
+@receiver(post_delete, sender=Overview)
+def overview_deleted(sender, instance, **kwargs):
+    overview_id = instance.pk
+
+    def apply():
+        snapshot.service_removed(overview_id)
+        search.services_changed([overview_id])
+        fuzzy.documents_changed('service', [overview_id])
+        autocomplete.services_changed([overview_id])
+        cache.services_changed([overview_id])
+    transaction.on_commit(apply)
+
+
+@receiver([post_save, post_delete], sender=Package)
+def package_changed(sender, instance, **kwargs):
+    # Packages feed the snapshot's min_price column, the card and the cached document
+    overview_id = instance.overview_id
+    cards.refresh_cards([overview_id], create=False)
+
+    def apply():
+        snapshot.service_changed(overview_id)
+        cache.services_changed([overview_id])
+    transaction.on_commit(apply)
+
+
+@receiver([post_save, post_delete], sender=Gallery)
+def gallery_changed(sender, instance, **kwargs):
+    # The first gallery image is the card thumbnail
+    cards.refresh_cards([instance.overview_id], create=False)
+
+
+@receiver([post_save, post_delete], sender=Description)
+def description_changed(sender, instance, **kwargs):
+    overview_id = instance.overview_id
+
+    def apply():
+        search.services_changed([overview_id])
+        cache.services_changed([overview_id])
+    transaction.on_commit(apply)
+
+
+@receiver(post_save, sender=Review)
+def review_saved(sender, instance, **kwargs):
+    # Review.save already adjusted the stored aggregates (and the card); indexes carry the rating
+    _service_changed(instance.service_id)
+
+
+@receiver(post_delete, sender=Review)
+def review_deleted(sender, instance, **kwargs):
+    # Also covers QuerySet.delete(), which bypasses Review.delete()
+    Overview.apply_review_delta(instance.service_id, removed=instance.rating)
+    _service_changed(instance.service_id)
+
+
+@receiver([post_save, post_delete], sender=Booking)
+def booking_changed(sender, instance, **kwargs):
+    # Booking counts weight the autocomplete suggestions
+    overview_id = instance.overview_id
+    transaction.on_commit(lambda: autocomplete.services_changed([overview_id]))
+
+
+@receiver(post_save, sender=Category)
+def category_saved(sender, instance, created, **kwargs):
+    transaction.on_commit(autocomplete.invalidate)
+    if created:
+        return
+    category_id = instance.pk
+    cards.category_renamed(category_id, instance.name)
+
+    def apply():
+        # Category names are indexed on every service in the category
+        ids = list(Overview.objects.filter(category_id=category_id).values_list('id', flat=True))
+        search.services_changed(ids)
+        cache.services_changed(ids)
+    transaction.on_commit(apply)
+
+
+@receiver(post_delete, sender=Category)
+def category_deleted(sender, instance, **kwargs):
+    transaction.on_commit(autocomplete.invalidate)
+
+
+@receiver([post_save, post_delete], sender=Skill)
+def skill_changed(sender, instance, **kwargs):
+    skill_id = instance.pk
+    transaction.on_commit(lambda: fuzzy.documents_changed('skill', [skill_id]))
+
+
+@receiver([post_save, post_delete], sender=settings.AUTH_USER_MODEL)
+def user_changed(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and set(update_fields) <= {'last_login'}:
+        return      # every login saves last_login; usernames are unchanged
+    user_id = instance.pk
+    if kwargs['signal'] is post_save:
+        cards.provider_renamed(user_id, instance.username)
+
+    def apply():
+        fuzzy.documents_changed('user', [user_id])
+        # Cached documents and reviews carry the provider's or reviewer's username
+        cache.services_changed(Overview.objects.filter(
+            Q(user_id=user_id) | Q(reviews__user_id=user_id)
+        ).values_list('id', flat=True).distinct())
+    transaction.on_commit(apply)
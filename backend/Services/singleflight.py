@@ -0,0 +1,219 @@
+# backend/Services/singleflight.py
+"""
+Request coalescing ("single flight") for expensive identical work.
+
+The first caller for a key runs the computation. Callers arriving with the
+same key while it is in flight wait for it and share the result, or the
+exception. Threads (WSGI workers) and asyncio tasks (ASGI) are tracked
+separately, since a thread must never block an event loop.
+
+Waiters give up after ``timeout`` seconds with ``FlightTimeout``; the
+leader keeps running and later callers start a new flight.
+
+``SingleFlightMiddleware`` applies this to the GET endpoints named in
+``SINGLE_FLIGHT_URL_NAMES``, keyed by path, sorted query string and the
+request headers the response depends on (``KEY_HEADERS``): a waiter must never
+get a 304 answering someone else's ``If-None-Match``, or another user's view.
+"""
+import asyncio
+import hashlib
+import threading
+from urllib.parse import urlencode
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import HttpResponse
+from django.urls import Resolver404, resolve
+
+DEFAULT_TIMEOUT = 10.0
+KEY_HEADERS = ('If-None-Match', 'If-Modified-Since', 'Authorization')
+
+
+class FlightTimeout(TimeoutError):
+    pass
+
+
+class FlightAborted(RuntimeError):
+    """The leading task was cancelled before producing a result."""
+
+
+class _Call:
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}           # key -> _Call (threads)
+        self._futures = {}         # (loop, key) -> Future (asyncio tasks)
+        self._stats = {'flights': 0, 'coalesced': 0, 'timeouts': 0, 'errors': 0}
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats)
+
+    def reset_stats(self):
+        with self._lock:
+            self._stats = dict.fromkeys(self._stats, 0)
+
+    # ────── Threads ──────
+    def do(self, key, fn, timeout=None):
+        """``(result, shared)``: ``fn()``'s result, computed here or by a concurrent caller."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self._stats['flights'] += 1
+            else:
+                self._stats['coalesced'] += 1
+
+        if leader:
+            try:
+                call.result = fn()
+            except BaseException as exc:
+                call.error = exc
+                self._count('errors')
+                raise
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call.done.set()
+            return call.result, False
+
+        if not call.done.wait(timeout):
+            self._count('timeouts')
+            raise FlightTimeout(key)
+        if call.error is not None:
+            raise call.error
+        return call.result, True
+
+    # ────── asyncio ──────
+    async def do_async(self, key, fn, timeout=None):
+        """Awaitable ``do``: ``fn`` is a coroutine function."""
+        loop = asyncio.get_running_loop()
+        slot = (loop, key)
+        with self._lock:
+            future = self._futures.get(slot)
+            leader = future is None
+            if leader:
+                future = self._futures[slot] = loop.create_future()
+                self._stats['flights'] += 1
+            else:
+                self._stats['coalesced'] += 1
+
+        if leader:
+            try:
+                result = await fn()
+            except asyncio.CancelledError:
+                future.set_exception(FlightAborted(key))
+                raise
+            except BaseException as exc:
+                future.set_exception(exc)
+                self._count('errors')
+                raise
+            else:
+                future.set_result(result)
+                return result, False
+            finally:
+                with self._lock:
+                    del self._futures[slot]
+                if future.done() and not future.cancelled():
+                    future.exception()      # mark retrieved even if nobody waited
+
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), timeout), True
+        except asyncio.TimeoutError:
+            self._count('timeouts')
+            raise FlightTimeout(key) from None
+
+
+flight = SingleFlight()
+
+
+# ────── Middleware ──────
+def _freeze(response):
+    """Immutable copy of a rendered response for waiters (outer middleware mutates the original)."""
+    return response.content, response.status_code, list(response.items())
+
+
+def _thaw(frozen):
+    content, status, headers = frozen
+    response = HttpResponse(content, status=status)
+    for name, value in headers:
+        response[name] = value
+    return response
+
+
+class SingleFlightMiddleware:
+    """Coalesce concurrent identical GETs to ``SINGLE_FLIGHT_URL_NAMES``. Place it last."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def _key(self, request):
+        if request.method != 'GET':
+            return None
+        try:
+            url_name = resolve(request.path_info).url_name
+        except Resolver404:
+            return None
+        if url_name not in getattr(settings, 'SINGLE_FLIGHT_URL_NAMES', ()):
+            return None
+        headers = '\n'.join(request.headers.get(name, '') for name in KEY_HEADERS)
+        return '{}?{}#{}'.format(
+            request.path_info, urlencode(sorted(request.GET.lists()), doseq=True),
+            hashlib.sha1(headers.encode()).hexdigest(),
+        )
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        key = self._key(request)
+        if key is None:
+            return self.get_response(request)
+
+        def lead():
+            response = self.get_response(request)
+            return response, None if response.streaming else _freeze(response)
+
+        timeout = getattr(settings, 'SINGLE_FLIGHT_TIMEOUT', DEFAULT_TIMEOUT)
+        try:
+            (response, frozen), shared = flight.do(key, lead, timeout)
+        except FlightTimeout:
+            return self.get_response(request)
+        if not shared:
+            return response
+        return _thaw(frozen) if frozen is not None else self.get_response(request)
+
+    async def __acall__(self, request):
+        key = self._key(request)
+        if key is None:
+            return await self.get_response(request)
+
+        async def lead():
+            response = await self.get_response(request)
+            return response, None if response.streaming else _freeze(response)
+
+        timeout = getattr(settings, 'SINGLE_FLIGHT_TIMEOUT', DEFAULT_TIMEOUT)
+        try:
+            (response, frozen), shared = await flight.do_async(key, lead, timeout)
+        except FlightTimeout:
+            return await self.get_response(request)
+        if not shared:
+            return response
+        return _thaw(frozen) if frozen is not None else await self.get_response(request)
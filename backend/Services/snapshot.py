@@ -0,0 +1,242 @@
+# backend/Services/snapshot.py
+"""
+In-process, array-backed snapshot of active services.
+
+Keeps one NumPy column per attribute (struct-of-arrays) so distance and
+radius queries run as a single batched operation over every service instead
+of a Python loop over ORM objects. The snapshot is loaded lazily, patched
+row-by-row from model signals (see signals.py) and fully reloaded once it is
+older than ``SERVICE_SNAPSHOT_MAX_AGE`` seconds, which bounds staleness when
+several worker processes each hold their own copy.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.db.models import Max, Min, Q
+
+from .geo import EARTH_RADIUS_KM, bounding_box
+from .models import Overview
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy is optional, callers fall back to the ORM
+    np = None
+
+
+DEFAULT_MAX_AGE = 300  # seconds
+
+
+class ServiceSnapshot:
+    """
+    Columnar copy of (id, lat, lng, category id, min price, rating, max price,
+    min delivery days) per active service.
+    """
+
+    COLUMNS = {
+        'id': 'int64',
+        'lat': 'float64',
+        'lng': 'float64',
+        'category_id': 'int64',
+        'min_price': 'float64',   # NaN when the service has no packages
+        'rating': 'float64',
+        'max_price': 'float64',   # NaN when the service has no packages
+        'min_delivery': 'float64',  # days, NaN when the service has no packages
+    }
+
+    def __init__(self, capacity=1024):
+        self._lock = threading.RLock()
+        self._size = 0
+        self._pos = {}            # overview id -> row index
+        self._columns = {name: np.empty(capacity, dtype) for name, dtype in self.COLUMNS.items()}
+        self._listeners = []
+        self.version = 0
+        self.loaded_at = None
+
+    def __len__(self):
+        return self._size
+
+    def __contains__(self, overview_id):
+        return overview_id in self._pos
+
+    def subscribe(self, callback):
+        """Call ``callback(overview_id)`` whenever a row is patched or removed."""
+        self._listeners.append(callback)
+
+    def unsubscribe(self, callback):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def _notify(self, overview_id):
+        for callback in self._listeners:
+            callback(overview_id)
+
+    def position(self, overview_id):
+        """Row index of a service, or None when it is not in the snapshot."""
+        return self._pos.get(overview_id)
+
+    def column(self, name):
+        """Live view of one column, trimmed to the current size."""
+        return self._columns[name][:self._size]
+
+    # ────── Loading ──────
+    @staticmethod
+    def _rows(condition):
+        return (
+            Overview.objects.filter(condition, is_active=True)
+            .annotate(
+                min_price=Min('packages__price'),
+                max_price=Max('packages__price'),
+                min_delivery=Min('packages__delivery_time'),
+            )
+            .values_list(
+                'id', 'location_lat', 'location_lng', 'category_id', 'min_price', 'overall_rating',
+                'max_price', 'min_delivery',
+            )
+        )
+
+    def load(self):
+        rows = list(self._rows(Q(location_lat__isnull=False, location_lng__isnull=False)))
+        with self._lock:
+            self._size = 0
+            self._pos = {}
+            self._reserve(len(rows))
+            for row in rows:
+                self._write(self._append_slot(row[0]), row)
+            self.version += 1
+            self.loaded_at = time.monotonic()
+        return self
+
+    def refresh(self, overview_id):
+        """Re-read one service from the database and patch it in (or out)."""
+        row = self._rows(Q(pk=overview_id, location_lat__isnull=False, location_lng__isnull=False)).first()
+        if row is None:
+            self.remove(overview_id)
+        else:
+            self.upsert(row)
+
+    def upsert(self, row):
+        with self._lock:
+            index = self._pos.get(row[0])
+            if index is None:
+                index = self._append_slot(row[0])
+            self._write(index, row)
+            self.version += 1
+            self._notify(row[0])
+
+    def remove(self, overview_id):
+        with self._lock:
+            index = self._pos.pop(overview_id, None)
+            if index is None:
+                return
+            last = self._size - 1
+            if index != last:
+                # Swap the last row into the hole to keep the arrays dense
+                for column in self._columns.values():
+                    column[index] = column[last]
+                self._pos[int(self._columns['id'][index])] = index
+            self._size = last
+            self.version += 1
+            self._notify(overview_id)
+
+    def _append_slot(self, overview_id):
+        self._reserve(self._size + 1)
+        index = self._size
+        self._pos[overview_id] = index
+        self._size += 1
+        return index
+
+    def _reserve(self, needed):
+        capacity = len(self._columns['id'])
+        if needed <= capacity:
+            return
+        new_capacity = max(needed, capacity * 2)
+        for name, column in self._columns.items():
+            grown = np.empty(new_capacity, column.dtype)
+            grown[:self._size] = column[:self._size]
+            self._columns[name] = grown
+
+    def _write(self, index, row):
+        overview_id, lat, lng, category_id, min_price, rating, max_price, min_delivery = row
+        cols = self._columns
+        cols['id'][index] = overview_id
+        cols['lat'][index] = lat
+        cols['lng'][index] = lng
+        cols['category_id'][index] = category_id
+        cols['min_price'][index] = np.nan if min_price is None else float(min_price)
+        cols['rating'][index] = float(rating or 0)
+        cols['max_price'][index] = np.nan if max_price is None else float(max_price)
+        cols['min_delivery'][index] = np.nan if min_delivery is None else float(min_delivery)
+
+    # ────── Queries ──────
+    def distances(self, lat, lng, rows=None):
+        """Haversine distance in km from a point to every row (or to ``rows``)."""
+        lats = self.column('lat')
+        lngs = self.column('lng')
+        if rows is not None:
+            lats, lngs = lats[rows], lngs[rows]
+        return haversine_km(lat, lng, lats, lngs)
+
+    def within_radius(self, lat, lng, radius_km, mask=None):
+        """
+        Ids and distances of services within ``radius_km``, nearest first.
+
+        ``mask`` optionally restricts the search to rows where it is True.
+        """
+        with self._lock:
+            min_lat, min_lng, max_lat, max_lng = bounding_box(lat, lng, radius_km)
+            lats, lngs = self.column('lat'), self.column('lng')
+            candidates = (lats >= min_lat) & (lats <= max_lat) & (lngs >= min_lng) & (lngs <= max_lng)
+            if mask is not None:
+                candidates &= mask
+            rows = np.flatnonzero(candidates)
+
+            dist = self.distances(lat, lng, rows)
+            inside = dist <= radius_km
+            rows, dist = rows[inside], dist[inside]
+            order = np.argsort(dist, kind='stable')
+            return self.column('id')[rows[order]].tolist(), dist[order].tolist()
+
+
+def haversine_km(lat, lng, lats, lngs):
+    """Vectorised haversine from one point to arrays of points."""
+    lat1, lng1 = np.radians(lat), np.radians(lng)
+    lat2, lng2 = np.radians(lats), np.radians(lngs)
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+# ────── Process-wide instance ──────
+_snapshot = None
+_snapshot_lock = threading.Lock()
+
+
+def get_snapshot():
+    """
+    The process-wide snapshot, loaded on first use and reloaded when stale.
+    Returns None when NumPy is not installed.
+    """
+    global _snapshot
+    if np is None:
+        return None
+
+    max_age = getattr(settings, 'SERVICE_SNAPSHOT_MAX_AGE', DEFAULT_MAX_AGE)
+    snapshot = _snapshot
+    if snapshot is not None and time.monotonic() - snapshot.loaded_at < max_age:
+        return snapshot
+
+    with _snapshot_lock:
+        if _snapshot is None or time.monotonic() - _snapshot.loaded_at >= max_age:
+            _snapshot = ServiceSnapshot().load()
+        return _snapshot
+
+
+def service_changed(overview_id):
+    """Signal hook: patch one service into an already-loaded snapshot."""
+    if _snapshot is not None:
+        _snapshot.refresh(overview_id)
+
+
+def service_removed(overview_id):
+    if _snapshot is not None:
+        _snapshot.remove(overview_id)
@@ -1,3 +1,897 @@
-from django.test import TestCase
+import asyncio
+import csv
+import json
+import threading
+from datetime import date, datetime, timezone as dt_timezone
+from decimal import Decimal
+from io import StringIO
+from unittest import mock, skipIf
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils.translation import gettext_lazy
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient, APIRequestFactory, force_authenticate
+from rest_framework_simplejwt.tokens import AccessToken
+from payments.models import Transaction
+from sfa_core.renderers import ORJSONRenderer
+
+from . import geo
+from .autocomplete import Autocomplete
+from .cache import cache_stats, check_shared_cache, reset_stats
+from .clusters import ClusterIndex
+from .filters import filter_services, filter_services_orm
+from .fuzzy import TrigramIndex, trigrams
+from .models import Booking, Category, Description, Overview, Package, Review, ServiceCard, ServiceTag, Tag, parse_tags
+from .nearest import KDTree, NearestServices, to_unit_xyz
+from .search import SearchIndex, tokenize
+from .singleflight import FlightTimeout, SingleFlight, SingleFlightMiddleware, flight
+from .snapshot import ServiceSnapshot, np
+from .utils import haversine_distance
+from .views import esewa_success
+
+
+class GeohashTests(SimpleTestCase):
+    def test_encode_known_points(self):
+        self.assertEqual(geo.encode(57.64911, 10.40744, 11), 'u4pruydqqvj')
+        self.assertEqual(geo.encode(27.7172, 85.3240, 5), 'tuutt')
+
+    def test_covering_cells_contain_every_point_in_radius(self):
+        lat, lng, radius = 27.7, 85.3, 5
+        bbox = geo.bounding_box(lat, lng, radius)
+        cells = geo.covering_cells(*bbox)
+        self.assertLessEqual(len(cells), geo.MAX_COVERING_CELLS)
+
+        for i in range(40):
+            for j in range(40):
+                p_lat = bbox[0] + (bbox[2] - bbox[0]) * i / 39
+                p_lng = bbox[1] + (bbox[3] - bbox[1]) * j / 39
+                if haversine_distance(lat, lng, p_lat, p_lng) <= radius:
+                    code = geo.encode(p_lat, p_lng)
+                    self.assertTrue(any(code.startswith(c) for c in cells), (p_lat, p_lng))
+
+    def test_bounding_box_at_pole_spans_all_longitudes(self):
+        min_lat, min_lng, max_lat, max_lng = geo.bounding_box(89.99, 0, 10)
+        self.assertEqual((min_lng, max_lng), (-180.0, 180.0))
+        self.assertEqual(max_lat, 90.0)
+
+
+@skipIf(np is None, "numpy not installed")
+class ServiceSnapshotTests(SimpleTestCase):
+    def setUp(self):
+        self.snapshot = ServiceSnapshot(capacity=2)
+        self.snapshot.loaded_at = 0
+        for row in [
+            (1, 27.7150, 85.3123, 1, 500, 4.5, 500, 3),      # Thamel
+            (2, 27.6710, 85.4298, 1, None, 0, None, None),  # Bhaktapur
+            (3, 28.2096, 83.9856, 2, 800, 5.0, 800, 3),      # Pokhara
+        ]:
+            self.snapshot.upsert(row)
+
+    def test_within_radius_sorts_by_distance(self):
+        ids, distances = self.snapshot.within_radius(27.7172, 85.3240, 15)
+        self.assertEqual(ids, [1, 2])
+        self.assertAlmostEqual(distances[0], haversine_distance(27.7172, 85.3240, 27.7150, 85.3123), places=6)
+
+    def test_upsert_and_remove_patch_rows_in_place(self):
+        self.snapshot.upsert((2, 28.2000, 83.9800, 1, 300, 3.0, 300, 3))
+        self.snapshot.remove(1)
+        self.assertNotIn(1, self.snapshot)
+        self.assertEqual(len(self.snapshot), 2)
+        ids, _ = self.snapshot.within_radius(28.2096, 83.9856, 5)
+        self.assertEqual(sorted(ids), [2, 3])
+
+
+@skipIf(np is None, "numpy not installed")
+class NearestServicesTests(SimpleTestCase):
+    def test_kdtree_matches_brute_force(self):
+        rng = np.random.default_rng(7)
+        points = to_unit_xyz(rng.uniform(26, 31, 2000), rng.uniform(80, 89, 2000))
+        tree = KDTree(points, leaf_size=8)
+        for query in points[:20] + 0.001:
+            expected = np.argsort(np.linalg.norm(points - query, axis=1))[:5].tolist()
+            self.assertEqual([row for _, row in tree.query(query, 5)], expected)
+
+    def test_overlay_sees_rows_changed_after_build(self):
+        snapshot = ServiceSnapshot()
+        snapshot.upsert((1, 27.7150, 85.3123, 1, 500, 4.5, 500, 3))
+        snapshot.upsert((2, 28.2096, 83.9856, 1, 800, 5.0, 800, 3))
+        index = NearestServices(snapshot)
+
+        snapshot.upsert((3, 27.7170, 85.3230, 1, 300, 4.0, 300, 3))    # new, closest
+        snapshot.upsert((1, 26.4525, 87.2718, 1, 500, 4.5, 500, 3))    # moved to Biratnagar
+        ids, distances = index.nearest(27.7172, 85.3240, 2)
+        self.assertEqual(ids, [3, 2])
+        self.assertLess(distances[0], 0.2)
+
+        ids, _ = index.nearest(27.7172, 85.3240, 5, max_price=400)
+        self.assertEqual(ids, [3])
+        ids, _ = index.nearest(27.7172, 85.3240, 5, max_distance=50)
+        self.assertEqual(ids, [3])
+
+
+@skipIf(np is None, "numpy not installed")
+class ClusterIndexTests(SimpleTestCase):
+    def test_incremental_updates_match_a_fresh_build(self):
+        snapshot = ServiceSnapshot()
+        rng = np.random.default_rng(3)
+        for i in range(300):
+            snapshot.upsert((i, rng.uniform(26.5, 29), rng.uniform(80.5, 88), i % 4, 100, 0, 100, 3))
+        index = ClusterIndex(snapshot)
+
+        for i in range(0, 300, 7):
+            snapshot.upsert((i, 27.7, 85.3, 9, 100, 0, 100, 3))    # moved + recategorised
+        for i in range(1, 300, 11):
+            snapshot.remove(i)                                  # deactivated
+
+        fresh = ClusterIndex(ServiceSnapshot())
+        fresh._load(snapshot.column('id'), snapshot.column('lat'),
+                    snapshot.column('lng'), snapshot.column('category_id'))
+        for precision, level in fresh.levels.items():
+            self.assertEqual(set(index.levels[precision]), set(level))
+            for cell, (count, sum_lat, _, categories) in level.items():
+                self.assertEqual(index.levels[precision][cell][0], count)
+                self.assertAlmostEqual(index.levels[precision][cell][1], sum_lat, places=6)
+                self.assertEqual(+index.levels[precision][cell][3], categories)
+
+    def test_viewport_is_capped(self):
+        snapshot = ServiceSnapshot()
+        snapshot.upsert((1, 27.7, 85.3, 1, 100, 0, 100, 3))
+        precision, clusters = ClusterIndex(snapshot).clusters(-90, -180, 90, 180, zoom=14)
+        self.assertEqual(precision, 1)
+        self.assertEqual(clusters[0]['count'], 1)
+
+
+@skipIf(np is None, "numpy not installed")
+class FilterServicesTests(SimpleTestCase):
+    def setUp(self):
+        self.snapshot = ServiceSnapshot()
+        for row in [
+            (1, 27.7150, 85.3123, 1, 1500, 4.5, 3000, 2),         # Thamel
+            (2, 27.6710, 85.4298, 1, 2500, 4.8, 2500, 1),         # Bhaktapur
+            (3, 27.7172, 85.3240, 2, 800, 3.0, 900, 5),           # Kathmandu
+            (4, 28.2096, 83.9856, 1, 500, 4.9, 500, 1),           # Pokhara
+            (5, 27.7160, 85.3200, 1, None, 5.0, None, None),      # no packages
+        ]:
+            self.snapshot.upsert(row)
+
+    def test_combined_predicates(self):
+        count, ids, distances, _ = filter_services(
+            self.snapshot, max_price=2000, max_delivery=3, min_rating=4,
+            lat=27.7172, lng=85.3240, radius=10, sort='distance',
+        )
+        self.assertEqual((count, ids), (1, [1]))
+        self.assertLess(distances[0], 2)
+
+    def test_facets_ignore_their_own_filter(self):
+        count, ids, _, facets = filter_services(self.snapshot, max_price=2000, category_id=1)
+        self.assertEqual(ids, [4, 1])
+        self.assertEqual(facets['category'], {1: 2, 2: 1})
+        self.assertEqual(facets['max_price'][500], 1)
+        self.assertEqual(facets['max_price'][5000], 3)
+        self.assertEqual(facets['min_rating'][4], 2)
+
+    def test_sort_and_pagination(self):
+        count, ids, _, _ = filter_services(self.snapshot, sort='price', offset=1, limit=2)
+        self.assertEqual((count, ids), (5, [3, 1]))
+
+
+class SearchIndexTests(SimpleTestCase):
+    def setUp(self):
+        self.index = SearchIndex()
+        self.index.add(1, {'title': 'Emergency plumber', 'tags': 'pipes,leaks', 'category': 'Plumbing',
+                           'description': 'Fixing taps and pipes in Kathmandu'})
+        self.index.add(2, {'title': 'House painting', 'tags': 'walls', 'category': 'Painting',
+                           'description': 'We also fix small pipes and leaks'})
+
+    def test_tokenize_drops_stopwords(self):
+        self.assertEqual(tokenize('Fix the TAP in Kathmandu'), ['fix', 'tap', 'kathmandu'])
+
+    def test_title_and_tag_matches_rank_first(self):
+        self.assertEqual([i for i, _ in self.index.search('pipes leaks')], [1, 2])
+        self.assertEqual([i for i, _ in self.index.search('pipes', category='Painting')], [2])
+
+    def test_remove_and_readd(self):
+        self.index.remove(1)
+        self.assertEqual([i for i, _ in self.index.search('plumber')], [])
+        self.assertNotIn('plumber', self.index.postings)
+        self.index.add(2, {'title': 'Plumber', 'tags': '', 'category': 'Plumbing', 'description': ''})
+        self.assertEqual(len(self.index), 1)
+        self.assertEqual([i for i, _ in self.index.search('plumber')], [2])
+
+
+class AutocompleteTests(SimpleTestCase):
+    def setUp(self):
+        self.index = Autocomplete(max_entries=4)
+        self.index._bump(('plumbing', 'category'), 'Plumbing', 0)
+        self.index.set_service(1, 'Emergency plumber', 'Pipes, plumber', 'Plumbing', 5)
+        self.index.set_service(2, 'Pipe fitting', 'pipes', 'Plumbing', 0)
+
+    def test_completions_ranked_by_weight(self):
+        self.assertEqual(
+            [(text, kind) for text, kind, _ in self.index.complete('p', k=3)],
+            [('Plumbing', 'category'), ('Pipes', 'tag'), ('plumber', 'tag')],
+        )
+        self.assertEqual(self.index.complete('EMER'), [('Emergency plumber', 'title', 6)])
+        self.assertEqual(self.index.complete('zz'), [])
+
+    def test_incremental_update_and_removal(self):
+        self.index.complete('p')                  # fill the prefix cache
+        self.index.remove_service(1)
+        self.assertEqual([t for t, _, _ in self.index.complete('p')], ['Plumbing', 'Pipes'])
+        self.index.set_service(2, 'Pipe fitting', '', 'Plumbing', 0)
+        self.assertEqual([t for t, _, _ in self.index.complete('p')], ['Plumbing'])
+
+    def test_memory_cap_keeps_categories(self):
+        for i in range(10):
+            self.index.set_service(100 + i, f'Title {i}', f'tag{i}', 'Plumbing', i)
+        self.assertLessEqual(len(self.index), 4 * 1.1)
+        self.assertIn(('plumbing', 'category'), self.index.keys)
+
+    def test_memory_cap_bounds_weights_and_contributions(self):
+        for i in range(50):
+            self.index.set_service(100 + i, f'Title {i}', f'tag{i}', 'Plumbing', i)
+        self.assertLessEqual(len(self.index.weights), 4 * 1.1)
+        self.assertLessEqual(len(self.index.display), 4 * 1.1)
+        for _, entries in self.index._services.values():
+            self.assertTrue(set(entries) <= self.index.weights.keys())
+        # A forgotten tag comes back with its service's next contribution
+        self.assertNotIn(('pipes', 'tag'), self.index.weights)
+        self.index.set_service(2, 'Pipe fitting', 'pipes', 'Plumbing', 99)
+        self.assertIn(('pipes', 'tag', 100), self.index.complete('pipes'))
+
+
+class TrigramIndexTests(SimpleTestCase):
+    def setUp(self):
+        self.index = TrigramIndex()
+        self.index.add('service', 1, 'Emergency plumber Kathmandu')
+        self.index.add('service', 2, 'Licensed electrician')
+        self.index.add('skill', 1, 'Plumbing')
+        self.index.add('user', 7, 'ram_plumber')
+
+    def test_trigrams_are_padded(self):
+        self.assertEqual(trigrams('tap'), {'  t', ' ta', 'tap', 'ap '})
+
+    def test_misspellings_match(self):
+        self.assertEqual(self.index.search('plumer', kinds=('service',))[0][:2], ('service', 1))
+        self.assertEqual(self.index.search('electrisian', kinds=('service',))[0][:2], ('service', 2))
+        self.assertEqual(self.index.search('xyzzy'), [])
+
+    def test_threshold_and_cap(self):
+        self.assertEqual(len(self.index.search('plumer', limit=1)), 1)
+        self.assertEqual(self.index.search('plumer', threshold=0.99), [])
+
+    def test_remove_drops_vocabulary(self):
+        self.index.remove('service', 2)
+        self.assertNotIn('electrician', self.index.words)
+        self.assertEqual(self.index.search('electrisian'), [])
+
+
+class SingleFlightTests(SimpleTestCase):
+    def test_concurrent_threads_share_one_call(self):
+        flight, release, calls, results = SingleFlight(), threading.Event(), [], []
+
+        def slow():
+            calls.append(1)
+            release.wait(5)
+            return 'rows'
+
+        threads = [threading.Thread(target=lambda: results.append(flight.do('k', slow, timeout=5))) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        while flight.stats()['coalesced'] < 4:
+            threading.Event().wait(0.001)
+        release.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(sorted(results), [('rows', False)] + [('rows', True)] * 4)
+        self.assertEqual(flight.stats(), {'flights': 1, 'coalesced': 4, 'timeouts': 0, 'errors': 0})
+
+    def test_errors_reach_waiters_and_waiters_time_out(self):
+        flight, started, release = SingleFlight(), threading.Event(), threading.Event()
+        outcome = {}
+
+        def failing():
+            started.set()
+            release.wait(5)
+            raise ValueError('boom')
+
+        def waiter(name, timeout, fn=lambda: None):
+            try:
+                flight.do('k', fn, timeout=timeout)
+            except Exception as exc:
+                outcome[name] = type(exc)
+
+        leader = threading.Thread(target=waiter, args=('leader', None, failing))
+        leader.start()
+        started.wait(5)
+        waiters = [threading.Thread(target=waiter, args=args) for args in (('patient', 5), ('hasty', 0.01))]
+        for thread in waiters:
+            thread.start()
+        waiters[1].join()
+        release.set()
+        for thread in (leader, waiters[0]):
+            thread.join()
+        self.assertEqual(outcome, {'hasty': FlightTimeout, 'patient': ValueError, 'leader': ValueError})
+        self.assertEqual(flight.stats()['timeouts'], 1)
+
+    def test_asyncio_tasks_share_one_call(self):
+        flight, calls = SingleFlight(), []
+
+        async def query():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return 42
+
+        async def main():
+            return await asyncio.gather(*(flight.do_async('k', query, timeout=1) for _ in range(10)))
+
+        results = asyncio.run(main())
+        self.assertEqual(len(calls), 1)
+        self.assertEqual([r for r, _ in results], [42] * 10)
+        self.assertEqual(flight.stats()['coalesced'], 9)
+
+    def test_middleware_keeps_conditional_requests_apart(self):
+        calls, release, responses = [], threading.Event(), {}
+
+        def view(request):
+            calls.append(request.headers.get('If-None-Match'))
+            release.wait(5)
+            return HttpResponse(status=304) if 'If-None-Match' in request.headers else HttpResponse(b'[]')
+
+        middleware, factory, url = SingleFlightMiddleware(view), RequestFactory(), reverse('service_list_api')
+        requests = [factory.get(url, HTTP_IF_NONE_MATCH='"v1"'), factory.get(url), factory.get(url)]
+        threads = [threading.Thread(target=lambda i=i: responses.__setitem__(i, middleware(requests[i])))
+                   for i in range(3)]
+        flight.reset_stats()
+        for thread in threads[:2]:
+            thread.start()
+        for _ in range(5000):
+            if len(calls) >= 2:
+                break
+            threading.Event().wait(0.001)
+        threads[2].start()
+        for _ in range(5000):
+            if flight.stats()['coalesced']:
+                break
+            threading.Event().wait(0.001)
+        release.set()
+        for thread in threads:
+            thread.join()
+        self.assertCountEqual(calls, ['"v1"', None])
+        self.assertEqual([responses[i].status_code for i in range(3)], [304, 200, 200])
+        self.assertEqual(responses[2].content, b'[]')
+
+
+@override_settings(SERVICE_SNAPSHOT_MAX_AGE=0, SERVICE_SEARCH_MAX_AGE=0)
+class NearbyServicesApiTests(TestCase):
+    def setUp(self):
+        caches['services'].clear()     # cached API responses are keyed by URL
+        self.client = APIClient()
+        user = get_user_model().objects.create_user(username='raju', password='StrongPass123')
+        category = Category.objects.create(name='Plumbing')
+        self.near = Overview.objects.create(
+            user=user, category=category, titleOverview='Thamel plumber',
+            location_lat=27.7150, location_lng=85.3123,
+        )
+        self.far = Overview.objects.create(
+            user=user, category=category, titleOverview='Pokhara plumber',
+            location_lat=28.2096, location_lng=83.9856,
+        )
+
+    def test_save_keeps_geohash_in_sync(self):
+        self.assertEqual(self.near.geohash, geo.encode(27.7150, 85.3123))
+        self.near.location_lat, self.near.location_lng = 28.2096, 83.9856
+        self.near.save(update_fields=['location_lat', 'location_lng'])
+        self.near.refresh_from_db()
+        self.assertEqual(self.near.geohash, geo.encode(28.2096, 83.9856))
+
+    def test_radius_search_returns_only_nearby_services(self):
+        res = self.client.get('/api/nearby/', {'lat': 27.7172, 'lng': 85.3240, 'radius': 5})
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual([s['id'] for s in res.data], [self.near.id])
+
+    def test_nearest_returns_k_closest_with_filters(self):
+        Package.objects.create(
+            overview=self.far, package_type='basic', title='Visit', description='One visit',
+            delivery_time=1, revisions='1', price=400,
+        )
+        res = self.client.get('/api/nearest/', {'lat': 27.7172, 'lng': 85.3240, 'k': 2})
+        self.assertEqual([s['id'] for s in res.data], [self.near.id, self.far.id])
+
+        res = self.client.get('/api/nearest/', {'lat': 27.7172, 'lng': 85.3240, 'max_price': 500})
+        self.assertEqual([s['id'] for s in res.data], [self.far.id])
+        self.assertEqual(res.data[0]['packages'][0]['price'], 400)
+
+    def test_clusters_for_viewport(self):
+        params = {'min_lat': 26, 'min_lng': 80, 'max_lat': 31, 'max_lng': 89, 'zoom': 6}
+        res = self.client.get('/api/clusters/', params)
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(sum(c['count'] for c in res.data['clusters']), 2)
+        self.assertEqual(res.data['clusters'][0]['top_categories'][0]['name'], 'Plumbing')
+
+    def test_full_text_search(self):
+        res = self.client.get('/api/search/', {'q': 'pokhara'})
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.data['count'], 1)
+        self.assertEqual(res.data['results'][0]['id'], self.far.id)
+        self.assertIn('score', res.data['results'][0])
+
+    def test_fuzzy_search_tolerates_typos(self):
+        res = self.client.get('/api/search/fuzzy/', {'q': 'plumer'})
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual({s['id'] for s in res.data['services']}, {self.near.id, self.far.id})
+
+        res = self.client.get('/api/search/', {'q': 'pokara'})
+        self.assertTrue(res.data['fuzzy'])
+        self.assertEqual(res.data['results'][0]['id'], self.far.id)
+
+    def test_autocomplete(self):
+        res = self.client.get('/api/autocomplete/', {'q': 'plu'})
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.data['suggestions'][0], {'text': 'Plumbing', 'kind': 'category', 'weight': 2})
+
+
+    def test_filter_engine_matches_orm_fallback(self):
+        Package.objects.create(
+            overview=self.near, package_type='basic', title='Visit', description='One visit',
+            delivery_time=2, revisions='1', price=1500,
+        )
+        criteria = {'max_price': 2000, 'max_delivery': 3, 'lat': 27.7172, 'lng': 85.3240, 'radius': 10}
+        res = self.client.get('/api/filter/', criteria)
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.data['count'], 1)
+        self.assertEqual(res.data['results'][0]['id'], self.near.id)
+        self.assertEqual(res.data['facets']['categories'], [{'id': self.near.category_id, 'name': 'Plumbing', 'count': 1}])
+
+        count, ids, _, facets = filter_services_orm(**criteria)
+        self.assertEqual((count, ids), (1, [self.near.id]))
+        self.assertEqual(facets['max_price'][2000], 1)
+
+class ServiceTagTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        user = get_user_model().objects.create_user(username='tagger', password='pass')
+        plumbing = Category.objects.create(name='Plumbing')
+        cleaning = Category.objects.create(name='Cleaning')
+        self.a = Overview.objects.create(user=user, category=plumbing, titleOverview='A', search_tags='Plumber, Kathmandu')
+        self.b = Overview.objects.create(user=user, category=plumbing, titleOverview='B', search_tags='plumber,cheap')
+        self.c = Overview.objects.create(user=user, category=cleaning, titleOverview='C', search_tags='kathmandu')
+
+    def test_parse_tags_normalises(self):
+        self.assertEqual(parse_tags(' Fast ,  fast,Home  Repair,,'), ['fast', 'home repair'])
+
+    def test_save_syncs_tag_relations(self):
+        self.assertEqual(sorted(self.a.tags.values_list('name', flat=True)), ['kathmandu', 'plumber'])
+        self.a.search_tags = 'plumber, pokhara'
+        self.a.save(update_fields=['search_tags'])
+        self.assertEqual(sorted(self.a.tags.values_list('name', flat=True)), ['plumber', 'pokhara'])
+        self.assertEqual(Tag.objects.filter(name='plumber').count(), 1)
+        self.assertEqual(ServiceTag.objects.count(), 5)
+
+    def test_facet_counts(self):
+        res = self.client.get('/api/facets/', {'tag': 'kathmandu'})
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.data['count'], 2)
+        self.assertEqual({s['id'] for s in res.data['results']}, {self.a.id, self.c.id})
+        self.assertEqual(res.data['facets']['tags'][0], {'name': 'kathmandu', 'count': 2})
+        self.assertEqual(res.data['facets']['categories'], [
+            {'name': 'Cleaning', 'count': 1}, {'name': 'Plumbing', 'count': 1},
+        ])
+
+        res = self.client.get('/api/facets/?tag=plumber&tag=Kathmandu')
+        self.assertEqual([s['id'] for s in res.data['results']], [self.a.id])
+
+
+class ServiceListApiTests(TestCase):
+    def setUp(self):
+        caches['services'].clear()     # cached API responses are keyed by URL
+        self.client = APIClient()
+        user = get_user_model().objects.create_user(username='lister', password='pass')
+        category = Category.objects.create(name='Tutoring')
+        self.services = [
+            Overview.objects.create(user=user, category=category, titleOverview=f'Service {i}')
+            for i in range(5)
+        ]
+        for service in self.services:
+            Package.objects.create(
+                overview=service, package_type='basic', title='Hour', description='One hour',
+                delivery_time=1, revisions='0', price=500,
+            )
+
+    def test_cursor_pages_cover_every_service_once(self):
+        seen, url, params = [], '/api/', {'page_size': 2}
+        while url:
+            with self.assertNumQueries(1):      # one read of the card table, no joins
+                res = self.client.get(url, params)
+            seen += [s['id'] for s in res.data['results']]
+            url, params = res.data['next'], None
+        self.assertEqual(seen, sorted((s.id for s in self.services), reverse=True))
+
+    def test_sparse_fieldset_skips_packages(self):
+        with self.assertNumQueries(1):
+            res = self.client.get('/api/', {'fields': 'id,titleOverview'})
+        self.assertEqual(set(res.data['results'][0]), {'id', 'titleOverview'})
+        self.assertEqual(self.client.get('/api/', {'fields': 'id,secret'}).status_code, 400)
+
+
+class ServiceCardTests(TestCase):
+    def setUp(self):
+        User = get_user_model()
+        self.seller = User.objects.create_user(username='carder', password='pass')
+        self.buyer = User.objects.create_user(username='buyer', password='pass')
+        self.category = Category.objects.create(name='Painting')
+        self.service = Overview.objects.create(user=self.seller, category=self.category, titleOverview='Wall paint')
+        self.package = Package.objects.create(
+            overview=self.service, package_type='standard', title='Room', description='One room',
+            delivery_time=3, revisions='1', price=2500,
+        )
+        Package.objects.create(
+            overview=self.service, package_type='basic', title='Wall', description='One wall',
+            delivery_time=1, revisions='0', price=800,
+        )
+
+    def card(self):
+        return ServiceCard.objects.get(pk=self.service.pk)
+
+    def test_signals_keep_card_in_sync(self):
+        card = self.card()
+        self.assertEqual((card.title, card.provider_name, card.category_name), ('Wall paint', 'carder', 'Painting'))
+        self.assertEqual((card.min_price, card.min_delivery, len(card.packages)), (800, 1, 2))
+
+        Review.objects.create(service=self.service, user=self.buyer, rating=4, comment='Neat job')
+        self.category.name = 'Decorating'
+        self.category.save()
+        self.seller.username = 'painter'
+        self.seller.save()
+        self.package.delete()
+        card = self.card()
+        self.assertEqual((str(card.overall_rating), card.rating_count), ('4.00', 1))
+        self.assertEqual((card.category_name, card.provider_name), ('Decorating', 'painter'))
+        self.assertEqual((card.min_price, card.min_delivery, len(card.packages)), (800, 1, 1))
+
+        self.service.delete()
+        self.assertFalse(ServiceCard.objects.exists())
+
+    def test_rebuild_matches_signals(self):
+        expected = list(ServiceCard.objects.values())
+        ServiceCard.objects.all().delete()
+        call_command('rebuild_service_cards', stdout=StringIO())
+        self.assertEqual(list(ServiceCard.objects.values()), expected)
+
+    def test_user_orders_reads_cards(self):
+        Booking.objects.create(buyer=self.buyer, overview=self.service, package=self.package, preferred_date='2026-01-05')
+        client = APIClient()
+        client.force_authenticate(self.buyer)
+        with self.assertNumQueries(2):
+            res = client.get('/api/orders/')
+        self.assertEqual(res.data[0]['provider'], 'carder')
+        self.assertEqual((res.data[0]['package'], res.data[0]['price']), ('Standard', 2500.0))
+
+
+class ReviewAggregateTests(TestCase):
+    def setUp(self):
+        caches['services'].clear()     # detail documents are cached by id
+        User = get_user_model()
+        seller = User.objects.create_user(username='rated', password='pass')
+        self.buyers = [User.objects.create_user(username=f'buyer{i}', password='pass') for i in range(3)]
+        self.service = Overview.objects.create(
+            user=seller, category=Category.objects.create(name='Repairs'), titleOverview='Fix it',
+        )
+
+    def review(self, buyer, rating):
+        return Review.objects.create(service=self.service, user=buyer, rating=rating, comment='Great work done')
+
+    def test_create_edit_delete_adjust_aggregates(self):
+        first = self.review(self.buyers[0], 5)
+        self.review(self.buyers[1], 4)
+        self.service.refresh_from_db()
+        self.assertEqual((self.service.rating_sum, self.service.rating_count), (9, 2))
+        self.assertEqual(str(self.service.overall_rating), '4.50')
+
+        first.rating = 2
+        first.save()
+        self.service.refresh_from_db()
+        self.assertEqual(self.service.rating_histogram, {1: 0, 2: 1, 3: 0, 4: 1, 5: 0})
+        self.assertEqual(str(self.service.overall_rating), '3.00')
+
+        Review.objects.filter(pk=first.pk).delete()
+        self.service.refresh_from_db()
+        self.assertEqual((self.service.rating_sum, self.service.rating_count), (4, 1))
+        self.assertEqual(str(self.service.overall_rating), '4.00')
+
+    def test_rebuild_matches_incremental(self):
+        for buyer, rating in zip(self.buyers, (3, 4, 4)):
+            self.review(buyer, rating)
+        Overview.objects.filter(pk=self.service.pk).update(rating_sum=0, rating_count=0, rating_4=0)
+        self.service.refresh_from_db()
+        self.service.update_rating()
+        self.assertEqual((self.service.rating_sum, self.service.rating_count, self.service.rating_4), (11, 3, 2))
+        self.assertEqual(str(self.service.overall_rating), '3.67')
+
+    def test_detail_reads_stored_rating_without_writing(self):
+        self.review(self.buyers[0], 4)
+        with CaptureQueriesContext(connection) as queries:
+            res = APIClient().get(f'/api/{self.service.pk}/')
+        self.assertEqual((res.data['overall_rating'], res.data['rating_count']), (4.0, 1))
+        self.assertFalse([q for q in queries if q['sql'].startswith('UPDATE')])
+
+
+@override_settings(HTTP_CACHE_MAX_AGE=0, HTTP_CACHE_STALE_TTL=0)     # exercise the document layer only
+class ServiceDocumentCacheTests(TestCase):
+    def setUp(self):
+        caches['services'].clear()
+        reset_stats()
+        user = get_user_model().objects.create_user(username='cached', password='pass')
+        self.service = Overview.objects.create(
+            user=user, category=Category.objects.create(name='Moving'), titleOverview='Van hire',
+        )
+        self.url = f'/api/{self.service.pk}/'
+
+    def test_deploy_check_wants_a_shared_cache(self):
+        self.assertEqual([w.id for w in check_shared_cache()], ['services.W001'])
+        redis = {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://cache:6379/1'}
+        with override_settings(CACHES={**settings.CACHES, 'services': redis}):
+            self.assertEqual(check_shared_cache(), [])
+
+    def test_read_through_then_hits(self):
+        with self.assertNumQueries(3):      # overview + provider, description, packages
+            first = APIClient().get(self.url)
+        with self.assertNumQueries(0):
+            second = APIClient().get(self.url)
+        self.assertEqual(first.data, second.data)
+        self.assertEqual(first.data['description'], 'No description available')
+        self.assertEqual(cache_stats(), {'hits': 1, 'misses': 1, 'hit_rate': 0.5})
+
+    def test_related_writes_bump_the_version(self):
+        APIClient().get(self.url)
+        with self.captureOnCommitCallbacks(execute=True):
+            Package.objects.create(
+                overview=self.service, package_type='basic', title='Half day', description='Four hours',
+                delivery_time=1, revisions='0', price=3000,
+            )
+        res = APIClient().get(self.url)
+        self.assertEqual([p['price'] for p in res.data['packages']], [3000.0])
+        self.assertEqual(cache_stats()['misses'], 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.service.delete()
+        self.assertEqual(APIClient().get(self.url).status_code, 404)
+
+    def test_bulk_documents_use_fixed_queries(self):
+        others = [
+            Overview.objects.create(user=self.service.user, category=self.service.category, titleOverview=f'Truck {i}')
+            for i in range(4)
+        ]
+        for other in others:
+            Description.objects.create(overview=other, description=f'About {other.titleOverview}')
+        ids = [other.pk for other in others] + [self.service.pk, 999999]
+        with self.assertNumQueries(3):      # overviews + providers, packages, descriptions
+            res = APIClient().get('/api/bulk/', {'ids': ','.join(map(str, ids))})
+        self.assertEqual([d['id'] for d in res.data['results']], ids[:-1])
+        self.assertEqual(res.data['results'][0]['description'], 'About Truck 0')
+        self.assertEqual(res.data['missing'], [999999])
+        with self.assertNumQueries(1):      # only the still-missing id is looked up
+            APIClient().get('/api/bulk/', {'ids': ','.join(map(str, ids))})
+
+        too_many = ','.join(str(i) for i in range(1, 102))
+        self.assertEqual(APIClient().get('/api/bulk/', {'ids': too_many}).status_code, 400)
+
+
+class HttpResponseCacheTests(TestCase):
+    def setUp(self):
+        caches['services'].clear()
+        self.client = APIClient()
+        user = get_user_model().objects.create_user(username='etagger', password='pass')
+        self.service = Overview.objects.create(
+            user=user, category=Category.objects.create(name='Catering'), titleOverview='Momo party',
+            location_lat=27.7150, location_lng=85.3123,
+        )
+
+    def test_etag_and_304(self):
+        first = self.client.get(f'/api/{self.service.pk}/')
+        self.assertEqual(first['X-Cache'], 'MISS')
+        with self.assertNumQueries(0):
+            again = self.client.get(f'/api/{self.service.pk}/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual((again.status_code, again['ETag']), (304, first['ETag']))
+
+    def test_nearby_key_normalises_params(self):
+        self.client.get('/api/nearby/', {'lat': 27.71721, 'lng': 85.32404, 'radius': 5})
+        res = self.client.get('/api/nearby/', {'radius': '5.0', 'lng': 85.32398, 'lat': 27.71719, '_': 123})
+        self.assertEqual(res['X-Cache'], 'HIT')
+        self.assertEqual([s['id'] for s in res.data], [self.service.id])
+
+    def test_stale_while_revalidate_refreshes_once(self):
+        url = f'/api/{self.service.pk}/'
+        etag = self.client.get(url)['ETag']
+        jobs = []
+        with mock.patch('services.http_cache.submit_refresh', jobs.append), \
+                self.captureOnCommitCallbacks(execute=True):
+            self.service.titleOverview = 'Momo feast'
+            self.service.save()
+        with mock.patch('services.http_cache.submit_refresh', jobs.append):
+            stale = [self.client.get(url) for _ in range(3)]
+        self.assertEqual([r['X-Cache'] for r in stale], ['STALE'] * 3)
+        self.assertEqual((stale[0]['ETag'], stale[0].data['titleOverview']), (etag, 'Momo party'))
+        self.assertEqual(len(jobs), 1)
+
+        jobs[0]()
+        fresh = self.client.get(url)
+        self.assertEqual((fresh['X-Cache'], fresh.data['titleOverview']), ('HIT', 'Momo feast'))
+        self.assertNotEqual(fresh['ETag'], etag)
+
+
+@override_settings(BATCH_MAX_WORKERS=0)     # test transactions are invisible to other threads
+class BatchApiTests(TestCase):
+    def setUp(self):
+        caches['services'].clear()
+        self.buyer = get_user_model().objects.create_user(username='batcher', password='pass')
+        self.service = Overview.objects.create(
+            user=self.buyer, category=Category.objects.create(name='Tailoring'), titleOverview='Kurta stitching',
+        )
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.buyer)}')
+
+    def batch(self, *requests):
+        return self.client.post('/api/batch/', {'requests': list(requests)}, format='json')
+
+    def test_sub_requests_share_one_authentication(self):
+        res = self.batch(
+            {'id': 'detail', 'path': f'/api/{self.service.pk}/'},
+            {'id': 'orders', 'path': '/api/orders/'},
+            {'id': 'list', 'path': '/api/?fields=id', 'query': {'page_size': 1}},
+            {'id': 'nope', 'path': '/api/does-not-exist/'},
+            {'id': 'write', 'path': '/api/book/', 'method': 'POST'},
+        )
+        self.assertEqual(res.status_code, 200)
+        by_id = {r['id']: r for r in res.data['responses']}
+        self.assertEqual([r['id'] for r in res.data['responses']], ['detail', 'orders', 'list', 'nope', 'write'])
+        self.assertEqual((by_id['detail']['status'], by_id['detail']['body']['titleOverview']), (200, 'Kurta stitching'))
+        self.assertEqual((by_id['orders']['status'], by_id['orders']['body']), (200, []))
+        self.assertEqual(by_id['list']['body']['results'], [{'id': self.service.pk}])
+        self.assertEqual((by_id['nope']['status'], by_id['write']['status']), (404, 405))
+
+    def test_permissions_apply_per_sub_request(self):
+        self.client.credentials()
+        res = self.batch({'id': 'orders', 'path': '/api/orders/'}, {'id': 'detail', 'path': f'/api/{self.service.pk}/'})
+        self.assertEqual([r['status'] for r in res.data['responses']], [401, 200])
+
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer not-a-token')
+        self.assertEqual(self.batch({'id': 'x', 'path': '/api/'}).status_code, 401)
+
+
+class ListProjectionTests(TestCase):
+    def setUp(self):
+        caches['services'].clear()
+        User = get_user_model()
+        self.seller = User.objects.create_user(username='tailor', password='pass')
+        self.buyer = User.objects.create_user(username='asha', password='pass', is_staff=True)
+        self.service = Overview.objects.create(
+            user=self.seller, category=Category.objects.create(name='Tailoring'), titleOverview='Kurta stitching',
+        )
+        package = Package.objects.create(
+            overview=self.service, package_type='basic', title='One kurta', price=1500, delivery_time=3,
+        )
+        Booking.objects.create(buyer=self.buyer, overview=self.service, package=package, preferred_date='2025-01-05')
+        Booking.objects.create(buyer=self.buyer, overview=self.service, preferred_date='2025-11-30', message='Soon')
+        self.client = APIClient()
+
+    def test_booking_lists_format_dates_in_the_database(self):
+        self.client.force_authenticate(self.seller)
+        with self.assertNumQueries(1):
+            seller_rows = self.client.get('/api/seller/bookings/').json()
+        self.assertEqual(seller_rows[1], {
+            'id': seller_rows[1]['id'], 'customer': 'asha', 'customer_avatar': 'A', 'service': 'Kurta stitching',
+            'package': 'Basic', 'price': 1500.0, 'date': '2025-01-05', 'status': 'pending', 'message': 'No message',
+        })
+        self.assertEqual((seller_rows[0]['price'], seller_rows[0]['date']), (0.0, '2025-11-30'))
+
+        self.client.force_authenticate(self.buyer)
+        orders = self.client.get('/api/orders/').json()
+        self.assertEqual([(o['date'], o['time'], o['package']) for o in orders],
+                         [('2025-11-30', 'Anytime', 'Standard'), ('2025-01-05', 'Anytime', 'Basic')])
+
+        from .views import admin_all_bookings
+        request = APIRequestFactory().get('/api/admin/bookings/')
+        force_authenticate(request, self.buyer)
+        self.assertEqual([(b['date'], b['freelancer'], b['price']) for b in admin_all_bookings(request).data],
+                         [('Nov 30, 2025', 'tailor', 0), ('Jan 05, 2025', 'tailor', 1500.0)])
+
+    def test_review_dates_match_strftime(self):
+        review = Review.objects.create(service=self.service, user=self.buyer, rating=5, comment='Perfect fit, on time')
+        [row] = self.client.get(f'/api/reviews/{self.service.pk}/').json()
+        self.assertEqual(row['created_at'], review.created_at.strftime('%b %d, %Y'))
+        self.assertEqual(row['reviewer'], 'asha')
+
+    def test_orjson_renderer_matches_json_renderer(self):
+        data = {
+            'price': Decimal('12.50'), 'when': datetime(2025, 1, 5, 9, 30, 15, 123456, tzinfo=dt_timezone.utc),
+            'day': date(2025, 1, 5), 'label': gettext_lazy('Service'), 'text': 'नमस्ते ', 'ids': (1, 2),
+        }
+        self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(data))
+        self.assertEqual(ORJSONRenderer().render(None), b'')
+
+
+@override_settings(EXPORT_BATCH_SIZE=2)
+class AdminExportTests(TestCase):
+    def setUp(self):
+        User = get_user_model()
+        self.admin = User.objects.create_user(username='root', password='pass', is_staff=True)
+        seller = User.objects.create_user(username='tailor', password='pass')
+        service = Overview.objects.create(
+            user=seller, category=Category.objects.create(name='Tailoring'), titleOverview='Kurta, stitched',
+        )
+        self.bookings = [
+            Booking.objects.create(buyer=self.admin, overview=service, preferred_date='2025-01-05', status=status)
+            for status in ('pending', 'confirmed', 'pending', 'completed', 'pending')
+        ]
+        Booking.objects.filter(pk=self.bookings[0].pk).update(created_at=datetime(2024, 12, 31, 12, tzinfo=dt_timezone.utc))
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def export(self, name, **params):
+        response = self.client.get(f'/api/admin/export/{name}', params)
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content).decode()
+
+    def test_ndjson_streams_in_keyset_batches(self):
+        with CaptureQueriesContext(connection) as queries:
+            response, body = self.export('bookings.ndjson', status='pending')
+        rows = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        self.assertEqual([r['id'] for r in rows], [self.bookings[i].pk for i in (0, 2, 4)])
+        self.assertEqual((rows[0]['seller'], rows[0]['preferred_date']), ('tailor', '2025-01-05'))
+        # three pending rows in batches of two: two selects, the second one short
+        self.assertEqual(sum('FROM "services_booking"' in q['sql'] for q in queries.captured_queries), 2)
+
+    def test_csv_with_date_range(self):
+        response, body = self.export('bookings.csv', since='2025-01-01')
+        header, *rows = list(csv.reader(StringIO(body)))
+        self.assertEqual(header[:4], ['id', 'buyer', 'seller', 'service_id'])
+        self.assertEqual([int(r[0]) for r in rows], [b.pk for b in self.bookings[1:]])
+        self.assertEqual(rows[0][4], 'Kurta, stitched')
+
+    def test_csv_defuses_formulas(self):
+        Overview.objects.update(titleOverview='=HYPERLINK("http://evil.test")')
+        get_user_model().objects.filter(username='tailor').update(username='@tailor')
+        _, body = self.export('bookings.csv')
+        row = list(csv.reader(StringIO(body)))[1]
+        self.assertEqual((row[2], row[4]), ("'@tailor", '\'=HYPERLINK("http://evil.test")'))
+        self.assertEqual(row[6], '')        # no package price: still an empty cell
+
+    def test_rejects_bad_filters_and_non_admins(self):
+        self.assertEqual(self.client.get('/api/admin/export/bookings.csv', {'status': 'lost'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/admin/export/bookings.csv', {'since': '5 Jan'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/admin/export/bookings.xlsx').status_code, 404)
+        self.assertEqual(self.client.get('/api/admin/export/withdrawals.ndjson').status_code, 200)
+        self.client.force_authenticate(get_user_model().objects.get(username='tailor'))
+        self.assertEqual(self.client.get('/api/admin/export/bookings.csv').status_code, 403)
+
+
+class EsewaBookingCallbackTests(TestCase):
+    def test_redirect_only_records_the_reference(self):
+        User = get_user_model()
+        buyer, seller = User.objects.create_user(username='asha'), User.objects.create_user(username='tailor')
+        txn = Transaction.objects.create(
+            sender=buyer, receiver=seller, package_name='basic_package', amount=Decimal('1500'),
+            service_fee=Decimal('225'), payment_id='TXN-1',
+        )
+        response = esewa_success(RequestFactory().get('/esewa/success/', {'oid': 'TXN-1', 'amt': '1500', 'refId': '000AB'}))
+        self.assertEqual(response.status_code, 302)
+        self.assertIn('pending=true', response.url)
+        txn.refresh_from_db()
+        self.assertEqual((txn.gateway, txn.gateway_ref, txn.payment_status), ('esewa', '000AB', False))
+
+        # A replayed or forged redirect can't swap the reference
+        esewa_success(RequestFactory().get('/esewa/success/', {'oid': 'TXN-1', 'refId': 'forged'}))
+        txn.refresh_from_db()
+        self.assertEqual(txn.gateway_ref, '000AB')
+        self.assertIn('error=true', esewa_success(RequestFactory().get('/esewa/success/', {'oid': 'TXN-1'})).url)
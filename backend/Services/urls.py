@@ -17,7 +17,15 @@ urlpatterns = [
     # === PUBLIC API (REACT FRONTEND) ===
     path('api/', views.service_list, name='service_list_api'),
     path('api/<int:pk>/', views.service_detail, name='service_detail_api'),
+    path('api/bulk/', views.service_bulk_api, name='service_bulk_api'),
     path('api/nearby/', views.nearby_services_api, name='nearby_services_api'),
+    path('api/nearest/', views.nearest_services_api, name='nearest_services_api'),
+    path('api/clusters/', views.service_clusters_api, name='service_clusters_api'),
+    path('api/search/', views.search_services_api, name='search_services_api'),
+    path('api/search/fuzzy/', views.fuzzy_search_api, name='fuzzy_search_api'),
+    path('api/autocomplete/', views.autocomplete_api, name='autocomplete_api'),
+    path('api/facets/', views.service_facets_api, name='service_facets_api'),
+    path('api/filter/', views.filter_services_api, name='filter_services_api'),
     
 
     # === BOOKING API ===
@@ -4,10 +4,10 @@ def haversine_distance(lat1, lon1, lat2, lon2):
     """
     Calculate distance between two points in kilometers
     """
-    lon1, lat1, lon2, lat2 = map(radians, [lon1, lat1, lon2, lat2])
+    lon1, lat1, lon2, lat2 = map(radians, map(float, [lon1, lat1, lon2, lat2]))
     dlon = lon2 - lon1
     dlat = lat2 - lat1
     a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlon/2)**2
     c = 2 * asin(sqrt(a))
     r = 6371  # Radius of earth in kilometers
-    return c * r
\ No newline at end of file
+    return c * r
@@ -5,7 +5,8 @@ from django.http import HttpResponseForbidden
 from django.contrib.auth.decorators import user_passes_test
 from django.db.models import Count, Q, Sum
 from Home.models import UserProfile
-from payments.models import Transaction, SellerAccountBalance, PaymentWithdrawal, Refund_details
+from payments.models import Transaction, PaymentWithdrawal, Refund_details
+from ledger.entries import seller_balance
 from Orders.models import Order
 from services.models import Overview
 
@@ -18,30 +19,23 @@ def Seller_Dashboard(request, username):
     profile = UserProfile.objects.get(user=user)
     services = Overview.objects.filter(user=user)
     orders = Order.objects.filter(seller=user)
-    withdrawals = PaymentWithdrawal.objects.filter(user=user)
 
-    # Earnings per service
-    earnings = {}
-    completed_counts = {}
-    total_orders = {}
-
-    for order in orders:
-        transaction = Transaction.objects.filter(order=order).first()
-        if not transaction:
-            continue
-
-        overview = transaction.overview
-        total_orders[overview] = total_orders.get(overview, 0) + 1
-
-        if order.status == "completed" and transaction:
-            earnings[overview] = earnings.get(overview, 0) + transaction.amount
-            completed_counts[overview] = completed_counts.get(overview, 0) + 1
+    # Orders and earnings per service, one grouped query
+    per_service = {
+        row['service_id']: row
+        for row in orders.filter(transaction__isnull=False).values('service_id').annotate(
+            total=Count('id'),
+            completed=Count('id', filter=Q(status='completed')),
+            earned=Sum('transaction__amount', filter=Q(status='completed')),
+        )
+    }
 
     # Attach to service
     for service in services:
-        service.amount_earned = earnings.get(service, 0)
-        service.order_completed = completed_counts.get(service, 0)
-        service.total_orders = total_orders.get(service, 0)
+        row = per_service.get(service.pk, {})
+        service.amount_earned = row.get('earned') or 0
+        service.order_completed = row.get('completed', 0)
+        service.total_orders = row.get('total', 0)
 
     # Order status counts
     order_counts = orders.aggregate(
@@ -55,18 +49,8 @@ def Seller_Dashboard(request, username):
         cancelled_count=Count('id', filter=Q(status='cancelled'))
     )
 
-    # Calculate balance
-    total_earned = sum(earnings.values())
-    fee = total_earned * 0.1
-    net_earned = total_earned - fee
-
-    withdrawal_total = withdrawals.filter(status='completed').aggregate(Sum('amount'))['amount__sum'] or 0
-    balance = net_earned - withdrawal_total
-
-    # Update or create balance
-    balance_obj, _ = SellerAccountBalance.objects.get_or_create(user=user)
-    balance_obj.balance_amount = balance
-    balance_obj.save()
+    # Running total kept by the ledger (fees and withdrawals already applied)
+    balance = seller_balance(user)
 
     context = {
         'user': user,
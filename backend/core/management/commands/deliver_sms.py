@@ -0,0 +1,40 @@
+# backend/core/management/commands/deliver_sms.py
+"""
+Deliver queued SMS from the outbox (see core/sms.py).
+
+    python manage.py deliver_sms                # run forever
+    python manage.py deliver_sms --once         # one round, e.g. from cron
+
+Several workers may run side by side; each claims its own rows.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from core.sms import deliver_pending, purge_settled
+
+
+class Command(BaseCommand):
+    help = "Send pending outbox SMS in batches, retrying failures with backoff"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Run a single delivery round and exit")
+        parser.add_argument('--batch-size', type=int, default=None)
+        parser.add_argument('--interval', type=float, default=2.0, help="Seconds to sleep when the outbox is idle")
+        parser.add_argument('--purge-days', type=int, default=30, help="Delete settled rows older than this")
+
+    def handle(self, *args, **options):
+        purged = purge_settled(options['purge_days'])
+        if purged:
+            self.stdout.write(f"Purged {purged} settled message(s)")
+
+        while True:
+            close_old_connections()
+            counts = deliver_pending(batch_size=options['batch_size'])
+            if counts:
+                self.stdout.write(', '.join(f"{status}: {n}" for status, n in sorted(counts.items())))
+            if options['once']:
+                break
+            if not counts:
+                time.sleep(options['interval'])
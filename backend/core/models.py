@@ -1,3 +1,42 @@
 from django.db import models
+from django.utils import timezone
 
-# Create your models here.
+
+class SmsMessage(models.Model):
+    """
+    Transactional SMS outbox. Views insert rows inside their own transaction;
+    the ``deliver_sms`` worker sends them (see core/sms.py).
+    """
+    PENDING = 'pending'
+    SENDING = 'sending'
+    SENT = 'sent'
+    DUPLICATE = 'duplicate'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (SENDING, 'Sending'),
+        (SENT, 'Sent'),
+        (DUPLICATE, 'Duplicate'),
+        (FAILED, 'Failed'),
+    ]
+
+    phone = models.CharField(max_length=20)
+    text = models.TextField()
+    # Idempotency key: enqueuing the same key twice keeps the first message
+    key = models.CharField(max_length=100, unique=True, null=True, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    # When the row may next be claimed: retry time while pending, lease expiry while sending
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='sms_due_idx'),
+            models.Index(fields=['phone', 'sent_at'], name='sms_recent_idx'),
+        ]
+
+    def __str__(self):
+        return f"SMS to {self.phone} ({self.status})"
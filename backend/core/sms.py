@@ -0,0 +1,248 @@
+# core/sms.py
+"""
+SMS outbox: enqueue in the request, deliver from a worker.
+
+``send_sms``/``queue_sms`` only INSERT into ``SmsMessage``. Called inside the
+view's ``transaction.atomic()`` block, a message exists exactly when the
+booking or payment it announces does. ``manage.py deliver_sms`` runs
+``deliver_pending`` in a loop, and each round:
+
+* claims up to ``SMS_BATCH_SIZE`` due rows (``select_for_update(skip_locked)``
+  where supported) and leases them for ``LEASE_SECONDS``, so parallel workers
+  never claim the same row and rows held by a crashed worker come back;
+* drops per-phone duplicates: the same text to the same phone in this batch,
+  or already sent within ``SMS_DEDUPE_WINDOW`` seconds;
+* hands the rest to the gateway named by ``SMS_GATEWAY``. Sparrow takes one
+  text for many recipients per call over a pooled keep-alive session;
+* retries failures with exponential backoff and jitter, and gives up after
+  ``SMS_MAX_ATTEMPTS``.
+
+A round never outlives its lease: once another gateway call could run past
+it, the rows not yet sent are handed back as due. Results are written only
+to rows still carrying this round's lease stamp (``next_attempt_at``), so a
+worker that was too slow can't overwrite rows another worker took over.
+"""
+import logging
+import random
+from collections import defaultdict
+from datetime import timedelta
+
+import requests
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from requests.adapters import HTTPAdapter
+
+from .models import SmsMessage
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_GATEWAY = 'core.sms.SparrowGateway'
+DEFAULT_BATCH_SIZE = 100
+DEFAULT_MAX_ATTEMPTS = 6
+DEFAULT_DEDUPE_WINDOW = 600     # seconds
+DEFAULT_TIMEOUT = 5             # seconds per gateway call
+LEASE_SECONDS = 120             # a claimed row is retried if not settled by then
+BACKOFF_BASE = 30               # seconds before the first retry, doubled each attempt
+BACKOFF_MAX = 3600
+
+
+# ────── Enqueueing ──────
+def queue_sms(messages):
+    """
+    Enqueue ``(phone, text)`` or ``(phone, text, key)`` tuples with one INSERT.
+    Blank phones are skipped; a ``key`` already in the outbox is ignored.
+    """
+    rows = []
+    for phone, text, *key in messages:
+        if phone:
+            rows.append(SmsMessage(phone=str(phone).strip(), text=text, key=key[0] if key else None))
+    if rows:
+        SmsMessage.objects.bulk_create(rows, ignore_conflicts=True)
+
+
+def send_sms(phone, text, key=None):
+    queue_sms([(phone, text, key)])
+
+
+# ────── Gateways ──────
+class GatewayError(Exception):
+    def __init__(self, message, retryable=True):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+class SparrowGateway:
+    """Sparrow SMS over one pooled ``requests.Session``; a call carries one text to many numbers."""
+    url = 'https://api.sparrowsms.com/v2/sms/'
+    max_recipients = 100
+
+    def __init__(self):
+        self.session = requests.Session()
+        self.session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=4, max_retries=0))
+        self.timeout = getattr(settings, 'SMS_TIMEOUT', DEFAULT_TIMEOUT)
+
+    def send(self, text, phones):
+        if not getattr(settings, 'SPARROW_SMS_API_KEY', None):
+            logger.info("SMS (no API key) to %s: %s", ','.join(phones), text)
+            return
+        payload = {
+            'token': settings.SPARROW_SMS_API_KEY,
+            'from': getattr(settings, 'SPARROW_SMS_SENDER', None) or 'SFA',
+            'to': ','.join(f'98{phone}' for phone in phones),
+            'text': text,
+        }
+        try:
+            response = self.session.post(self.url, data=payload, timeout=self.timeout)
+        except requests.RequestException as exc:
+            raise GatewayError(str(exc)) from exc
+        if response.status_code >= 400:
+            # Bad token/number won't improve with retries; throttling and outages will
+            retryable = response.status_code == 429 or response.status_code >= 500
+            raise GatewayError(f"HTTP {response.status_code}: {response.text[:200]}", retryable=retryable)
+
+
+class FakeGateway:
+    """
+    In-memory gateway for tests and local development. ``fail`` maps a phone
+    to the number of calls that fail (retryably) before it succeeds, or to
+    None to fail permanently.
+    """
+    max_recipients = 100
+
+    def __init__(self, fail=None):
+        self.sent = []          # (phone, text)
+        self.calls = 0
+        self.fail = dict(fail or {})
+
+    def send(self, text, phones):
+        self.calls += 1
+        for phone in phones:
+            if phone in self.fail:
+                remaining = self.fail[phone]
+                if remaining is None:
+                    raise GatewayError(f"{phone} rejected", retryable=False)
+                if remaining > 0:
+                    self.fail[phone] = remaining - 1
+                    raise GatewayError(f"{phone} unavailable")
+        self.sent.extend((phone, text) for phone in phones)
+
+
+_gateway = None
+
+
+def get_gateway():
+    global _gateway
+    if _gateway is None:
+        _gateway = import_string(getattr(settings, 'SMS_GATEWAY', DEFAULT_GATEWAY))()
+    return _gateway
+
+
+# ────── Delivery ──────
+def backoff(attempts):
+    """Seconds before retry number ``attempts`` (1-based): exponential, capped, half jittered."""
+    delay = min(BACKOFF_BASE * 2 ** (attempts - 1), BACKOFF_MAX)
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+def _claim(batch_size, now):
+    """``(messages, lease_until)``; the lease is stamped into ``next_attempt_at``."""
+    lease_until = now + timedelta(seconds=LEASE_SECONDS)
+    with transaction.atomic():
+        due = SmsMessage.objects.filter(
+            status__in=[SmsMessage.PENDING, SmsMessage.SENDING], next_attempt_at__lte=now,
+        ).order_by('next_attempt_at', 'id')
+        messages = list(due.select_for_update(skip_locked=True)[:batch_size])
+        if messages:
+            SmsMessage.objects.filter(pk__in=[m.pk for m in messages]).update(
+                status=SmsMessage.SENDING, next_attempt_at=lease_until,
+            )
+    return messages, lease_until
+
+
+def _settle(messages, lease_until):
+    """Write the round's results to the rows still leased by it; returns those messages."""
+    fields = ['status', 'attempts', 'next_attempt_at', 'last_error', 'sent_at']
+    with transaction.atomic():
+        held = set(SmsMessage.objects.select_for_update().filter(
+            pk__in=[m.pk for m in messages], status=SmsMessage.SENDING, next_attempt_at=lease_until,
+        ).values_list('pk', flat=True))
+        settled = [m for m in messages if m.pk in held]
+        SmsMessage.objects.bulk_update(settled, fields)
+    if len(settled) < len(messages):
+        logger.warning("SMS lease lost on %d message(s); their results were dropped", len(messages) - len(settled))
+    return settled
+
+
+def _recently_sent(messages, now):
+    window = getattr(settings, 'SMS_DEDUPE_WINDOW', DEFAULT_DEDUPE_WINDOW)
+    if not window:
+        return set()
+    return set(SmsMessage.objects.filter(
+        status=SmsMessage.SENT, phone__in={m.phone for m in messages},
+        sent_at__gte=now - timedelta(seconds=window),
+    ).values_list('phone', 'text'))
+
+
+def deliver_pending(gateway=None, batch_size=None):
+    """One delivery round; returns ``{status: count}`` for the rows it settled."""
+    gateway = gateway or get_gateway()
+    batch_size = batch_size or getattr(settings, 'SMS_BATCH_SIZE', DEFAULT_BATCH_SIZE)
+    max_attempts = getattr(settings, 'SMS_MAX_ATTEMPTS', DEFAULT_MAX_ATTEMPTS)
+    now = timezone.now()
+    messages, lease_until = _claim(batch_size, now)
+    if not messages:
+        return {}
+    # Start no call that could still be running when the lease runs out
+    timeout = getattr(gateway, 'timeout', None) or getattr(settings, 'SMS_TIMEOUT', DEFAULT_TIMEOUT)
+    send_by = lease_until - timedelta(seconds=2 * timeout)
+
+    seen = _recently_sent(messages, now)
+    by_text = defaultdict(list)         # text -> messages, one per phone
+    for message in messages:
+        if (message.phone, message.text) in seen:
+            message.status = SmsMessage.DUPLICATE
+        else:
+            seen.add((message.phone, message.text))
+            by_text[message.text].append(message)
+
+    for text, group in by_text.items():
+        for start in range(0, len(group), gateway.max_recipients):
+            chunk = group[start:start + gateway.max_recipients]
+            if timezone.now() >= send_by:
+                for message in chunk:       # out of time: due again for the next round
+                    message.status, message.next_attempt_at = SmsMessage.PENDING, timezone.now()
+                continue
+            try:
+                gateway.send(text, [m.phone for m in chunk])
+            except GatewayError as exc:
+                error, retryable = str(exc), exc.retryable
+            except Exception as exc:        # a gateway bug must not wedge the outbox
+                logger.exception("SMS gateway crashed")
+                error, retryable = repr(exc), True
+            else:
+                error = None
+            for message in chunk:
+                message.attempts += 1
+                if error is None:
+                    message.status, message.sent_at, message.last_error = SmsMessage.SENT, timezone.now(), ''
+                elif retryable and message.attempts < max_attempts:
+                    message.status, message.last_error = SmsMessage.PENDING, error
+                    message.next_attempt_at = timezone.now() + timedelta(seconds=backoff(message.attempts))
+                else:
+                    message.status, message.last_error = SmsMessage.FAILED, error
+
+    counts = defaultdict(int)
+    for message in _settle(messages, lease_until):
+        counts[message.status] += 1
+    return dict(counts)
+
+
+def purge_settled(older_than_days=30):
+    """Delete sent, duplicate and failed rows older than ``older_than_days``."""
+    cutoff = timezone.now() - timedelta(days=older_than_days)
+    return SmsMessage.objects.filter(
+        ~Q(status__in=[SmsMessage.PENDING, SmsMessage.SENDING]), created_at__lt=cutoff,
+    ).delete()[0]
@@ -1,3 +1,85 @@
-from django.test import TestCase
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from .models import SmsMessage
+from .sms import FakeGateway, deliver_pending, queue_sms, send_sms
+
+
+class SmsOutboxTests(TestCase):
+    def test_enqueue_is_one_insert_and_keys_are_idempotent(self):
+        with self.assertNumQueries(1):
+            queue_sms([('9800000001', 'Booking sent', 'booking:1:buyer'), ('', 'No phone'), ('9800000002', 'New booking')])
+        send_sms('9800000001', 'Booking sent again', key='booking:1:buyer')
+        self.assertEqual(sorted(SmsMessage.objects.values_list('phone', 'text')),
+                         [('9800000001', 'Booking sent'), ('9800000002', 'New booking')])
+
+    def test_batches_by_text_and_drops_duplicates(self):
+        queue_sms([('9800000001', 'Payment failed'), ('9800000002', 'Payment failed'),
+                   ('9800000001', 'Payment failed'), ('9800000003', 'Welcome')])
+        gateway = FakeGateway()
+        self.assertEqual(deliver_pending(gateway), {'sent': 3, 'duplicate': 1})
+        self.assertEqual(gateway.calls, 2)
+
+        send_sms('9800000002', 'Payment failed')   # sent a moment ago
+        self.assertEqual(deliver_pending(gateway), {'duplicate': 1})
+        self.assertEqual(deliver_pending(gateway), {})
+
+    @override_settings(SMS_MAX_ATTEMPTS=2)
+    def test_retries_with_backoff_then_gives_up(self):
+        queue_sms([('9800000001', 'Flaky'), ('9800000009', 'Rejected')])
+        gateway = FakeGateway(fail={'9800000001': 1, '9800000009': None})
+        self.assertEqual(deliver_pending(gateway), {'pending': 1, 'failed': 1})
+        flaky = SmsMessage.objects.get(phone='9800000001')
+        self.assertGreater(flaky.next_attempt_at, timezone.now())
+        self.assertEqual(deliver_pending(gateway), {})      # not due yet
+
+        later = timezone.now() + timedelta(hours=1)
+        with mock.patch('core.sms.timezone.now', return_value=later):
+            self.assertEqual(deliver_pending(gateway), {'sent': 1})
+        self.assertEqual(gateway.sent, [('9800000001', 'Flaky')])
+
+    def test_scheduled_message_waits_until_due(self):
+        later = timezone.now() + timedelta(hours=1)
+        SmsMessage.objects.create(phone='9800000001', text='Reminder', next_attempt_at=later)
+        self.assertEqual(deliver_pending(FakeGateway()), {})
+        with mock.patch('core.sms.timezone.now', return_value=later):
+            self.assertEqual(deliver_pending(FakeGateway()), {'sent': 1})
+
+    def test_expired_lease_is_reclaimed(self):
+        send_sms('9800000001', 'Hello')
+        SmsMessage.objects.update(status=SmsMessage.SENDING, next_attempt_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(deliver_pending(FakeGateway()), {'sent': 1})
+
+    def test_round_stops_before_its_lease_runs_out(self):
+        class SlowGateway(FakeGateway):
+            timeout = 5
+
+            def send(self, text, phones):
+                super().send(text, phones)
+                clock[0] += timedelta(seconds=60)
+
+        queue_sms([('9800000001', 'Order 1 confirmed'), ('9800000002', 'Order 2 confirmed'),
+                   ('9800000003', 'Order 3 confirmed')])
+        clock, gateway = [timezone.now()], SlowGateway()
+        with mock.patch('core.sms.timezone.now', side_effect=lambda: clock[0]):
+            self.assertEqual(deliver_pending(gateway), {'sent': 2, 'pending': 1})
+            left = SmsMessage.objects.get(status=SmsMessage.PENDING)
+            self.assertEqual((left.attempts, left.next_attempt_at), (0, clock[0]))
+            self.assertEqual(deliver_pending(gateway), {'sent': 1})
+        self.assertEqual(gateway.calls, 3)
+
+    def test_results_are_dropped_once_the_lease_is_lost(self):
+        send_sms('9800000001', 'Hello')
+
+        class TakenOverGateway(FakeGateway):
+            def send(self, text, phones):
+                # Another worker reclaims the row while this call hangs
+                SmsMessage.objects.update(next_attempt_at=timezone.now() + timedelta(minutes=5))
+                super().send(text, phones)
+
+        self.assertEqual(deliver_pending(TakenOverGateway()), {})
+        message = SmsMessage.objects.get()
+        self.assertEqual((message.status, message.attempts), (SmsMessage.SENDING, 0))
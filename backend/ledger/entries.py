@@ -0,0 +1,220 @@
+# ledger/entries.py
+"""
+Double-entry bookkeeping for marketplace money.
+
+    payment     payment verified        Dr cash     Cr escrow    amount charged
+    earning     order completed         Dr escrow   Cr seller    package price
+    fee         order completed         Dr escrow   Cr fees      buyer fee
+                                        Dr seller   Cr fees      SELLER_FEE_RATE of the price
+    refund      paid order cancelled    Dr escrow   Cr cash      amount charged
+    payout      withdrawal requested    Dr seller   Cr payouts   amount withdrawn
+    settlement  withdrawal paid out     Dr payouts  Cr cash      amount withdrawn
+    reversal    withdrawal rejected     Dr payouts  Cr seller    amount withdrawn
+
+Entries and postings are append-only. ``post_many`` writes a batch of entries
+with a fixed number of queries. In the same database transaction it adds each
+account's net change to ``Account.balance`` with one ``UPDATE ... SET balance =
+balance + x``. A seller's balance is therefore a single indexed row
+(``seller_balance``) and always equals the sum of their postings.
+
+References are idempotency keys (``txn:42:payment``). Re-posting one is a
+no-op, so callers may retry and backfills may overlap live traffic.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from payments.models import Transaction
+
+from .models import Account, JournalEntry, LedgerError, Posting
+
+CENT = Decimal('0.01')
+SELLER_FEE_RATE = Decimal('0.10')
+
+
+# ────── Accounts ──────
+def house_accounts():
+    """``{kind: Account}`` for the platform's own accounts, created on first use."""
+    accounts = {account.kind: account for account in Account.objects.filter(user__isnull=True)}
+    for kind in (Account.CASH, Account.ESCROW, Account.FEES, Account.PAYOUTS):
+        if kind not in accounts:
+            accounts[kind] = Account.objects.get_or_create(kind=kind, user=None)[0]
+    return accounts
+
+
+def seller_accounts(user_ids):
+    """``{user_id: Account}``, creating missing seller accounts."""
+    user_ids = set(user_ids)
+    accounts = Account.objects.filter(kind=Account.SELLER, user_id__in=user_ids)
+    missing = user_ids - {account.user_id for account in accounts}
+    if missing:
+        Account.objects.bulk_create(
+            [Account(kind=Account.SELLER, user_id=user_id) for user_id in missing], ignore_conflicts=True,
+        )
+    return {account.user_id: account for account in Account.objects.filter(kind=Account.SELLER, user_id__in=user_ids)}
+
+
+def seller_balance(user):
+    """What the platform owes ``user`` right now: one lookup on the (kind, user) index."""
+    balance = Account.objects.filter(kind=Account.SELLER, user=user).values_list('balance', flat=True).first()
+    return balance if balance is not None else Decimal('0.00')
+
+
+# ────── Posting ──────
+def post_many(drafts):
+    """
+    Post ``(kind, reference, [(account, amount), ...], memo)`` drafts, amounts
+    debit-positive. Every draft must balance. Drafts whose reference is already
+    in the journal are skipped; returns the references posted now.
+
+    Two callers racing on the same new reference: one commits, the other gets
+    an ``IntegrityError`` and finds the entry when it retries.
+    """
+    fresh = {}
+    for kind, reference, lines, memo in drafts:
+        lines = [(account, Decimal(amount).quantize(CENT)) for account, amount in lines]
+        lines = [(account, amount) for account, amount in lines if amount]
+        if sum(amount for _, amount in lines) != 0:
+            raise LedgerError(f"{reference} does not balance")
+        fresh.setdefault(reference, (kind, lines, memo))
+    if not fresh:
+        return []
+
+    with transaction.atomic():
+        for reference in JournalEntry.objects.filter(reference__in=list(fresh)).values_list('reference', flat=True):
+            del fresh[reference]
+        if not fresh:
+            return []
+        JournalEntry.objects.bulk_create([
+            JournalEntry(kind=kind, reference=reference, memo=memo[:255])
+            for reference, (kind, _, memo) in fresh.items()
+        ])
+        entry_ids = dict(JournalEntry.objects.filter(reference__in=list(fresh)).values_list('reference', 'pk'))
+
+        postings, deltas = [], defaultdict(Decimal)
+        for reference, (_, lines, _) in fresh.items():
+            for account, amount in lines:
+                postings.append(Posting(entry_id=entry_ids[reference], account_id=account.pk, amount=amount))
+                deltas[account.pk] += amount * account.sign
+        Posting.objects.bulk_create(postings)
+
+        now = timezone.now()
+        for account_id in sorted(deltas):       # one lock order, so concurrent posters can't deadlock
+            if deltas[account_id]:
+                Account.objects.filter(pk=account_id).update(balance=F('balance') + deltas[account_id], updated_at=now)
+    return list(fresh)
+
+
+def post(kind, reference, lines, memo=''):
+    """Post one entry; False if ``reference`` was already posted."""
+    return bool(post_many([(kind, reference, lines, memo)]))
+
+
+# ────── Marketplace events ──────
+def _payment_draft(txn, house):
+    amount = txn.charged_amount
+    return (JournalEntry.PAYMENT, f'txn:{txn.pk}:payment',
+            [(house[Account.CASH], amount), (house[Account.ESCROW], -amount)], txn.payment_id or '')
+
+
+def record_payments(transactions):
+    """Book verified payments into escrow. Takes objects with ``pk``, ``payment_id`` and ``charged_amount``."""
+    house = house_accounts()
+    return post_many([_payment_draft(txn, house) for txn in transactions])
+
+
+def record_earning(order):
+    """
+    Release a completed order's payment: the price to the seller, fees to the
+    platform. Books the payment itself too if that hasn't happened yet. No-op
+    for orders without a paid transaction.
+
+    The transaction is re-read under a row lock. Reconciliation verifies it
+    under the same lock and then books earnings for orders already completed,
+    so whichever of approval and verification commits second sees the other
+    and books the earning.
+    """
+    if order.transaction_id is None:
+        return False
+    with transaction.atomic():
+        txn = Transaction.objects.select_for_update().get(pk=order.transaction_id)
+        if not txn.payment_status:
+            return False
+        house = house_accounts()
+        seller = seller_accounts([txn.receiver_id])[txn.receiver_id]
+        buyer_fee = txn.charged_amount - txn.amount
+        seller_fee = (txn.amount * SELLER_FEE_RATE).quantize(CENT)
+        return bool(post_many([
+            _payment_draft(txn, house),
+            (JournalEntry.EARNING, f'txn:{txn.pk}:earning',
+             [(house[Account.ESCROW], txn.amount), (seller, -txn.amount)], f'order {order.pk}'),
+            (JournalEntry.FEE, f'txn:{txn.pk}:fee',
+             [(house[Account.ESCROW], buyer_fee), (seller, seller_fee), (house[Account.FEES], -(buyer_fee + seller_fee))],
+             f'order {order.pk}'),
+        ]))
+
+
+def record_refunds(transactions):
+    """Return escrowed payments to their buyers; payments already released to a seller are skipped."""
+    transactions = list(transactions)
+    references = JournalEntry.objects.filter(
+        reference__in=[f'txn:{txn.pk}:{kind}' for txn in transactions for kind in ('payment', 'earning')],
+    ).values_list('reference', flat=True)
+    booked = set(references)
+    house = house_accounts()
+    return post_many([
+        (JournalEntry.REFUND, f'txn:{txn.pk}:refund',
+         [(house[Account.ESCROW], txn.charged_amount), (house[Account.CASH], -txn.charged_amount)], txn.payment_id or '')
+        for txn in transactions
+        if f'txn:{txn.pk}:payment' in booked and f'txn:{txn.pk}:earning' not in booked
+    ])
+
+
+def record_payout(withdrawal, allow_overdraft=False):
+    """
+    Hold a withdrawal's amount: seller balance to payouts in flight. Locks the
+    seller's account row and raises ``LedgerError`` if the balance won't cover it.
+    """
+    with transaction.atomic():
+        seller = seller_accounts([withdrawal.user_id])[withdrawal.user_id]
+        balance = Account.objects.select_for_update().values_list('balance', flat=True).get(pk=seller.pk)
+        if withdrawal.amount > balance and not allow_overdraft:
+            raise LedgerError(f"balance {balance} does not cover withdrawal of {withdrawal.amount}")
+        return post(JournalEntry.PAYOUT, f'withdrawal:{withdrawal.pk}:payout',
+                    [(seller, withdrawal.amount), (house_accounts()[Account.PAYOUTS], -withdrawal.amount)],
+                    withdrawal.withdrawal_method)
+
+
+def _held(withdrawals):
+    """The withdrawals whose payout entry is booked and not yet settled or reversed."""
+    withdrawals = list(withdrawals)
+    booked = set(JournalEntry.objects.filter(
+        reference__in=[f'withdrawal:{w.pk}:{kind}' for w in withdrawals for kind in ('payout', 'settled', 'returned')],
+    ).values_list('reference', flat=True))
+    return [w for w in withdrawals if f'withdrawal:{w.pk}:payout' in booked
+            and f'withdrawal:{w.pk}:settled' not in booked and f'withdrawal:{w.pk}:returned' not in booked]
+
+
+def record_settlements(withdrawals, memo=''):
+    """Withdrawals paid out: payouts in flight leave cash. Takes objects with ``pk`` and ``amount``."""
+    house = house_accounts()
+    return post_many([
+        (JournalEntry.SETTLEMENT, f'withdrawal:{w.pk}:settled',
+         [(house[Account.PAYOUTS], w.amount), (house[Account.CASH], -w.amount)], memo)
+        for w in _held(withdrawals)
+    ])
+
+
+def record_payout_returns(withdrawals, memo=''):
+    """Withdrawals rejected: the held amount goes back to the seller. Takes ``pk``, ``user_id``, ``amount``."""
+    held = _held(withdrawals)
+    house = house_accounts()
+    sellers = seller_accounts({w.user_id for w in held})
+    return post_many([
+        (JournalEntry.REVERSAL, f'withdrawal:{w.pk}:returned',
+         [(house[Account.PAYOUTS], w.amount), (sellers[w.user_id], -w.amount)], memo)
+        for w in held
+    ])
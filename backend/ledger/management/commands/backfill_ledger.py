@@ -0,0 +1,63 @@
+# backend/ledger/management/commands/backfill_ledger.py
+"""
+Book history that predates the ledger (see ledger/entries.py).
+
+    python manage.py backfill_ledger
+
+Posts the payment, earning/fee, refund, payout, settlement and reversal
+entries that existing transactions, orders and withdrawals imply. References make every entry
+idempotent, so the command can be re-run and can overlap live traffic.
+"""
+from django.core.management.base import BaseCommand
+
+from ledger.entries import (
+    record_earning, record_payments, record_payout, record_payout_returns, record_refunds, record_settlements,
+)
+from Orders.models import Order
+from payments.models import PaymentWithdrawal, Transaction
+
+BATCH_SIZE = 500
+
+
+class Command(BaseCommand):
+    help = "Post ledger entries for payments, orders and withdrawals recorded before the ledger existed"
+
+    def handle(self, *args, **options):
+        posted = 0
+        paid = Transaction.objects.filter(payment_status=True).only('id', 'payment_id', 'amount', 'total_amount')
+        last = 0
+        while True:
+            batch = list(paid.filter(pk__gt=last).order_by('pk')[:BATCH_SIZE])
+            if not batch:
+                break
+            posted += len(record_payments(batch))
+            last = batch[-1].pk
+        self.stdout.write(f"payments: {posted}")
+
+        earned = 0
+        completed = Order.objects.filter(status='completed', transaction__payment_status=True).select_related('transaction')
+        for order in completed.iterator(chunk_size=BATCH_SIZE):
+            earned += record_earning(order)
+        self.stdout.write(f"completed orders: {earned}")
+
+        cancelled = Transaction.objects.filter(payment_status=True, order__status='cancelled')
+        self.stdout.write(f"refunds: {len(record_refunds(cancelled))}")
+
+        payouts = 0
+        for withdrawal in PaymentWithdrawal.objects.order_by('pk').iterator(chunk_size=BATCH_SIZE):
+            # History is booked as it happened, even where it overdrew the seller
+            payouts += record_payout(withdrawal, allow_overdraft=True)
+        self.stdout.write(f"payouts: {payouts}")
+
+        # Finished withdrawals: paid out, or handed back to the seller
+        for status, record, label in (('completed', record_settlements, 'settlements'),
+                                      ('rejected', record_payout_returns, 'returned payouts')):
+            done = PaymentWithdrawal.objects.filter(status=status).only('id', 'user_id', 'amount')
+            posted, last = 0, 0
+            while True:
+                batch = list(done.filter(pk__gt=last).order_by('pk')[:BATCH_SIZE])
+                if not batch:
+                    break
+                posted += len(record(batch, memo='backfill'))
+                last = batch[-1].pk
+            self.stdout.write(f"{label}: {posted}")
@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ledger', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='journalentry',
+            name='kind',
+            field=models.CharField(choices=[('payment', 'Payment'), ('earning', 'Earning'), ('fee', 'Fee'), ('payout', 'Payout'), ('settlement', 'Settlement'), ('refund', 'Refund'), ('reversal', 'Reversal')], max_length=12),
+        ),
+    ]
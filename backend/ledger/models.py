@@ -0,0 +1,119 @@
+from django.conf import settings
+from django.db import models
+from django.db.models import Q
+
+
+class LedgerError(Exception):
+    pass
+
+
+class AppendOnlyQuerySet(models.QuerySet):
+    """Journal rows are written once; corrections are new, reversing entries."""
+
+    def update(self, **kwargs):
+        raise LedgerError(f"{self.model.__name__} rows are immutable")
+
+    def delete(self):
+        raise LedgerError(f"{self.model.__name__} rows are immutable")
+
+
+class AppendOnlyModel(models.Model):
+    objects = AppendOnlyQuerySet.as_manager()
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise LedgerError(f"{type(self).__name__} rows are immutable")
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise LedgerError(f"{type(self).__name__} rows are immutable")
+
+
+class Account(models.Model):
+    """
+    A ledger account with its running balance, updated in the same database
+    transaction as every posting to it (see ledger/entries.py). The balance is
+    kept in the account's normal direction: debits raise ``cash``, credits
+    raise the others.
+    """
+    CASH = 'cash'           # money held at the gateways and the bank
+    ESCROW = 'escrow'       # buyer payments for orders not yet completed
+    FEES = 'fees'           # platform revenue
+    PAYOUTS = 'payouts'     # seller withdrawals requested but not yet paid out
+    SELLER = 'seller'       # what the platform owes one seller
+    KIND_CHOICES = [
+        (CASH, 'Cash'),
+        (ESCROW, 'Escrow'),
+        (FEES, 'Platform fees'),
+        (PAYOUTS, 'Payouts in flight'),
+        (SELLER, 'Seller balance'),
+    ]
+    DEBIT_NORMAL = {CASH}
+
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.PROTECT, null=True, blank=True, related_name='ledger_accounts',
+    )
+    balance = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'user'], name='ledger_account_owner'),
+            models.UniqueConstraint(fields=['kind'], condition=Q(user__isnull=True), name='ledger_house_account'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind}:{self.user_id}" if self.user_id else self.kind
+
+    @property
+    def sign(self):
+        """Multiplier turning a debit-positive posting amount into a change of ``balance``."""
+        return 1 if self.kind in self.DEBIT_NORMAL else -1
+
+
+class JournalEntry(AppendOnlyModel):
+    PAYMENT = 'payment'     # a verified buyer payment lands in escrow
+    EARNING = 'earning'     # a completed order releases the price to the seller
+    FEE = 'fee'             # buyer and seller fees on a completed order
+    PAYOUT = 'payout'       # a seller withdrawal request
+    SETTLEMENT = 'settlement'   # a withdrawal paid out from a settlement batch
+    REFUND = 'refund'       # an escrowed payment returned to the buyer
+    REVERSAL = 'reversal'   # undoes an earlier entry, e.g. a payout the bank bounced
+    KIND_CHOICES = [
+        (PAYMENT, 'Payment'),
+        (EARNING, 'Earning'),
+        (FEE, 'Fee'),
+        (PAYOUT, 'Payout'),
+        (SETTLEMENT, 'Settlement'),
+        (REFUND, 'Refund'),
+        (REVERSAL, 'Reversal'),
+    ]
+
+    kind = models.CharField(max_length=12, choices=KIND_CHOICES)
+    # Idempotency key, e.g. "txn:42:payment": posting the same reference twice is a no-op
+    reference = models.CharField(max_length=100, unique=True)
+    memo = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name_plural = 'journal entries'
+
+    def __str__(self):
+        return self.reference
+
+
+class Posting(AppendOnlyModel):
+    """One line of an entry; amounts are debit-positive and each entry's lines sum to zero."""
+    entry = models.ForeignKey(JournalEntry, on_delete=models.PROTECT, related_name='postings')
+    account = models.ForeignKey(Account, on_delete=models.PROTECT, related_name='postings')
+    amount = models.DecimalField(max_digits=14, decimal_places=2)
+
+    class Meta:
+        indexes = [models.Index(fields=['account', 'id'], name='ledger_statement_idx')]
+
+    def __str__(self):
+        return f"{self.entry_id} {self.account} {self.amount}"
@@ -0,0 +1,132 @@
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db.models import Sum
+from django.test import TestCase
+from django.utils import timezone
+
+from Orders.models import Order
+from payments.models import PaymentWithdrawal, Transaction
+from payments.reconcile import _apply
+from services.models import Category, Overview
+
+from .entries import house_accounts, post, record_earning, record_payments, record_payout, record_refunds, seller_balance
+from .models import Account, JournalEntry, LedgerError, Posting
+
+
+class LedgerTests(TestCase):
+    def setUp(self):
+        self.buyer = get_user_model().objects.create_user(username='asha', password='pass')
+        self.seller = get_user_model().objects.create_user(username='tailor', password='pass')
+        self.service = Overview.objects.create(
+            user=self.seller, category=Category.objects.create(name='Tailoring'), titleOverview='Kurta stitching',
+        )
+
+    def order(self, n, price='1000', verified=True):
+        price = Decimal(price)
+        txn = Transaction.objects.create(
+            overview=self.service.pk, sender=self.buyer, receiver=self.seller, amount=price,
+            total_amount=price * Decimal('1.05'), payment_id=f'TXN-{n}', service_fee=price * Decimal('0.15'),
+            package_name='basic_package', payment_status=verified,
+            verification=Transaction.VERIFIED if verified else Transaction.UNVERIFIED,
+        )
+        return Order.objects.create(buyer=self.buyer, seller=self.seller, service=self.service, transaction=txn)
+
+    def balances(self):
+        return {str(account): account.balance for account in Account.objects.all()}
+
+    def assert_balances_match_postings(self):
+        for account in Account.objects.all():
+            total = Posting.objects.filter(account=account).aggregate(total=Sum('amount'))['total'] or 0
+            self.assertEqual(account.balance, total * account.sign, account)
+
+    def test_entries_balance_are_idempotent_and_immutable(self):
+        house = house_accounts()
+        with self.assertRaises(LedgerError):
+            post(JournalEntry.PAYMENT, 'bad', [(house[Account.CASH], 10), (house[Account.ESCROW], -9)])
+        self.assertTrue(post(JournalEntry.PAYMENT, 'p1', [(house[Account.CASH], 10), (house[Account.ESCROW], -10)]))
+        self.assertFalse(post(JournalEntry.PAYMENT, 'p1', [(house[Account.CASH], 10), (house[Account.ESCROW], -10)]))
+        self.assertEqual(self.balances()['cash'], Decimal('10.00'))
+        self.assertEqual(self.balances()['escrow'], Decimal('10.00'))
+
+        entry = JournalEntry.objects.get(reference='p1')
+        entry.memo = 'edited'
+        for change in (entry.save, entry.delete, JournalEntry.objects.all().delete,
+                       lambda: Posting.objects.update(amount=0)):
+            with self.assertRaises(LedgerError):
+                change()
+
+    def test_order_lifecycle_keeps_running_totals(self):
+        completed, cancelled, late = self.order(1), self.order(2, '400'), self.order(3, '200')
+        record_payments([completed.transaction, cancelled.transaction])
+
+        completed.status = 'completed'
+        self.assertTrue(record_earning(completed))
+        self.assertFalse(record_earning(completed))
+        record_earning(late)        # payment never booked by the reconciler: booked here first
+
+        self.assertEqual(len(record_refunds([cancelled.transaction, completed.transaction])), 1)
+        self.assertEqual(self.balances(), {
+            'cash': Decimal('1260.00'),         # 1050 + 420 + 210 - 420 refunded
+            'escrow': Decimal('0.00'),
+            'fees': Decimal('180.00'),          # 5% buyer + 10% seller fee on 1000 and 200
+            'payouts': Decimal('0.00'),
+            f'seller:{self.seller.pk}': Decimal('1080.00'),
+        })
+        with self.assertNumQueries(1):
+            self.assertEqual(seller_balance(self.seller), Decimal('1080.00'))
+        self.assertEqual(seller_balance(self.buyer), Decimal('0.00'))
+
+        withdrawal = PaymentWithdrawal.objects.create(user=self.seller, amount=Decimal('2000'))
+        with self.assertRaises(LedgerError):
+            record_payout(withdrawal)
+        withdrawal = PaymentWithdrawal.objects.create(user=self.seller, amount=Decimal('1080'))
+        self.assertTrue(record_payout(withdrawal))
+        self.assertEqual(seller_balance(self.seller), Decimal('0.00'))
+        self.assertEqual(self.balances()['payouts'], Decimal('1080.00'))
+        self.assert_balances_match_postings()
+
+    def test_order_approved_before_its_payment_is_verified(self):
+        order = self.order(1, verified=False)
+        order.status = 'completed'
+        order.save()
+        self.assertFalse(record_earning(order))
+        self.assertFalse(JournalEntry.objects.exists())
+
+        _apply({order.transaction_id: Transaction.VERIFIED}, timezone.now())
+        self.assertEqual(set(JournalEntry.objects.values_list('kind', flat=True)),
+                         {JournalEntry.PAYMENT, JournalEntry.EARNING, JournalEntry.FEE})
+        self.assertEqual(seller_balance(self.seller), Decimal('900.00'))
+        self.assertEqual(self.balances()['escrow'], Decimal('0.00'))
+        self.assert_balances_match_postings()
+
+    def test_earning_reads_the_current_verification(self):
+        order = Order.objects.select_related('transaction').get(pk=self.order(1, verified=False).pk)
+        # Verified by the reconciler after the approving request loaded the order
+        _apply({order.transaction_id: Transaction.VERIFIED}, timezone.now())
+        order.status = 'completed'
+        self.assertFalse(order.transaction.payment_status)
+        self.assertTrue(record_earning(order))
+        self.assertEqual(seller_balance(self.seller), Decimal('900.00'))
+
+    def test_backfill_books_withdrawal_history(self):
+        completed = self.order(1)
+        completed.status = 'completed'
+        completed.save()
+        for status, amount in (('completed', '500'), ('rejected', '300'), ('pending', '100')):
+            PaymentWithdrawal.objects.create(user=self.seller, amount=Decimal(amount), status=status)
+
+        for _ in range(2):          # re-running posts nothing new
+            call_command('backfill_ledger', stdout=StringIO())
+        self.assertEqual(self.balances(), {
+            'cash': Decimal('550.00'),          # 1050 paid in, 500 paid out
+            'escrow': Decimal('0.00'),
+            'fees': Decimal('150.00'),
+            'payouts': Decimal('100.00'),       # the pending withdrawal
+            f'seller:{self.seller.pk}': Decimal('300.00'),
+        })
+        self.assertEqual(JournalEntry.objects.filter(kind=JournalEntry.SETTLEMENT).count(), 1)
+        self.assertEqual(JournalEntry.objects.filter(kind=JournalEntry.REVERSAL).count(), 1)
+        self.assert_balances_match_postings()
@@ -0,0 +1,177 @@
+# payments/fake_gateway.py
+"""
+In-process fake of the Khalti ePayment and eSewa verification APIs.
+
+    with FakeGatewayServer(latency=0.02, failure_rate=0.01) as fake:
+        with override_settings(**fake.settings()):
+            ...   # payments.gateway clients now talk to 127.0.0.1
+
+A real HTTP server on a free localhost port (one thread per connection,
+keep-alive supported), so the clients' pooling, timeouts and breaker are
+exercised exactly as against the real gateways. ``latency`` delays every
+answer; ``failure_rate`` answers that share of calls with 503.
+
+Khalti payments complete when looked up (the buyer "paid" instantly). eSewa
+verification succeeds for any reference id registered with
+``esewa_payment(pid, amount)``, or for every reference id when
+``auto_complete`` is on. Setting ``esewa_reply`` to a ``(status, body)``
+pair answers every eSewa verification with it instead, e.g. a 429.
+
+``manage.py fake_payment_gateway`` runs it standalone.
+"""
+import json
+import random
+import sys
+import threading
+import time
+import uuid
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'          # keep-alive, like the real gateways
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body, content_type='application/json'):
+        payload = body.encode() if isinstance(body, str) else json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _params(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        raw = self.rfile.read(length).decode() if length else ''
+        if self.headers.get('Content-Type', '').startswith('application/json'):
+            return json.loads(raw or '{}')
+        query = urlsplit(self.path).query
+        return {k: v[0] for k, v in parse_qs(f'{query}&{raw}' if raw else query).items()}
+
+    def do_GET(self):
+        self.do_POST()
+
+    def do_POST(self):
+        fake = self.server.fake
+        params = self._params()
+        fake.wait()
+        if fake.should_fail():
+            return self._send(503, {'detail': 'Service unavailable'})
+
+        path = urlsplit(self.path).path
+        if path == '/khalti/epayment/initiate/':
+            if not self.headers.get('Authorization', '').startswith('Key '):
+                return self._send(401, {'detail': 'Invalid token.'})
+            if not params.get('amount') or int(params['amount']) < 1000:
+                return self._send(400, {'amount': ['Amount should be greater than Rs. 10, that is 1000 paisa.']})
+            return self._send(200, fake.khalti_initiate(params))
+        if path == '/khalti/epayment/lookup/':
+            payment = fake.khalti_lookup(params.get('pidx'))
+            return self._send(200, payment) if payment else self._send(404, {'detail': 'Not found.'})
+        if path == '/esewa/epay/transrec' and fake.esewa_reply:
+            return self._send(*fake.esewa_reply, content_type='text/plain')
+        if path == '/esewa/epay/transrec':
+            ok = fake.esewa_verify(params.get('pid'), params.get('rid'), params.get('amt'))
+            return self._send(200, f"<response><response_code>{'Success' if ok else 'failure'}</response_code></response>",
+                              content_type='text/xml')
+        return self._send(404, {'detail': 'Not found.'})
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients that time out hang up mid-answer; that's expected here
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+class FakeGatewayServer:
+    def __init__(self, latency=0.0, failure_rate=0.0, auto_complete=True, seed=None, port=0):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.auto_complete = auto_complete
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.khalti_payments = {}           # pidx -> lookup payload
+        self.esewa_payments = {}            # (pid, rid) -> amount
+        self.esewa_reply = None             # (status, body) overriding every eSewa verification
+        self.requests = 0
+        self._server = _Server(('127.0.0.1', port), _Handler)
+        self._server.fake = self
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}/'
+
+    def settings(self):
+        """Settings that point ``payments.gateway`` clients at this server."""
+        return {
+            'KHALTI_BASE_URL': f'{self.base_url}khalti/',
+            'ESEWA_VERIFY_URL': f'{self.base_url}esewa/epay/transrec',
+        }
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name='fake-payment-gateway', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    # ────── Behaviour ──────
+    def wait(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+    def should_fail(self):
+        with self._lock:
+            self.requests += 1
+            return self._random.random() < self.failure_rate
+
+    def khalti_initiate(self, params):
+        pidx = uuid.uuid4().hex
+        with self._lock:
+            self.khalti_payments[pidx] = {
+                'pidx': pidx, 'total_amount': int(params['amount']), 'status': 'Pending',
+                'transaction_id': None, 'purchase_order_id': params.get('purchase_order_id'),
+            }
+        return {'pidx': pidx, 'payment_url': f'{self.base_url}khalti/pay/?pidx={pidx}', 'expires_in': 1800}
+
+    def khalti_lookup(self, pidx):
+        with self._lock:
+            payment = self.khalti_payments.get(pidx)
+            if payment and self.auto_complete and payment['status'] == 'Pending':
+                payment.update(status='Completed', transaction_id=uuid.uuid4().hex[:22])
+            return dict(payment) if payment else None
+
+    def esewa_payment(self, pid, amount):
+        """Register a completed eSewa payment; returns its reference id."""
+        rid = f'000{uuid.uuid4().int % 10**7:07d}'
+        with self._lock:
+            self.esewa_payments[(pid, rid)] = Decimal(str(amount))
+        return rid
+
+    def esewa_verify(self, pid, rid, amount):
+        with self._lock:
+            expected = self.esewa_payments.get((pid, rid))
+        if expected is None:
+            return bool(self.auto_complete and rid)
+        try:
+            return Decimal(str(amount)) == expected
+        except ArithmeticError:
+            return False
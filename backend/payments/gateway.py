@@ -0,0 +1,302 @@
+# payments/gateway.py
+"""
+HTTP clients for the payment gateways (Khalti ePayment, eSewa verification).
+
+One client per gateway lives for the whole process (``khalti()``,
+``esewa()``). Each client has:
+
+* a ``requests.Session`` with a bounded keep-alive pool, so calls reuse TLS
+  connections instead of handshaking every time;
+* strict ``(connect, read)`` timeouts (``PAYMENT_CONNECT_TIMEOUT``,
+  ``PAYMENT_READ_TIMEOUT``); nothing waits on a gateway indefinitely;
+* a circuit breaker. After ``PAYMENT_BREAKER_THRESHOLD`` consecutive
+  failures (network errors, timeouts, 5xx), calls fail fast with
+  ``CircuitOpen`` for ``PAYMENT_BREAKER_RESET`` seconds, then one trial call
+  decides whether to close it again;
+* a latency histogram per gateway and endpoint (``gateway_stats()``).
+
+Every call has an ``a``-prefixed coroutine twin for ASGI views. It runs the
+blocking call on a worker thread, sharing the pool, breaker and histograms;
+an open circuit fails before any thread hop.
+
+``payments/fake_gateway.py`` serves both APIs locally for tests and load tests.
+"""
+import bisect
+import re
+import threading
+import time
+
+import requests
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+DEFAULT_CONNECT_TIMEOUT = 3.05      # seconds
+DEFAULT_READ_TIMEOUT = 10
+DEFAULT_POOL_SIZE = 20
+DEFAULT_BREAKER_THRESHOLD = 5
+DEFAULT_BREAKER_RESET = 30          # seconds
+
+KHALTI_BASE_URL = 'https://dev.khalti.com/api/v2/'
+ESEWA_VERIFY_URL = 'https://uat.esewa.com.np/epay/transrec'
+
+
+class GatewayError(Exception):
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status
+
+
+class GatewayTimeout(GatewayError):
+    pass
+
+
+class CircuitOpen(GatewayError):
+    pass
+
+
+# ────── Instrumentation ──────
+class LatencyHistogram:
+    """Call latencies in milliseconds, counted per bucket (not cumulative)."""
+    BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts = [0] * (len(self.BUCKETS_MS) + 1)     # last bucket: > 10 s
+        self.total_ms = 0.0
+        self.errors = 0
+
+    def observe(self, ms, error=False):
+        with self._lock:
+            self.counts[bisect.bisect_left(self.BUCKETS_MS, ms)] += 1
+            self.total_ms += ms
+            self.errors += error
+
+    def percentile(self, q):
+        """Upper bound of the bucket holding the ``q`` quantile (None past the last bound)."""
+        with self._lock:
+            counts = list(self.counts)
+        target, seen = q * sum(counts), 0
+        for bound, count in zip((*self.BUCKETS_MS, None), counts):
+            seen += count
+            if count and seen >= target:
+                return bound
+        return 0
+
+    def snapshot(self):
+        with self._lock:
+            count = sum(self.counts)
+            data = {
+                'count': count,
+                'errors': self.errors,
+                'mean_ms': round(self.total_ms / count, 2) if count else 0.0,
+                'buckets': {f'le_{bound}': n for bound, n in zip(self.BUCKETS_MS, self.counts)},
+            }
+            data['buckets']['le_inf'] = self.counts[-1]
+        data.update(p50_ms=self.percentile(0.5), p95_ms=self.percentile(0.95), p99_ms=self.percentile(0.99))
+        return data
+
+
+class CircuitBreaker:
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+    def __init__(self, threshold, reset_timeout):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+
+    def allow(self):
+        """Raise ``CircuitOpen`` unless a call may go through now."""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN       # this caller makes the trial call
+                return
+            raise CircuitOpen("circuit open")
+
+    def rejects(self):
+        """True while ``allow()`` would raise, without claiming the half-open trial call."""
+        with self._lock:
+            if self.state == self.OPEN:
+                return time.monotonic() - self.opened_at < self.reset_timeout
+            return self.state == self.HALF_OPEN
+
+    def record_success(self):
+        with self._lock:
+            self.state, self.failures = self.CLOSED, 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.threshold:
+                self.state, self.opened_at = self.OPEN, time.monotonic()
+
+
+# ────── Clients ──────
+class GatewayClient:
+    name = None
+
+    def __init__(self):
+        self.session = requests.Session()
+        pool_size = getattr(settings, 'PAYMENT_POOL_SIZE', DEFAULT_POOL_SIZE)
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, pool_block=False, max_retries=0)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.timeout = (
+            getattr(settings, 'PAYMENT_CONNECT_TIMEOUT', DEFAULT_CONNECT_TIMEOUT),
+            getattr(settings, 'PAYMENT_READ_TIMEOUT', DEFAULT_READ_TIMEOUT),
+        )
+        self.breaker = CircuitBreaker(
+            getattr(settings, 'PAYMENT_BREAKER_THRESHOLD', DEFAULT_BREAKER_THRESHOLD),
+            getattr(settings, 'PAYMENT_BREAKER_RESET', DEFAULT_BREAKER_RESET),
+        )
+        self.histograms = {}
+        self._histograms_lock = threading.Lock()
+
+    def _histogram(self, endpoint):
+        with self._histograms_lock:
+            return self.histograms.setdefault(endpoint, LatencyHistogram())
+
+    def request(self, endpoint, method, url, **kwargs):
+        """The ``requests.Response`` for a 2xx/4xx answer; ``GatewayError`` otherwise."""
+        self.breaker.allow()
+        start = time.perf_counter()
+        failed = True
+        try:
+            response = self.session.request(method, url, timeout=self.timeout, **kwargs)
+        except requests.Timeout as exc:
+            raise GatewayTimeout(f"{self.name} timed out") from exc
+        except requests.RequestException as exc:
+            raise GatewayError(f"{self.name} unreachable: {exc}") from exc
+        else:
+            if response.status_code >= 500:
+                raise GatewayError(f"{self.name} returned {response.status_code}", status=response.status_code)
+            failed = False
+            return response
+        finally:
+            self._histogram(endpoint).observe((time.perf_counter() - start) * 1000, error=failed)
+            # 4xx means our request was wrong, not that the gateway is down
+            if failed:
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+
+    async def run_async(self, method, *args, **kwargs):
+        """Await blocking ``method(*args, **kwargs)`` on a worker thread, failing fast on an open circuit."""
+        if self.breaker.rejects():
+            raise CircuitOpen(f"{self.name} circuit open")
+        return await sync_to_async(method, thread_sensitive=False)(*args, **kwargs)
+
+    async def arequest(self, endpoint, method, url, **kwargs):
+        return await self.run_async(self.request, endpoint, method, url, **kwargs)
+
+    def stats(self):
+        with self._histograms_lock:
+            histograms = dict(self.histograms)
+        return {
+            'breaker': {'state': self.breaker.state, 'failures': self.breaker.failures},
+            'endpoints': {endpoint: h.snapshot() for endpoint, h in histograms.items()},
+        }
+
+
+class KhaltiClient(GatewayClient):
+    name = 'khalti'
+
+    def __init__(self):
+        super().__init__()
+        self.base_url = getattr(settings, 'KHALTI_BASE_URL', KHALTI_BASE_URL)
+        self.session.headers['Authorization'] = f"Key {getattr(settings, 'KHALTI_SECRET_KEY', '')}"
+
+    def _post(self, endpoint, payload):
+        response = self.request(endpoint, 'POST', f'{self.base_url}epayment/{endpoint}/', json=payload)
+        if response.status_code != 200:
+            raise GatewayError(f"khalti {endpoint} rejected: {response.text[:200]}", status=response.status_code)
+        return response.json()
+
+    def initiate(self, amount_paisa, order_id, order_name, return_url, website_url):
+        """``{'pidx', 'payment_url', ...}`` for a new ePayment."""
+        return self._post('initiate', {
+            'amount': amount_paisa,
+            'purchase_order_id': order_id,
+            'purchase_order_name': order_name,
+            'return_url': return_url,
+            'website_url': website_url,
+        })
+
+    def lookup(self, pidx):
+        """Payment status, e.g. ``{'pidx', 'status': 'Completed', 'total_amount', 'transaction_id'}``."""
+        return self._post('lookup', {'pidx': pidx})
+
+    async def ainitiate(self, *args, **kwargs):
+        return await self.run_async(self.initiate, *args, **kwargs)
+
+    async def alookup(self, pidx):
+        return await self.run_async(self.lookup, pidx)
+
+
+class EsewaClient(GatewayClient):
+    name = 'esewa'
+    _SUCCESS = re.compile(r'<response_code>\s*success\s*</response_code>', re.IGNORECASE)
+    _FAILURE = re.compile(r'<response_code>\s*failure\s*</response_code>', re.IGNORECASE)
+
+    def __init__(self):
+        super().__init__()
+        self.verify_url = getattr(settings, 'ESEWA_VERIFY_URL', ESEWA_VERIFY_URL)
+
+    def verify(self, amount, ref_id, pid):
+        """
+        True if eSewa confirms payment ``ref_id`` of ``amount`` for our product
+        id ``pid``, False only if it explicitly answers ``failure``. Anything
+        else (a 4xx such as 401 or 429, an unexpected body) is no verdict: None.
+        """
+        response = self.request('verify', 'POST', self.verify_url, data={
+            'amt': amount, 'rid': ref_id, 'pid': pid, 'scd': settings.ESEWA_MERCHANT_ID,
+        })
+        if response.status_code == 200 and self._SUCCESS.search(response.text):
+            return True
+        if response.status_code == 200 and self._FAILURE.search(response.text):
+            return False
+        return None
+
+    async def averify(self, amount, ref_id, pid):
+        return await self.run_async(self.verify, amount, ref_id, pid)
+
+
+# ────── Registry ──────
+_clients = {}
+_clients_lock = threading.Lock()
+CLIENT_CLASSES = {'khalti': KhaltiClient, 'esewa': EsewaClient}
+
+
+def get_client(name):
+    with _clients_lock:
+        client = _clients.get(name)
+        if client is None:
+            client = _clients[name] = CLIENT_CLASSES[name]()
+        return client
+
+
+def khalti():
+    return get_client('khalti')
+
+
+def esewa():
+    return get_client('esewa')
+
+
+def reset_clients():
+    """Drop the clients (and their pools and stats); the next call rebuilds them from settings."""
+    with _clients_lock:
+        for client in _clients.values():
+            client.session.close()
+        _clients.clear()
+
+
+def gateway_stats():
+    with _clients_lock:
+        clients = dict(_clients)
+    return {name: client.stats() for name, client in clients.items()}
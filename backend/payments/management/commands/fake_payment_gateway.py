@@ -0,0 +1,34 @@
+# backend/payments/management/commands/fake_payment_gateway.py
+"""
+Serve the fake Khalti/eSewa APIs (payments/fake_gateway.py) until Ctrl-C.
+
+    python manage.py fake_payment_gateway --port 8765 --latency 0.05
+
+Point a dev server at it with KHALTI_BASE_URL / ESEWA_VERIFY_URL (printed
+on start).
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from payments.fake_gateway import FakeGatewayServer
+
+
+class Command(BaseCommand):
+    help = "Run an offline fake of the Khalti and eSewa payment APIs"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--latency', type=float, default=0.0, help="Seconds added to every answer")
+        parser.add_argument('--failure-rate', type=float, default=0.0, help="Share of calls answered with 503")
+
+    def handle(self, *args, **options):
+        fake = FakeGatewayServer(latency=options['latency'], failure_rate=options['failure_rate'], port=options['port'])
+        with fake:
+            for name, value in fake.settings().items():
+                self.stdout.write(f"{name}={value}")
+            try:
+                while True:
+                    time.sleep(3600)
+            except KeyboardInterrupt:
+                pass
@@ -0,0 +1,62 @@
+# backend/payments/management/commands/reconcile_payments.py
+"""
+Verify recorded payments server-side (see payments/reconcile.py).
+
+    python manage.py reconcile_payments                  # poll the gateways forever
+    python manage.py reconcile_payments --once           # one pass, e.g. from cron
+    python manage.py reconcile_payments --settlement esewa-2025-06-01.csv --gateway esewa
+
+Safe to interrupt: the next run resumes from the stored checkpoint.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from payments.reconcile import (
+    GATEWAY_CHECKPOINT, reconcile_gateways, reconcile_settlement, reset_checkpoint, settlement_checkpoint_name,
+)
+
+
+class Command(BaseCommand):
+    help = "Verify unverified transactions against the gateway status APIs or a settlement CSV"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--settlement', metavar='FILE', help="Settlement CSV to apply instead of polling")
+        parser.add_argument('--gateway', choices=['esewa', 'khalti'], help="Only match transactions of this gateway")
+        parser.add_argument('--id-column', default='payment_id')
+        parser.add_argument('--amount-column', default='amount')
+        parser.add_argument('--status-column', default='status')
+        parser.add_argument('--batch-size', type=int, default=None)
+        parser.add_argument('--concurrency', type=int, default=None, help="Gateway calls in flight")
+        parser.add_argument('--once', action='store_true', help="Run a single pass and exit")
+        parser.add_argument('--interval', type=float, default=30.0, help="Seconds between passes")
+        parser.add_argument('--reset', action='store_true', help="Forget the checkpoint and start over")
+
+    def handle(self, *args, **options):
+        if options['settlement']:
+            path = options['settlement']
+            if options['reset']:
+                reset_checkpoint(settlement_checkpoint_name(path))
+            stats = reconcile_settlement(
+                path, gateway=options['gateway'], batch_size=options['batch_size'],
+                id_column=options['id_column'], amount_column=options['amount_column'],
+                status_column=options['status_column'],
+            )
+            self._report(stats)
+            return
+
+        if options['reset']:
+            reset_checkpoint(GATEWAY_CHECKPOINT)
+        while True:
+            close_old_connections()
+            stats = reconcile_gateways(batch_size=options['batch_size'], concurrency=options['concurrency'])
+            if stats['checked'] or stats.get('unavailable'):
+                self._report(stats)
+            if options['once']:
+                break
+            time.sleep(options['interval'])
+
+    def _report(self, stats):
+        counts = ', '.join(f"{key}: {n}" for key, n in sorted(stats.items()) if key not in ('seconds', 'tps'))
+        self.stdout.write(f"{counts} in {stats['seconds']}s ({stats['tps']} tx/s)")
@@ -0,0 +1,46 @@
+# backend/payments/management/commands/settle_payouts.py
+"""
+Write settlement batch files for pending withdrawals and eSewa payouts (see
+payments/settlement.py), or complete a batch from the bank's report.
+
+    python manage.py settle_payouts                              # every method
+    python manage.py settle_payouts --method upi --batch-size 500
+    python manage.py settle_payouts --complete upi-20250601T0930-1a2b3c --failed W17 W21
+
+Several workers may run side by side; each claims its own rows.
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from payments.settlement import SOURCES, SettlementError, complete_batch, settle_pending
+
+
+class Command(BaseCommand):
+    help = "Batch pending payouts by method into settlement files, or mark a batch paid"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--method', action='append', choices=list(SOURCES), help="Repeatable; default all")
+        parser.add_argument('--batch-size', type=int, default=None)
+        parser.add_argument('--dir', default=None, help="Output directory (default SETTLEMENT_DIR)")
+        parser.add_argument('--complete', metavar='BATCH', help="Mark this batch's rows completed")
+        parser.add_argument('--failed', nargs='*', default=[], metavar='ITEM',
+                            help="With --complete: item references the bank rejected")
+
+    def handle(self, *args, **options):
+        if options['complete']:
+            try:
+                counts = complete_batch(options['complete'], failed=options['failed'])
+            except SettlementError as exc:
+                raise CommandError(str(exc))
+            self.stdout.write(f"{options['complete']}: completed {counts['completed']}, rejected {counts['rejected']}")
+            return
+
+        start = time.perf_counter()
+        batches = settle_pending(options['method'], batch_size=options['batch_size'], directory=options['dir'])
+        elapsed = time.perf_counter() - start
+        for batch in batches:
+            self.stdout.write(f"{batch.reference}: {batch.item_count} payouts, NPR {batch.total_amount} -> {batch.file_path}")
+        rows = sum(batch.item_count for batch in batches)
+        self.stdout.write(f"{len(batches)} batch(es), {rows} payouts in {elapsed:.2f}s "
+                          f"({rows / elapsed if elapsed else 0:.0f}/s)")
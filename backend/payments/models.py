@@ -22,9 +22,31 @@ class Transaction(models.Model):
     timestamp = models.DateTimeField(auto_now_add=True)
     payment_id = models.CharField(max_length=100, blank=True, null=True)
 
+    # Server-side verification (payments/reconcile.py). Redirect callbacks only
+    # record the gateway's reference; payment_status follows the verification.
+    UNVERIFIED, VERIFIED, REJECTED = 'unverified', 'verified', 'rejected'
+    total_amount = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)  # charged to the buyer
+    gateway = models.CharField(max_length=10, blank=True, choices=[('esewa', 'eSewa'), ('khalti', 'Khalti')])
+    gateway_ref = models.CharField(max_length=100, blank=True)      # eSewa refId / Khalti pidx
+    verification = models.CharField(
+        max_length=10,
+        choices=[(UNVERIFIED, 'Unverified'), (VERIFIED, 'Verified'), (REJECTED, 'Rejected')],
+        default=UNVERIFIED,
+    )
+    verified_at = models.DateTimeField(null=True, blank=True)
+    checked_at = models.DateTimeField(null=True, blank=True)
+    check_attempts = models.PositiveSmallIntegerField(default=0)
+
+    class Meta:
+        indexes = [models.Index(fields=['verification', 'id'], name='txn_unverified_idx')]
+
     def __str__(self):
         return f"Transaction from {self.sender} to {self.receiver} - {self.amount}"
 
+    @property
+    def charged_amount(self):
+        return self.total_amount if self.total_amount is not None else self.amount
+
 
 class SellerAccountBalance(models.Model):
     user = models.OneToOneField(
@@ -61,6 +83,12 @@ class PaymentWithdrawal(models.Model):
         default='pending'
     )
     created_at = models.DateTimeField(auto_now_add=True)
+    # Set when a settlement worker claims it (payments/settlement.py)
+    batch_ref = models.CharField(max_length=40, blank=True, db_index=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['status', 'withdrawal_method', 'id'], name='withdrawal_pending_idx')]
 
 
 class PaymentMethod(models.Model):
@@ -118,4 +146,40 @@ class Refund_details(models.Model):
     )
     refund_id = models.CharField(max_length=100, blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
-    updated_at = models.DateTimeField(auto_now=True)
\ No newline at end of file
+    updated_at = models.DateTimeField(auto_now=True)
+
+
+class ReconcileCheckpoint(models.Model):
+    """Resume point of a reconciliation run: last Transaction id, or settlement file rows, done."""
+    name = models.CharField(max_length=255, unique=True)
+    position = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} @ {self.position}"
+
+
+class PayoutBatch(models.Model):
+    """One settlement file: the withdrawals or eSewa payouts of one method claimed together."""
+    CLAIMED, WRITTEN, COMPLETED = 'claimed', 'written', 'completed'
+
+    reference = models.CharField(max_length=40, unique=True)
+    method = models.CharField(
+        max_length=20,
+        choices=[('bank_transfer', 'Bank Transfer'), ('upi', 'UPI'), ('esewa', 'eSewa')],
+    )
+    status = models.CharField(
+        max_length=10,
+        choices=[(CLAIMED, 'Claimed'), (WRITTEN, 'File written'), (COMPLETED, 'Completed')],
+        default=CLAIMED,
+    )
+    item_count = models.PositiveIntegerField(default=0)
+    total_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    file_path = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    leased_until = models.DateTimeField(null=True, blank=True)     # claimed: file due by then
+    written_at = models.DateTimeField(null=True, blank=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return self.reference
@@ -0,0 +1,247 @@
+# payments/reconcile.py
+"""
+Payment reconciliation: settle ``Transaction.verification`` server-side.
+
+The success redirect only records the gateway's reference (eSewa ``refId``,
+Khalti ``pidx``); a transaction counts as paid once it is verified here.
+``manage.py reconcile_payments`` runs either source:
+
+* ``reconcile_gateways()`` walks unverified transactions in primary-key
+  batches and asks the gateway status APIs about each batch concurrently
+  (``RECONCILE_CONCURRENCY`` calls in flight over the pooled clients of
+  ``payments/gateway.py``);
+* ``reconcile_settlement(path)`` streams a gateway settlement CSV from disk
+  in chunks and matches its rows on ``payment_id``.
+
+Each batch is written with a few bulk UPDATEs guarded by
+``verification='unverified'``, so re-running a pass or a file, or two
+workers overlapping, never flips a settled transaction. Verified payments are
+booked into the ledger (``ledger.entries.record_payments``) in the same
+database transaction, along with the refund or earning of an order that was
+cancelled or completed while its payment was still unverified. The resume
+point is stored in ``ReconcileCheckpoint`` in the same database transaction
+as the batch it covers. Both passes return counts plus ``seconds`` and ``tps``
+(transactions settled or checked per second).
+"""
+import csv
+import os
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from Orders.models import Order
+from ledger.entries import record_earning, record_payments, record_refunds
+from .gateway import CircuitOpen, GatewayError, esewa, khalti
+from .models import ReconcileCheckpoint, Transaction
+
+DEFAULT_BATCH_SIZE = 200
+DEFAULT_CONCURRENCY = 16
+DEFAULT_RECHECK_AFTER = 300     # seconds before a still-pending transaction is asked about again
+
+GATEWAY_CHECKPOINT = 'gateways'
+
+KHALTI_PAID = {'Completed'}
+KHALTI_FAILED = {'Expired', 'User canceled', 'Refunded', 'Partially Refunded'}
+SETTLEMENT_PAID = {'success', 'successful', 'completed', 'complete', 'paid'}
+SETTLEMENT_FAILED = {'failed', 'failure', 'cancelled', 'canceled', 'refunded', 'expired'}
+
+PENDING, UNAVAILABLE = 'pending', 'unavailable'
+
+
+# ────── Checkpoints ──────
+def get_checkpoint(name):
+    return ReconcileCheckpoint.objects.get_or_create(name=name[:255])[0]
+
+
+def reset_checkpoint(name):
+    ReconcileCheckpoint.objects.filter(name=name[:255]).delete()
+
+
+def settlement_checkpoint_name(path):
+    return f'settlement:{os.path.abspath(path)}'
+
+
+# ────── Writing outcomes ──────
+def _apply(outcomes, now, checkpoint=None):
+    """
+    Bulk-write ``{transaction_pk: outcome}`` and move ``checkpoint`` in one
+    database transaction. Returns ``{outcome: rows changed}``.
+    """
+    by_outcome = defaultdict(list)
+    for pk, outcome in outcomes.items():
+        by_outcome[outcome].append(pk)
+
+    unverified = Transaction.objects.filter(verification=Transaction.UNVERIFIED)
+    attempts = F('check_attempts') + 1
+    counts = {}
+    with transaction.atomic():
+        if by_outcome[Transaction.VERIFIED]:
+            verified = unverified.filter(pk__in=by_outcome[Transaction.VERIFIED]).select_for_update()
+            verified = list(verified.only('id', 'payment_id', 'amount', 'total_amount'))
+            counts[Transaction.VERIFIED] = Transaction.objects.filter(pk__in=[txn.pk for txn in verified]).update(
+                verification=Transaction.VERIFIED, payment_status=True, verified_at=now,
+                checked_at=now, check_attempts=attempts,
+            )
+            record_payments(verified)
+            # Bought, then cancelled while the payment was still unconfirmed
+            cancelled = set(Order.objects.filter(transaction__in=verified, status='cancelled')
+                            .values_list('transaction_id', flat=True))
+            if cancelled:
+                record_refunds(txn for txn in verified if txn.pk in cancelled)
+            # Delivery approved before the payment was confirmed: release it now
+            for order in Order.objects.filter(transaction__in=verified, status='completed').select_related('transaction'):
+                record_earning(order)
+        if by_outcome[Transaction.REJECTED]:
+            counts[Transaction.REJECTED] = unverified.filter(pk__in=by_outcome[Transaction.REJECTED]).update(
+                verification=Transaction.REJECTED, payment_status=False, checked_at=now, check_attempts=attempts,
+            )
+            # The success callback created these orders optimistically
+            Order.objects.filter(
+                transaction__in=by_outcome[Transaction.REJECTED],
+                transaction__verification=Transaction.REJECTED, status='pending',
+            ).update(status='cancelled')
+        if by_outcome[PENDING]:
+            counts[PENDING] = unverified.filter(pk__in=by_outcome[PENDING]).update(
+                checked_at=now, check_attempts=attempts,
+            )
+        if checkpoint is not None:
+            checkpoint.save(update_fields=['position', 'updated_at'])
+    return counts
+
+
+def _finish(stats, start):
+    checked, seconds = stats['checked'], round(time.perf_counter() - start, 3)
+    stats['seconds'], stats['tps'] = seconds, round(checked / seconds, 1) if seconds else 0.0
+    return dict(stats)
+
+
+# ────── Gateway status APIs ──────
+def check_transaction(txn):
+    """The gateway's verdict on ``txn``: VERIFIED, REJECTED, PENDING or UNAVAILABLE."""
+    try:
+        if txn.gateway == 'esewa':
+            ok = esewa().verify(txn.charged_amount, txn.gateway_ref, txn.payment_id)
+            return {True: Transaction.VERIFIED, False: Transaction.REJECTED}.get(ok, PENDING)
+        if txn.gateway == 'khalti':
+            payment = khalti().lookup(txn.gateway_ref)
+            if payment.get('status') in KHALTI_PAID:
+                paid = Decimal(payment.get('total_amount') or 0) / 100
+                return Transaction.VERIFIED if paid == txn.charged_amount else Transaction.REJECTED
+            return Transaction.REJECTED if payment.get('status') in KHALTI_FAILED else PENDING
+    except CircuitOpen:
+        return UNAVAILABLE
+    except GatewayError as exc:
+        # Khalti answers an unknown pidx with 404; anything else is worth another try
+        return Transaction.REJECTED if exc.status == 404 else PENDING
+    return PENDING
+
+
+def reconcile_gateways(batch_size=None, concurrency=None, recheck_after=None, checkpoint=GATEWAY_CHECKPOINT):
+    """
+    One pass over unverified transactions that carry a gateway reference.
+
+    Resumes after the checkpointed primary key and resets it once the pass
+    completes. An open circuit ends the pass early; the checkpoint then stays
+    just before the first transaction left unchecked.
+    """
+    batch_size = batch_size or getattr(settings, 'RECONCILE_BATCH_SIZE', DEFAULT_BATCH_SIZE)
+    concurrency = concurrency or getattr(settings, 'RECONCILE_CONCURRENCY', DEFAULT_CONCURRENCY)
+    if recheck_after is None:
+        recheck_after = getattr(settings, 'RECONCILE_RECHECK_AFTER', DEFAULT_RECHECK_AFTER)
+
+    start = time.perf_counter()
+    stats = defaultdict(int)
+    position = get_checkpoint(checkpoint)
+    cutoff = timezone.now() - timedelta(seconds=recheck_after)
+    due = (
+        Transaction.objects
+        .filter(verification=Transaction.UNVERIFIED, gateway__in=['esewa', 'khalti'])
+        .exclude(gateway_ref='')
+        .filter(Q(checked_at__isnull=True) | Q(checked_at__lt=cutoff))
+        .only('id', 'gateway', 'gateway_ref', 'payment_id', 'amount', 'total_amount')
+        .order_by('pk')
+    )
+
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='reconcile') as pool:
+        while True:
+            batch = list(due.filter(pk__gt=position.position)[:batch_size])
+            if not batch:
+                position.position = 0
+                position.save(update_fields=['position', 'updated_at'])
+                break
+            outcomes = dict(zip((txn.pk for txn in batch), pool.map(check_transaction, batch)))
+            unchecked = [pk for pk, outcome in outcomes.items() if outcome == UNAVAILABLE]
+            position.position = min(unchecked) - 1 if unchecked else batch[-1].pk
+            for outcome, count in _apply(outcomes, timezone.now(), position).items():
+                stats[outcome] += count
+            stats['checked'] += len(batch) - len(unchecked)
+            if unchecked:
+                stats[UNAVAILABLE] += len(unchecked)
+                break
+    return _finish(stats, start)
+
+
+# ────── Settlement files ──────
+def _settlement_outcome(row, txn, amount_column, status_column):
+    status = (row.get(status_column) or '').strip().lower()
+    if status in SETTLEMENT_FAILED:
+        return Transaction.REJECTED
+    if status not in SETTLEMENT_PAID:
+        return None
+    try:
+        amount = Decimal((row.get(amount_column) or '').replace(',', '').strip())
+    except InvalidOperation:
+        return 'invalid'
+    return Transaction.VERIFIED if amount == txn.charged_amount else 'mismatch'
+
+
+def reconcile_settlement(path, gateway=None, batch_size=None, id_column='payment_id',
+                         amount_column='amount', status_column='status'):
+    """
+    Settle transactions from a gateway settlement CSV, read ``batch_size`` rows
+    at a time. The checkpoint counts data rows already applied, so an
+    interrupted file resumes where it stopped and a finished one is a no-op.
+    Paid rows whose amount differs from what we charged are counted as
+    ``mismatch`` and left unverified for a human.
+    """
+    batch_size = batch_size or getattr(settings, 'RECONCILE_BATCH_SIZE', DEFAULT_BATCH_SIZE)
+    start = time.perf_counter()
+    stats = defaultdict(int)
+    position = get_checkpoint(settlement_checkpoint_name(path))
+    candidates = Transaction.objects.filter(verification=Transaction.UNVERIFIED)
+    if gateway:
+        candidates = candidates.filter(gateway=gateway)
+
+    with open(path, newline='', encoding='utf-8-sig') as fh:
+        rows = islice(csv.DictReader(fh), position.position, None)
+        while True:
+            chunk = list(islice(rows, batch_size))
+            if not chunk:
+                break
+            ids = {row.get(id_column, '').strip() for row in chunk} - {''}
+            txns = {txn.payment_id: txn for txn in candidates.filter(payment_id__in=ids).only(
+                'id', 'payment_id', 'amount', 'total_amount')}
+            outcomes = {}
+            for row in chunk:
+                txn = txns.get((row.get(id_column) or '').strip())
+                if txn is None:
+                    stats['unmatched'] += 1
+                    continue
+                outcome = _settlement_outcome(row, txn, amount_column, status_column)
+                if outcome in (Transaction.VERIFIED, Transaction.REJECTED):
+                    outcomes[txn.pk] = outcome
+                elif outcome:
+                    stats[outcome] += 1
+            position.position += len(chunk)
+            for outcome, count in _apply(outcomes, timezone.now(), position).items():
+                stats[outcome] += count
+            stats['checked'] += len(chunk)
+    return _finish(stats, start)
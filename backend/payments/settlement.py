@@ -0,0 +1,231 @@
+# payments/settlement.py
+"""
+Payout settlement: pay pending seller withdrawals and eSewa payouts in batches.
+
+    python manage.py settle_payouts                       # claim and write every method
+    python manage.py settle_payouts --complete bank_transfer-20250601T0930-1a2b3c --failed W17
+
+``settle_pending()`` works one method at a time (bank transfer, UPI and eSewa;
+see ``SOURCES``). For each method it:
+
+* claims up to ``SETTLEMENT_BATCH_SIZE`` pending rows. It selects them with
+  ``select_for_update(skip_locked=True)`` and stamps them ``processing`` with
+  the new batch's reference in one guarded UPDATE. Parallel workers therefore
+  claim disjoint rows, and a row can only ever be in one batch, so it can't
+  be paid twice;
+* rejects claimed rows whose payee details are missing, such as a
+  withdrawal without bank details;
+* streams the batch file for the bank or gateway. It reads keyset pages of
+  ``values_list()`` into ``csv.writer`` on a ``.part`` file (text that a
+  spreadsheet would run as a formula gets a leading ``'``), then renames
+  it, so a half-written file is never picked up. A batch whose worker died
+  before writing it is taken over once its ``SETTLEMENT_LEASE`` runs out.
+
+Once the bank or gateway reports back, ``complete_batch()`` marks the batch's
+rows ``completed``, or ``rejected`` for the item references it failed, with
+two bulk UPDATEs. The matching ledger entries (``ledger.entries``) are posted
+in the same transaction.
+"""
+import csv
+import os
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+from pathlib import Path
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from ledger.entries import record_payout_returns, record_settlements
+from services.models import Payout
+from sfa_core.exports import csv_safe, keyset_batches
+
+from .models import PaymentWithdrawal, PayoutBatch
+
+DEFAULT_BATCH_SIZE = 1000
+DEFAULT_LEASE = 600             # seconds a worker has to write a claimed batch's file
+DEFAULT_DIR = 'settlements'     # under BASE_DIR
+
+
+class SettlementError(Exception):
+    pass
+
+
+class PayoutSource:
+    def __init__(self, model, prefix, columns, required, filters=None, ledger=False):
+        self.model = model
+        self.prefix = prefix                    # item reference in the file: prefix + pk
+        self.columns = columns                  # output column -> ORM lookup
+        self.required = required                # lookup that must be filled for the row to be payable
+        self.filters = filters or {}
+        self.ledger = ledger                    # rows hold a ledger payout entry
+
+    def rows(self, **filters):
+        return self.model.objects.filter(**self.filters, **filters)
+
+    def item_reference(self, pk):
+        return f'{self.prefix}{pk}'
+
+    def item_pk(self, reference):
+        if not reference.startswith(self.prefix) or not reference[len(self.prefix):].isdigit():
+            raise SettlementError(f"{reference!r} is not a {self.prefix} item reference")
+        return int(reference[len(self.prefix):])
+
+
+SOURCES = {
+    'bank_transfer': PayoutSource(PaymentWithdrawal, 'W', {
+        'beneficiary': 'user__username',
+        'account_number': 'user__bank_details__account_number',
+        'ifsc_code': 'user__bank_details__ifsc_code',
+        'bank_name': 'user__bank_details__bank_name',
+        'amount': 'amount',
+    }, required='user__bank_details__account_number', filters={'withdrawal_method': 'bank_transfer'}, ledger=True),
+    'upi': PayoutSource(PaymentWithdrawal, 'W', {
+        'beneficiary': 'user__username',
+        'upi_id': 'user__upi_id__upi',
+        'amount': 'amount',
+    }, required='user__upi_id__upi', filters={'withdrawal_method': 'upi'}, ledger=True),
+    'esewa': PayoutSource(Payout, 'P', {
+        'beneficiary': 'seller__username',
+        'esewa_id': 'esewa_id',
+        'amount': 'amount',
+    }, required='esewa_id'),
+}
+
+
+def settlement_dir():
+    return Path(getattr(settings, 'SETTLEMENT_DIR', None) or Path(settings.BASE_DIR) / DEFAULT_DIR)
+
+
+def _lease():
+    return getattr(settings, 'SETTLEMENT_LEASE', DEFAULT_LEASE)
+
+
+# ────── Claiming ──────
+def _ledger_rows(source, queryset):
+    if not source.ledger:
+        return []
+    return list(queryset.only('id', 'user_id', 'amount'))
+
+
+def claim_batch(method, batch_size=None):
+    """Claim pending rows of ``method`` into a new batch; None when there is nothing to pay."""
+    source = SOURCES[method]
+    batch_size = batch_size or getattr(settings, 'SETTLEMENT_BATCH_SIZE', DEFAULT_BATCH_SIZE)
+    now = timezone.now()
+    with transaction.atomic():
+        pending = source.rows(status='pending').order_by('pk').select_for_update(skip_locked=True)
+        ids = list(pending.values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            return None
+        batch = PayoutBatch.objects.create(
+            reference=f'{method}-{now:%Y%m%dT%H%M}-{uuid.uuid4().hex[:6]}', method=method,
+            leased_until=now + timedelta(seconds=_lease()),
+        )
+        # Guarded by status: a row another worker got to first stays theirs
+        claimed = source.rows(pk__in=ids, status='pending').update(
+            status='processing', batch_ref=batch.reference, processed_at=now,
+        )
+        unpayable = source.rows(batch_ref=batch.reference).filter(
+            Q(**{f'{source.required}__isnull': True}) | Q(**{source.required: ''}),
+        )
+        returned = _ledger_rows(source, unpayable)
+        rejected = unpayable.update(status='rejected')
+        record_payout_returns(returned, memo=f'{batch.reference}: payee details missing')
+        if claimed == rejected:
+            batch.status, batch.completed_at = PayoutBatch.COMPLETED, now
+            batch.save(update_fields=['status', 'completed_at'])
+    return batch
+
+
+# ────── Batch files ──────
+def write_batch_file(batch, directory=None, chunk_size=None):
+    """Stream the batch's rows into ``<reference>.csv``; returns the finished batch."""
+    source = SOURCES[batch.method]
+    chunk_size = chunk_size or getattr(settings, 'EXPORT_BATCH_SIZE', 2000)
+    directory = Path(directory) if directory else settlement_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f'{batch.reference}.csv'
+    partial = path.with_name(f'{path.name}.{uuid.uuid4().hex[:8]}.part')
+
+    items = source.rows(batch_ref=batch.reference, status='processing')
+    lookups = ('id', *source.columns.values())
+    amount_index = lookups.index('amount')
+    count, total = 0, Decimal('0')
+    with open(partial, 'w', newline='', encoding='utf-8') as fh:
+        writer = csv.writer(fh)
+        writer.writerow(['reference', *source.columns])
+        for rows in keyset_batches(items, lookups, chunk_size):
+            writer.writerows([source.item_reference(pk), *map(csv_safe, rest)] for pk, *rest in rows)
+            count += len(rows)
+            total += sum(row[amount_index] for row in rows)
+        fh.flush()
+        os.fsync(fh.fileno())
+    os.replace(partial, path)
+
+    PayoutBatch.objects.filter(pk=batch.pk, status=PayoutBatch.CLAIMED).update(
+        status=PayoutBatch.WRITTEN, item_count=count, total_amount=total, file_path=str(path),
+        written_at=timezone.now(),
+    )
+    batch.refresh_from_db()
+    return batch
+
+
+def settle_pending(methods=None, batch_size=None, directory=None):
+    """
+    Claim and write batches for ``methods`` (default: all) until nothing is
+    pending. Returns the written batches. Stale claimed batches are rewritten
+    first.
+    """
+    methods = list(methods or SOURCES)
+    written = []
+    now = timezone.now()
+    stale = PayoutBatch.objects.filter(status=PayoutBatch.CLAIMED, method__in=methods, leased_until__lt=now)
+    for batch in stale:
+        # Take the lease over; another worker doing the same loses the race here
+        if PayoutBatch.objects.filter(pk=batch.pk, status=PayoutBatch.CLAIMED, leased_until__lt=now).update(
+                leased_until=now + timedelta(seconds=_lease())):
+            written.append(write_batch_file(batch, directory))
+    for method in methods:
+        while True:
+            batch = claim_batch(method, batch_size)
+            if batch is None:
+                break
+            if batch.status == PayoutBatch.CLAIMED:
+                written.append(write_batch_file(batch, directory))
+    return written
+
+
+# ────── Completion ──────
+def complete_batch(reference, failed=()):
+    """
+    Settle a written batch from the bank's or gateway's report: rows named in
+    ``failed`` (item references such as ``W17``) are rejected, the rest
+    completed. Returns ``{status: rows}``; a completed batch can't be completed again.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        batch = PayoutBatch.objects.select_for_update().filter(reference=reference).first()
+        if batch is None:
+            raise SettlementError(f"no batch {reference!r}")
+        if batch.status != PayoutBatch.WRITTEN:
+            raise SettlementError(f"batch {reference} is {batch.status}, not written")
+        source = SOURCES[batch.method]
+        failed_ids = {source.item_pk(item) for item in failed}
+
+        items = source.rows(batch_ref=batch.reference, status='processing')
+        paid, bounced = items.exclude(pk__in=failed_ids), items.filter(pk__in=failed_ids)
+        settled, returned = _ledger_rows(source, paid), _ledger_rows(source, bounced)
+        counts = {
+            'completed': paid.update(status='completed', processed_at=now),
+            'rejected': bounced.update(status='rejected', processed_at=now),
+        }
+        record_settlements(settled, memo=batch.reference)
+        record_payout_returns(returned, memo=f'{batch.reference}: rejected by the bank')
+
+        batch.status, batch.completed_at = PayoutBatch.COMPLETED, now
+        batch.save(update_fields=['status', 'completed_at'])
+    return counts
+
@@ -1,3 +1,289 @@
-from django.test import TestCase
+import asyncio
+import csv
+import os
+import tempfile
+import time
+from datetime import timedelta
+from decimal import Decimal
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework.test import APIClient
+
+from services.models import Category, Overview, Payout
+
+from .fake_gateway import FakeGatewayServer
+from .gateway import CircuitOpen, GatewayError, GatewayTimeout, esewa, gateway_stats, khalti, reset_clients
+from ledger.entries import record_payout, seller_balance
+from ledger.models import Account
+from Orders.models import Order
+
+from .models import Bank, PaymentWithdrawal, PayoutBatch, ReconcileCheckpoint, Transaction, Upi_id
+from .reconcile import reconcile_gateways, reconcile_settlement
+from .settlement import SettlementError, claim_batch, complete_batch, settle_pending
+
+
+class FakeGatewayMixin:
+    fake_options = {}
+
+    def setUp(self):
+        super().setUp()
+        self.fake = FakeGatewayServer(**self.fake_options).start()
+        self.addCleanup(self.fake.stop)
+        overrides = override_settings(**self.fake.settings(), KHALTI_SECRET_KEY='test-secret')
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        reset_clients()
+        self.addCleanup(reset_clients)
+
+    def initiate(self, client=None, order_id='TXN-1'):
+        return (client or khalti()).initiate(
+            amount_paisa=150_000, order_id=order_id, order_name='basic_package',
+            return_url='http://testserver/return/', website_url='http://testserver/',
+        )
+
+
+@override_settings(PAYMENT_BREAKER_THRESHOLD=2, PAYMENT_BREAKER_RESET=60, PAYMENT_READ_TIMEOUT=0.2)
+class GatewayClientTests(FakeGatewayMixin, SimpleTestCase):
+    def test_khalti_and_esewa_round_trip_with_histograms(self):
+        payment = self.initiate()
+        self.assertEqual(khalti().lookup(payment['pidx'])['status'], 'Completed')
+        rid = self.fake.esewa_payment('TXN-1', '1575.00')
+        self.assertTrue(esewa().verify('1575.00', rid, 'TXN-1'))
+        self.fake.auto_complete = False
+        self.assertIs(esewa().verify('1575.00', 'forged', 'TXN-1'), False)
+        for reply in ((429, 'Too many requests'), (403, 'Forbidden'), (200, '<html>maintenance</html>')):
+            self.fake.esewa_reply = reply
+            self.assertIsNone(esewa().verify('1575.00', rid, 'TXN-1'), reply)
+
+        stats = gateway_stats()
+        self.assertEqual(stats['khalti']['endpoints']['initiate']['count'], 1)
+        self.assertEqual(stats['esewa']['endpoints']['verify']['count'], 5)
+        self.assertEqual(stats['esewa']['breaker']['state'], 'closed')
+
+    def test_breaker_opens_fails_fast_and_recovers(self):
+        self.fake.failure_rate = 1.0
+        for _ in range(2):
+            with self.assertRaises(GatewayError):
+                self.initiate()
+        calls = self.fake.requests
+        with self.assertRaises(CircuitOpen):
+            self.initiate()
+        with self.assertRaises(CircuitOpen):
+            asyncio.run(khalti().ainitiate(
+                amount_paisa=150_000, order_id='TXN-2', order_name='basic_package',
+                return_url='http://testserver/return/', website_url='http://testserver/',
+            ))
+        self.assertEqual(self.fake.requests, calls)      # never reached the gateway
+
+        self.fake.failure_rate = 0.0
+        khalti().breaker.opened_at = time.monotonic() - 61
+        self.assertIn('pidx', self.initiate())           # half-open trial call succeeds
+        self.assertEqual(khalti().breaker.state, 'closed')
+
+    def test_timeouts_and_async_variant(self):
+        payment = asyncio.run(khalti().ainitiate(
+            amount_paisa=150_000, order_id='TXN-3', order_name='basic_package',
+            return_url='http://testserver/return/', website_url='http://testserver/',
+        ))
+        self.assertEqual(asyncio.run(khalti().alookup(payment['pidx']))['status'], 'Completed')
+        self.fake.latency = 0.5
+        with self.assertRaises(GatewayTimeout):
+            esewa().verify('100', 'REF', 'TXN-3')
+        self.assertEqual(gateway_stats()['esewa']['endpoints']['verify']['errors'], 1)
+
+
+class InitiatePaymentApiTests(FakeGatewayMixin, TestCase):
+    def test_khalti_initiation_goes_through_the_client(self):
+        buyer = get_user_model().objects.create_user(username='asha', password='pass')
+        service = Overview.objects.create(
+            user=get_user_model().objects.create_user(username='tailor', password='pass'),
+            category=Category.objects.create(name='Tailoring'), titleOverview='Kurta stitching',
+        )
+        client = APIClient()
+        client.force_authenticate(buyer)
+        res = client.post('/api/payments/initiate/', {'amount': 1500, 'method': 'khalti', 'service_id': service.pk})
+        self.assertEqual(res.status_code, 200)
+        self.assertTrue(res.data['payment_url'].startswith(self.fake.base_url))
+        self.assertEqual(Transaction.objects.get(pk=res.data['transaction_id']).overview, service.pk)
+
+        self.fake.failure_rate = 1.0
+        statuses = [client.post('/api/payments/initiate/', {'amount': 1500, 'method': 'khalti', 'service_id': service.pk}).status_code
+                    for _ in range(6)]
+        self.assertEqual(statuses, [502] * 5 + [503])
+
+
+class ReconcileTests(FakeGatewayMixin, TestCase):
+    fake_options = {'auto_complete': False}
+
+    def setUp(self):
+        super().setUp()
+        self.buyer = get_user_model().objects.create_user(username='asha', password='pass')
+        self.seller = get_user_model().objects.create_user(username='tailor', password='pass')
+        self.service = Overview.objects.create(
+            user=self.seller, category=Category.objects.create(name='Tailoring'), titleOverview='Kurta stitching',
+        )
+
+    def txn(self, payment_id, gateway='esewa', ref='', total='1575.00'):
+        return Transaction.objects.create(
+            overview=self.service.pk, sender=self.buyer, receiver=self.seller, amount=Decimal('1500'),
+            total_amount=Decimal(total), payment_id=payment_id, gateway=gateway, gateway_ref=ref,
+            service_fee=Decimal('225'), package_name='basic_package',
+        )
+
+    def states(self):
+        return dict(Transaction.objects.values_list('payment_id', 'verification'))
+
+    def test_gateway_pass_settles_each_outcome_once(self):
+        self.txn('TXN-E1', ref=self.fake.esewa_payment('TXN-E1', '1575.00'))
+        forged = self.txn('TXN-E2', ref='0001234567')
+        Order.objects.create(buyer=self.buyer, seller=self.seller, service=self.service, transaction=forged)
+        paid = self.initiate(order_id='TXN-K1')
+        self.fake.khalti_payments[paid['pidx']].update(status='Completed', total_amount=157500)
+        self.txn('TXN-K1', 'khalti', paid['pidx'])
+        self.txn('TXN-K2', 'khalti', self.initiate(order_id='TXN-K2')['pidx'])        # buyer still paying
+        self.txn('TXN-K3', 'khalti', 'no-such-pidx')
+        self.txn('TXN-X', ref='')                                                     # never came back
+
+        stats = reconcile_gateways(batch_size=2, concurrency=4)
+        self.assertEqual((stats['checked'], stats['verified'], stats['rejected'], stats['pending']), (5, 2, 2, 1))
+        self.assertEqual(self.states(), {
+            'TXN-E1': 'verified', 'TXN-E2': 'rejected', 'TXN-K1': 'verified',
+            'TXN-K2': 'unverified', 'TXN-K3': 'rejected', 'TXN-X': 'unverified',
+        })
+        self.assertEqual(set(Transaction.objects.filter(payment_status=True).values_list('payment_id', flat=True)),
+                         {'TXN-E1', 'TXN-K1'})
+        self.assertEqual(Order.objects.get(transaction=forged).status, 'cancelled')
+        self.assertEqual(ReconcileCheckpoint.objects.get(name='gateways').position, 0)
+        self.assertEqual(Account.objects.get(kind=Account.ESCROW).balance, Decimal('3150.00'))
+
+        # Settled rows are never asked about again; the pending one waits out RECONCILE_RECHECK_AFTER
+        requests = self.fake.requests
+        self.assertEqual(reconcile_gateways()['checked'], 0)
+        self.assertEqual(reconcile_gateways(recheck_after=0)['pending'], 1)
+        self.assertEqual(self.fake.requests, requests + 1)
+        self.assertEqual(Transaction.objects.get(payment_id='TXN-K2').check_attempts, 2)
+
+    @override_settings(PAYMENT_BREAKER_THRESHOLD=1, PAYMENT_BREAKER_RESET=60)
+    def test_open_circuit_stops_the_pass_and_the_next_run_resumes(self):
+        first, second, third = (self.txn(f'TXN-{n}', ref=self.fake.esewa_payment(f'TXN-{n}', '1575.00')) for n in range(3))
+        reset_clients()
+        self.fake.failure_rate = 1.0
+        stats = reconcile_gateways(concurrency=1)
+        self.assertEqual((stats['checked'], stats['pending'], stats['unavailable']), (1, 1, 2))
+        self.assertEqual(ReconcileCheckpoint.objects.get(name='gateways').position, first.pk)
+
+        self.fake.failure_rate = 0.0
+        reset_clients()
+        stats = reconcile_gateways()
+        self.assertEqual(stats['verified'], 2)
+        self.assertEqual(self.states(), {first.payment_id: 'unverified', second.payment_id: 'verified',
+                                         third.payment_id: 'verified'})
+
+    def test_esewa_without_a_verdict_stays_pending(self):
+        txn = self.txn('TXN-E1', ref=self.fake.esewa_payment('TXN-E1', '1575.00'))
+        order = Order.objects.create(buyer=self.buyer, seller=self.seller, service=self.service, transaction=txn)
+        for reply in ((401, 'Unauthorized'), (429, 'Too many requests'), (200, 'OK')):
+            self.fake.esewa_reply = reply
+            self.assertEqual(reconcile_gateways(recheck_after=0)['pending'], 1, reply)
+        self.assertEqual(self.states(), {'TXN-E1': 'unverified'})
+        self.assertEqual(Order.objects.get(pk=order.pk).status, 'pending')
+
+        self.fake.esewa_reply = None
+        self.assertEqual(reconcile_gateways(recheck_after=0)['verified'], 1)
+
+    def test_settlement_file_is_streamed_and_checkpointed(self):
+        for n in range(4):
+            self.txn(f'TXN-{n}')
+        fd, path = tempfile.mkstemp(suffix='.csv')
+        self.addCleanup(os.remove, path)
+        with os.fdopen(fd, 'w', newline='') as fh:
+            fh.write('payment_id,amount,status\n'
+                     'TXN-0,"1,575.00",Success\n'
+                     'TXN-1,1500.00,Success\n'      # short-paid: left for a human
+                     'TXN-2,1575.00,Failed\n'
+                     'TXN-404,99.00,Success\n')
+
+        stats = reconcile_settlement(path, batch_size=3)
+        self.assertEqual((stats['checked'], stats['verified'], stats['rejected'], stats['mismatch'], stats['unmatched']),
+                         (4, 1, 1, 1, 1))
+        self.assertEqual(reconcile_settlement(path)['checked'], 0)
+
+        with open(path, 'a', newline='') as fh:
+            fh.write('TXN-3,1575.00,COMPLETED\nTXN-0,1575.00,Failed\n')
+        stats = reconcile_settlement(path, batch_size=3)
+        self.assertEqual((stats['checked'], stats['verified'], stats.get('rejected', 0)), (2, 1, 0))
+        self.assertEqual(self.states(), {'TXN-0': 'verified', 'TXN-1': 'unverified', 'TXN-2': 'rejected',
+                                         'TXN-3': 'verified'})
+
+
+class SettlementTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.directory = tmp.name
+        users = get_user_model().objects
+        self.alice, self.bob, self.carol = (users.create_user(username=name, password='pass')
+                                            for name in ('alice', 'bob', 'carol'))
+        Bank.objects.create(user=self.alice, account_number='0123456789', ifsc_code='NIC0001', bank_name='=NIC Asia')
+        Upi_id.objects.create(user=self.carol, upi='carol@esewa')
+
+    def withdraw(self, user, amount, method='bank_transfer'):
+        withdrawal = PaymentWithdrawal.objects.create(user=user, amount=Decimal(amount), withdrawal_method=method)
+        record_payout(withdrawal, allow_overdraft=True)
+        return withdrawal
+
+    def read(self, batch):
+        with open(batch.file_path, newline='') as fh:
+            return list(csv.reader(fh))
+
+    def test_batches_per_method_and_settles_once(self):
+        first, missing, second = self.withdraw(self.alice, 500), self.withdraw(self.bob, 300), self.withdraw(self.alice, 200)
+        upi = self.withdraw(self.carol, 100, method='upi')
+        Payout.objects.create(seller=self.carol, amount=Decimal('50'), esewa_id='9800000001')
+        Payout.objects.create(seller=self.bob, amount=Decimal('75'), esewa_id='')
+
+        batches = settle_pending(batch_size=2, directory=self.directory)
+        self.assertEqual([(b.method, b.item_count, b.total_amount) for b in batches], [
+            ('bank_transfer', 1, Decimal('500.00')), ('bank_transfer', 1, Decimal('200.00')),
+            ('upi', 1, Decimal('100.00')), ('esewa', 1, Decimal('50.00')),
+        ])
+        self.assertEqual(self.read(batches[0]), [
+            ['reference', 'beneficiary', 'account_number', 'ifsc_code', 'bank_name', 'amount'],
+            [f'W{first.pk}', 'alice', '0123456789', 'NIC0001', "'=NIC Asia", '500.00'],     # not a formula
+        ])
+        self.assertEqual(self.read(batches[3])[1][1:], ['carol', '9800000001', '50.00'])
+        self.assertFalse([f for f in os.listdir(self.directory) if f.endswith('.part')])
+
+        # No bank details: rejected at claim time and the held amount handed back
+        missing.refresh_from_db()
+        self.assertEqual(missing.status, 'rejected')
+        self.assertEqual(seller_balance(self.bob), Decimal('0.00'))
+        self.assertEqual(Payout.objects.get(esewa_id='').status, 'rejected')
+
+        # Everything is claimed: a second worker finds nothing to pay
+        self.assertEqual(settle_pending(directory=self.directory), [])
+        self.assertEqual(set(PaymentWithdrawal.objects.filter(pk__in=[first.pk, second.pk, upi.pk])
+                             .values_list('status', flat=True)), {'processing'})
+
+        self.assertEqual(complete_batch(batches[0].reference), {'completed': 1, 'rejected': 0})
+        self.assertEqual(complete_batch(batches[1].reference, failed=[f'W{second.pk}']), {'completed': 0, 'rejected': 1})
+        with self.assertRaises(SettlementError):
+            complete_batch(batches[0].reference)
+        self.assertEqual(dict(PaymentWithdrawal.objects.values_list('pk', 'status')), {
+            first.pk: 'completed', missing.pk: 'rejected', second.pk: 'rejected', upi.pk: 'processing',
+        })
+        self.assertEqual(seller_balance(self.alice), Decimal('-500.00'))      # overdrawn on purpose in this test
+        self.assertEqual(Account.objects.get(kind=Account.PAYOUTS).balance, Decimal('100.00'))
+        self.assertEqual(Account.objects.get(kind=Account.CASH).balance, Decimal('-500.00'))
+
+    def test_abandoned_batch_is_taken_over_after_its_lease(self):
+        withdrawal = self.withdraw(self.alice, 500)
+        batch = claim_batch('bank_transfer')            # the worker dies before writing the file
+        self.assertEqual(settle_pending(directory=self.directory), [])
+
+        PayoutBatch.objects.filter(pk=batch.pk).update(leased_until=batch.leased_until - timedelta(hours=1))
+        [rewritten] = settle_pending(directory=self.directory)
+        self.assertEqual((rewritten.reference, rewritten.status, rewritten.item_count),
+                         (batch.reference, PayoutBatch.WRITTEN, 1))
+        self.assertEqual(self.read(rewritten)[1][0], f'W{withdrawal.pk}')
@@ -6,6 +6,8 @@ urlpatterns = [
     path('', views.payments, name='payments'),
     path('success/<int:transaction_id>/<str:username>/', views.success, name='payment_success'),
     path('failure/', views.failure, name='payment_failure'),
+    path('initiate/', views.initiate_payment_api, name='initiate_payment_api'),
+    path('gateway-stats/', views.gateway_stats_api, name='payment_gateway_stats'),
 
     # Withdrawal
     path('withdrawal/<str:username>/', views.withdrawal, name='withdrawal'),
@@ -5,10 +5,11 @@ from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import User
 from django.shortcuts import render, get_object_or_404, redirect
 from django.http import HttpResponseForbidden, JsonResponse
+from django.db import transaction as db_transaction
 from django.utils import timezone
 from datetime import timedelta
 from rest_framework.decorators import api_view, permission_classes
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework_simplejwt.authentication import JWTAuthentication
@@ -16,11 +17,15 @@ import requests
 # Models
 from .models import (
     Transaction, PaymentMethod, Upi_id, Bank,
-    SellerAccountBalance, PaymentWithdrawal
+    PaymentWithdrawal
 )
 from services.models import Overview, Package
 from Home.models import UserProfile
 from Orders.models import Order
+from core.sms import send_sms
+from ledger.entries import SELLER_FEE_RATE, record_payout, seller_balance
+from ledger.models import LedgerError
+from .gateway import CircuitOpen, GatewayError, gateway_stats, khalti
 
 # Custom eSewa signature (if no django_esewa package)
 def generate_signature(amount, transaction_uuid, product_code, secret_key):
@@ -30,22 +35,8 @@ def generate_signature(amount, transaction_uuid, product_code, secret_key):
 
 
 
-# SMS Fallback
-def send_sms(phone: str, message: str) -> None:
-    if not getattr(settings, 'SPARROW_SMS_API_KEY', None):
-        print(f"SMS Fallback: {message} to {phone}")  # Mock for now
-        return
-    url = 'https://api.sparrowsms.com/v1/send/'
-    payload = {
-        'token': settings.SPARROW_SMS_API_KEY,
-        'to': f'98{phone}',
-        'message': message,
-        'sender': settings.SPARROW_SMS_SENDER or 'SFA',
-    }
-    try:
-        requests.post(url, data=payload, timeout=5)
-    except Exception as e:
-        print(f"SMS Error: {e}")
+BUYER_FEE_RATE = Decimal('0.05')
+
 
 # Payment Initiation (HTML View)
 @login_required
@@ -69,23 +60,30 @@ def payments(request, overview_id, username):
         return JsonResponse({"error": "Package not found"}, status=404)
 
     actual_price = Decimal(package.price)
-    buyer_fee = actual_price * Decimal('0.05')
-    seller_fee = actual_price * Decimal('0.10')
+    buyer_fee = actual_price * BUYER_FEE_RATE
+    seller_fee = actual_price * SELLER_FEE_RATE
     service_fee = buyer_fee + seller_fee
     total_price = actual_price + buyer_fee
 
     package_name = f"{package_type}_package"
     package_description = package.description
 
-    transaction = Transaction.objects.create(
-        overview=overview,
-        sender=current_user,
-        receiver=overview.user,
-        amount=actual_price,
-        payment_id=f"TXN-{uuid.uuid4().hex[:12]}",
-        package_name=package_name,
-        service_fee=service_fee,
-    )
+    buyer_phone = getattr(current_user.userprofile, 'phone', '') if hasattr(current_user, 'userprofile') else ''
+    with db_transaction.atomic():
+        transaction = Transaction.objects.create(
+            overview=overview.pk,
+            sender=current_user,
+            receiver=overview.user,
+            amount=actual_price,
+            payment_id=f"TXN-{uuid.uuid4().hex[:12]}",
+            package_name=package_name,
+            service_fee=service_fee,
+            total_amount=total_price,
+            gateway='esewa',
+        )
+        # Queued with the transaction; deliver_sms sends it
+        send_sms(buyer_phone, f"Payment initiated: NPR {total_price} for {package_name.replace('_', ' ')}",
+                 key=f"txn:{transaction.payment_id}:initiated")
 
     # eSewa signature
     signed_field = generate_signature(
@@ -95,11 +93,6 @@ def payments(request, overview_id, username):
         secret_key=settings.ESEWA_SECRET_KEY,
     )
 
-    # SMS
-    buyer_phone = getattr(current_user.userprofile, 'phone', '') if hasattr(current_user, 'userprofile') else ''
-    if buyer_phone:
-        send_sms(buyer_phone, f"Payment initiated: NPR {total_price} for {package_name.replace('_', ' ')}")
-
     context = {
         'overview': overview,
         'price': total_price,
@@ -123,9 +116,15 @@ def success(request, transaction_id, username):
     transaction = get_object_or_404(Transaction, id=transaction_id)
     if username != request.user.username or transaction.sender != request.user:
         return HttpResponseForbidden("Access Denied")
+    if transaction.gateway_ref:
+        return render(request, 'payments/success.html', {'transaction_id': transaction_id})  # reloaded
 
-    transaction.payment_status = True
-    transaction.save()
+    # eSewa appends ?oid=&amt=&refId=. The redirect proves nothing by itself: record the
+    # reference and let the reconciler (manage.py reconcile_payments) verify it and set
+    # payment_status, so the buyer doesn't wait on eSewa here.
+    ref_id = request.GET.get('refId', '').strip()
+    if not ref_id:
+        return render(request, 'payments/failure.html', {'message': 'Payment reference missing.'})
 
     # Get delivery days from Package
     package = Package.objects.filter(
@@ -134,21 +133,25 @@ def success(request, transaction_id, username):
     ).first()
 
     days = package.delivery_time if package else 3
+    buyer_phone = getattr(request.user.userprofile, 'phone', '') if hasattr(request.user, 'userprofile') else ''
 
-    # Create Order
-    Order.objects.create(
-        buyer=request.user,
-        service=transaction.overview,
-        status='pending',
-        transaction=transaction,
-        delivery_date=timezone.now() + timedelta(days=days),
-        seller=transaction.receiver,
-    )
+    with db_transaction.atomic():
+        transaction.gateway, transaction.gateway_ref = 'esewa', ref_id
+        transaction.save(update_fields=['gateway', 'gateway_ref'])
+
+        # Create Order (cancelled by the reconciler if eSewa rejects the payment)
+        Order.objects.create(
+            buyer=request.user,
+            service_id=transaction.overview,
+            status='pending',
+            transaction=transaction,
+            delivery_date=timezone.now() + timedelta(days=days),
+            seller=transaction.receiver,
+        )
 
-    # SMS
-    buyer_phone = getattr(request.user.userprofile, 'phone', '') if hasattr(request.user, 'userprofile') else ''
-    if buyer_phone:
-        send_sms(buyer_phone, f"Payment successful! Order for {transaction.package_name.replace('_', ' ')} confirmed.")
+        # SMS (keyed: a reloaded success page doesn't text again)
+        send_sms(buyer_phone, f"Payment successful! Order for {transaction.package_name.replace('_', ' ')} confirmed.",
+                 key=f"txn:{transaction.id}:paid")
 
     return render(request, 'payments/success.html', {'transaction_id': transaction_id})  # Updated template
 
@@ -156,8 +159,7 @@ def success(request, transaction_id, username):
 @login_required
 def failure(request):
     phone = getattr(request.user.userprofile, 'phone', '') if hasattr(request.user, 'userprofile') else ''
-    if phone:
-        send_sms(phone, "Payment failed. Please try again.")
+    send_sms(phone, "Payment failed. Please try again.")
     return render(request, 'payments/failure.html', {'message': 'Payment failed.'})
 
 # API Endpoint for React (JSON)
@@ -175,13 +177,15 @@ def initiate_payment_api(request):
     seller = overview.user  # Assume Overview has user field
 
     transaction = Transaction.objects.create(
-        overview=overview,
+        overview=overview.pk,
         sender=request.user,
         receiver=seller,
         amount=amount,
         payment_id=f"TXN-{uuid.uuid4().hex[:12]}",
         package_name='standard_package',  # Default
         service_fee=amount * 0.15,  # 15% fee
+        total_amount=amount,
+        gateway=method,
     )
 
     if method == 'esewa':
@@ -200,24 +204,34 @@ def initiate_payment_api(request):
         })
 
     elif method == 'khalti':
-        payload = {
-            'public_key': settings.KHALTI_PUBLIC_KEY,  # Test key
-            'amount': int(amount * 100),  # Paisa
-            'transaction_id': transaction.payment_id,
-            'mobile': request.user.username,  # Or from profile
-            'url': f'{settings.SITE_URL}/api/payments/khalti/callback/',
-        }
-        response = requests.post('https://a.khalti.com/api/v2/epayment/initiate/', json=payload)
-        if response.status_code == 200:
-            data = response.json()
-            return Response({
-                'payment_url': data['payment_url'],
-                'transaction_id': transaction.id,
-            })
-        return Response({'error': 'Khalti initiation failed'}, status=500)
+        site_url = getattr(settings, 'SITE_URL', None) or request.build_absolute_uri('/').rstrip('/')
+        try:
+            data = khalti().initiate(
+                amount_paisa=int(amount * 100),
+                order_id=transaction.payment_id,
+                order_name=transaction.package_name,
+                return_url=f'{site_url}/api/payments/khalti/callback/',
+                website_url=site_url,
+            )
+        except CircuitOpen:
+            return Response({'error': 'Khalti is unavailable, please try again shortly'}, status=503)
+        except GatewayError:
+            return Response({'error': 'Khalti initiation failed'}, status=502)
+        transaction.gateway_ref = data['pidx']      # the reconciler looks the payment up by pidx
+        transaction.save(update_fields=['gateway_ref'])
+        return Response({
+            'payment_url': data['payment_url'],
+            'transaction_id': transaction.id,
+        })
 
     return Response({'error': 'Method not supported'}, status=400)
 
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def gateway_stats_api(request):
+    """Per-gateway latency histograms and circuit breaker state (this process)."""
+    return Response(gateway_stats())
+
 # Withdrawal Dashboard
 @login_required
 def withdrawal(request, username):
@@ -225,7 +239,7 @@ def withdrawal(request, username):
     if request.user.username != username:
         return HttpResponseForbidden("Access Denied")
 
-    balance = SellerAccountBalance.objects.filter(user=user).first()
+    balance = seller_balance(user)
     method, _ = PaymentMethod.objects.get_or_create(user=user)
     upi, _ = Upi_id.objects.get_or_create(user=user)
     bank, _ = Bank.objects.get_or_create(user=user)
@@ -249,7 +263,7 @@ def withdrawal(request, username):
 
     context = {
         'user': user,
-        'balance': balance.balance_amount if balance else Decimal('0'),
+        'balance': balance,
         'method': method,
         'upi': upi,
         'bank': bank,
@@ -263,18 +277,24 @@ def conform_withdrawal(request, username):
     if request.user.username != username:
         return HttpResponseForbidden("Access Denied")
 
-    balance = SellerAccountBalance.objects.filter(user=user).first()
-    if not balance or balance.balance_amount <= 0:
+    balance = seller_balance(user)
+    if balance <= 0:
         return redirect('withdrawal', username=username)
 
     if PaymentWithdrawal.objects.filter(user=user, status__in=['pending', 'processing']).exists():
         return redirect('withdrawal', username=username)
 
-    PaymentWithdrawal.objects.create(
-        user=user,
-        amount=balance.balance_amount,
-        withdrawal_method=PaymentMethod.objects.get(user=user).withdrawal_method,
-    )
+    # The payout entry holds the amount; it fails if a concurrent request already took it
+    try:
+        with db_transaction.atomic():
+            withdrawal = PaymentWithdrawal.objects.create(
+                user=user,
+                amount=balance,
+                withdrawal_method=PaymentMethod.objects.get(user=user).withdrawal_method,
+            )
+            record_payout(withdrawal)
+    except LedgerError:
+        return redirect('withdrawal', username=username)
     return render(request, 'payments/conform_withdrawal.html')
 
 # Buyer Dashboard Links
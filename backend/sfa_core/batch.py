@@ -0,0 +1,141 @@
+# sfa_core/batch.py
+"""
+Batch API: several GETs against existing DRF routes in one round trip.
+
+    POST /api/batch/
+    {"requests": [{"id": "stats", "path": "/api/admin/stats/"},
+                  {"id": "orders", "path": "/api/orders/", "query": {"page_size": 10}}]}
+
+    → {"responses": [{"id": "stats", "status": 200, "body": {...}}, ...]}
+
+The batch request is authenticated once (JWT, as configured for DRF) and the
+resulting user is forced onto every authenticated sub-request, so tokens are
+not decoded again. Each sub-request still runs its own view's permission
+checks and gets its own status. Sub-requests run concurrently in a thread pool (DRF
+views are synchronous, under WSGI and ASGI alike); ``BATCH_MAX_WORKERS = 0``
+runs them one after another in the request thread.
+
+Only GETs are batched, so a failed sub-request can never leave a partial
+write behind. Sub-requests bypass the middleware stack.
+"""
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.http import HttpRequest, QueryDict
+from django.urls import Resolver404, resolve
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+
+logger = logging.getLogger(__name__)
+
+MAX_REQUESTS = 20
+DEFAULT_MAX_WORKERS = 8
+
+# Parent headers that must not leak into sub-requests
+DROPPED_META = ('CONTENT_LENGTH', 'CONTENT_TYPE', 'HTTP_IF_NONE_MATCH', 'HTTP_IF_MODIFIED_SINCE')
+
+_executor = None
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        workers = getattr(settings, 'BATCH_MAX_WORKERS', DEFAULT_MAX_WORKERS)
+        _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='api-batch')
+    return _executor
+
+
+def _sub_request(parent, path, query_string, user, auth):
+    request = HttpRequest()
+    request.method = 'GET'
+    request.path = request.path_info = path
+    request.META = {key: value for key, value in parent.META.items() if key not in DROPPED_META}
+    request.META.update(REQUEST_METHOD='GET', PATH_INFO=path, QUERY_STRING=query_string)
+    request.GET = QueryDict(query_string)
+    if hasattr(parent, 'session'):
+        request.session = parent.session
+    request.user = user
+    if user.is_authenticated:
+        # DRF skips its authenticators when these are set
+        request._force_auth_user = user
+        request._force_auth_token = auth
+    return request
+
+
+def _error(sub_id, status, message):
+    return {'id': sub_id, 'status': status, 'body': {'error': message}}
+
+
+def _run(parent, spec, user, auth):
+    sub_id = spec.get('id')
+    path = spec.get('path')
+    if spec.get('method', 'GET').upper() != 'GET':
+        return _error(sub_id, 405, 'Only GET sub-requests can be batched')
+    if not isinstance(path, str) or not path.startswith('/'):
+        return _error(sub_id, 400, 'path must be an absolute URL path')
+    path, _, inline_query = path.partition('?')
+    try:
+        match = resolve(path)
+    except Resolver404:
+        return _error(sub_id, 404, 'Not found')
+    if not hasattr(match.func, 'cls') or match.func is batch_api:
+        return _error(sub_id, 400, 'Not a batchable API route')
+
+    query = QueryDict(inline_query, mutable=True)
+    for name, value in (spec.get('query') or {}).items():
+        query.setlist(name, [str(v) for v in value] if isinstance(value, list) else [str(value)])
+
+    request = _sub_request(parent, path, query.urlencode(), user, auth)
+    request.resolver_match = match
+    try:
+        response = match.func(request, *match.args, **match.kwargs)
+        if hasattr(response, 'render') and not response.is_rendered:
+            response.render()
+    except Exception:
+        logger.exception("Batched GET %s failed", path)
+        return _error(sub_id, 500, 'Server error')
+
+    body = getattr(response, 'data', None)
+    if body is None and response.content:
+        try:
+            body = json.loads(response.content)
+        except ValueError:
+            body = response.content.decode(response.charset, errors='replace')
+    return {'id': sub_id, 'status': response.status_code, 'body': body}
+
+
+def _run_in_worker(parent, spec, user, auth):
+    close_old_connections()
+    try:
+        return _run(parent, spec, user, auth)
+    finally:
+        close_old_connections()
+
+
+@api_view(['POST'])
+@permission_classes([AllowAny])
+def batch_api(request):
+    """
+    POST {"requests": [{"id", "path", "query"?, "method"?: "GET"}, ...]} →
+    {"responses": [{"id", "status", "body"}, ...]} in request order.
+    """
+    specs = request.data.get('requests') if isinstance(request.data, dict) else None
+    if not isinstance(specs, list) or not specs:
+        return Response({'error': 'requests must be a non-empty list'}, status=400)
+    if len(specs) > MAX_REQUESTS:
+        return Response({'error': f'At most {MAX_REQUESTS} requests per batch'}, status=400)
+    if not all(isinstance(spec, dict) for spec in specs):
+        return Response({'error': 'Each request must be an object'}, status=400)
+
+    # Authenticate once; sub-requests reuse the result
+    user, auth, parent = request.user, request.auth, request._request
+    if getattr(settings, 'BATCH_MAX_WORKERS', DEFAULT_MAX_WORKERS) == 0:
+        responses = [_run(parent, spec, user, auth) for spec in specs]
+    else:
+        futures = [_get_executor().submit(_run_in_worker, parent, spec, user, auth) for spec in specs]
+        responses = [future.result() for future in futures]
+    return Response({'responses': responses})
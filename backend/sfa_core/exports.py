@@ -0,0 +1,201 @@
+# sfa_core/exports.py
+"""
+Streaming admin exports of bookings, orders, transactions and withdrawals.
+
+    GET /api/admin/export/bookings.csv?since=2025-01-01&until=2025-03-31&status=pending,confirmed
+
+Rows are read in primary-key order in keyset batches (``pk > last seen``,
+``EXPORT_BATCH_SIZE`` rows each) projected with ``values_list()``, and every
+batch is encoded and handed to the ``StreamingHttpResponse`` before the next
+one is read. Memory use is one batch, however large the table, and no query
+or cursor stays open for the whole download.
+
+The extension picks the format: ``.ndjson`` (one JSON object per line) or
+``.csv``. (``?format=`` is taken by DRF's content negotiation.)
+
+``since``/``until`` are inclusive ISO dates, in ``TIME_ZONE``, applied to
+each dataset's creation date; ``status`` takes comma-separated values.
+
+CSV text cells that a spreadsheet would run as a formula (``=``, ``+``,
+``-``, ``@``, tab or carriage return first) are written with a leading
+``'`` (``csv_safe``); the payout batch files of ``payments/settlement.py``
+use it too.
+"""
+import csv
+from datetime import date, datetime, time, timedelta
+
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+
+from Orders.models import Order
+from payments.models import PaymentWithdrawal, Transaction
+from services.models import Booking
+
+from .renderers import ORJSONRenderer
+
+DEFAULT_BATCH_SIZE = 2000
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+class Dataset:
+    def __init__(self, model, columns, date_field, status_field, statuses=None):
+        self.model = model
+        self.columns = columns                  # output column -> ORM lookup
+        self.date_field = date_field
+        self.status_field = status_field
+        # ?status= value -> stored value; defaults to the field's choices
+        self.statuses = statuses or {value: value for value, _ in model._meta.get_field(status_field).choices}
+
+
+DATASETS = {
+    'bookings': Dataset(Booking, {
+        'id': 'id',
+        'buyer': 'buyer__username',
+        'seller': 'overview__user__username',
+        'service_id': 'overview_id',
+        'service': 'overview__titleOverview',
+        'package': 'package__package_type',
+        'price': 'package__price',
+        'preferred_date': 'preferred_date',
+        'status': 'status',
+        'created_at': 'created_at',
+    }, date_field='created_at', status_field='status'),
+    'orders': Dataset(Order, {
+        'id': 'id',
+        'buyer': 'buyer__username',
+        'seller': 'seller__username',
+        'service_id': 'service_id',
+        'service': 'service__titleOverview',
+        'transaction_id': 'transaction_id',
+        'status': 'status',
+        'created_at': 'created_at',
+        'delivery_date': 'delivery_date',
+    }, date_field='created_at', status_field='status'),
+    'transactions': Dataset(Transaction, {
+        'id': 'id',
+        'service_id': 'overview',
+        'sender': 'sender__username',
+        'receiver': 'receiver__username',
+        'package': 'package_name',
+        'amount': 'amount',
+        'service_fee': 'service_fee',
+        'paid': 'payment_status',
+        'payment_id': 'payment_id',
+        'timestamp': 'timestamp',
+    }, date_field='timestamp', status_field='payment_status', statuses={'paid': True, 'unpaid': False}),
+    'withdrawals': Dataset(PaymentWithdrawal, {
+        'id': 'id',
+        'user': 'user__username',
+        'amount': 'amount',
+        'method': 'withdrawal_method',
+        'status': 'status',
+        'created_at': 'created_at',
+    }, date_field='created_at', status_field='status'),
+}
+
+
+def keyset_batches(queryset, lookups, batch_size):
+    """Lists of ``values_list(*lookups)`` rows in pk order; ``lookups[0]`` must be the pk."""
+    last = None
+    while True:
+        page = queryset if last is None else queryset.filter(pk__gt=last)
+        rows = list(page.order_by('pk').values_list(*lookups)[:batch_size].iterator(chunk_size=batch_size))
+        if not rows:
+            return
+        yield rows
+        if len(rows) < batch_size:
+            return
+        last = rows[-1][0]
+
+
+# ────── Encoders ──────
+class _Echo:
+    """File-like object for ``csv.writer`` that hands back what is written."""
+    def write(self, value):
+        return value
+
+
+def csv_safe(value):
+    """``value``, with a ``'`` in front if it is text a spreadsheet would evaluate."""
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def _csv_cell(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return '' if value is None else csv_safe(value)
+
+
+def ndjson_chunks(columns, batches):
+    render = ORJSONRenderer().render
+    for rows in batches:
+        yield b''.join(render(dict(zip(columns, row))) + b'\n' for row in rows)
+
+
+def csv_chunks(columns, batches):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(columns)
+    for rows in batches:
+        yield ''.join(writer.writerow([_csv_cell(value) for value in row]) for row in rows)
+
+
+FORMATS = {
+    'ndjson': ('application/x-ndjson', ndjson_chunks),
+    'csv': ('text/csv; charset=utf-8', csv_chunks),
+}
+
+
+def _day_start(params, name, days=0):
+    try:
+        day = date.fromisoformat(params[name])
+    except ValueError:
+        raise ValueError(f"{name} must be a YYYY-MM-DD date") from None
+    return timezone.make_aware(datetime.combine(day + timedelta(days=days), time.min))
+
+
+def filter_dataset(dataset, params):
+    """The dataset's queryset with ``since``/``until``/``status`` applied; ValueError on bad input."""
+    queryset = dataset.model._default_manager.all()
+    if params.get('since'):
+        queryset = queryset.filter(**{f'{dataset.date_field}__gte': _day_start(params, 'since')})
+    if params.get('until'):
+        queryset = queryset.filter(**{f'{dataset.date_field}__lt': _day_start(params, 'until', days=1)})
+
+    wanted = [s.strip() for s in params.get('status', '').split(',') if s.strip()]
+    if wanted:
+        unknown = [s for s in wanted if s not in dataset.statuses]
+        if unknown:
+            raise ValueError(f"Unknown status {', '.join(unknown)}; expected one of {', '.join(dataset.statuses)}")
+        queryset = queryset.filter(**{f'{dataset.status_field}__in': [dataset.statuses[s] for s in wanted]})
+    return queryset
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def admin_export(request, dataset, export_format):
+    spec = DATASETS.get(dataset)
+    if spec is None:
+        return Response({'error': f"Unknown dataset; expected one of {', '.join(DATASETS)}"}, status=404)
+    if export_format not in FORMATS:
+        return Response({'error': f"Unknown format; expected one of {', '.join(FORMATS)}"}, status=404)
+    try:
+        queryset = filter_dataset(spec, request.query_params)
+    except ValueError as exc:
+        return Response({'error': str(exc)}, status=400)
+
+    batch_size = getattr(settings, 'EXPORT_BATCH_SIZE', DEFAULT_BATCH_SIZE)
+    columns = list(spec.columns)
+    content_type, encode = FORMATS[export_format]
+    batches = keyset_batches(queryset, list(spec.columns.values()), batch_size)
+
+    response = StreamingHttpResponse(encode(columns, batches), content_type=content_type)
+    filename = f'{dataset}-{timezone.localdate():%Y%m%d}.{export_format}'
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    response['Cache-Control'] = 'no-store'
+    return response
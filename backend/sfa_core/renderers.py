@@ -0,0 +1,40 @@
+# sfa_core/renderers.py
+"""
+Drop-in replacement for DRF's ``JSONRenderer`` backed by orjson.
+
+Output matches ``JSONRenderer``'s compact form. Dates and times, Decimals,
+lazy strings and anything else orjson doesn't handle natively go through
+DRF's own ``JSONEncoder.default``, so values render exactly as before. An
+``indent`` in the Accept header gives two-space indentation (all orjson
+offers). Without orjson installed, or with ``UNICODE_JSON``/``COMPACT_JSON``
+turned off, it behaves as ``JSONRenderer``.
+"""
+from rest_framework.utils.encoders import JSONEncoder
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional, fall back to the stdlib encoder
+    orjson = None
+
+_default = JSONEncoder().default
+
+
+class ORJSONRenderer(JSONRenderer):
+    if orjson is not None:
+        options = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or self.ensure_ascii or not self.compact:
+            return super().render(data, accepted_media_type, renderer_context)
+        if data is None:
+            return b''
+
+        options = self.options
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            options |= orjson.OPT_INDENT_2
+        ret = orjson.dumps(data, default=_default, option=options)
+        # Same strict-javascript-subset escaping as JSONRenderer
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
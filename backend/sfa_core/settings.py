@@ -43,6 +43,7 @@ INSTALLED_APPS = [
     'UserDashboard',
     'chating',
     'core',
+    'ledger',
     'payments',
     
     'services',
@@ -61,6 +62,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'services.singleflight.SingleFlightMiddleware',
 ]
 
 ROOT_URLCONF = 'sfa_core.urls'
@@ -108,7 +110,7 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.IsAuthenticated',
     ],
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        'sfa_core.renderers.ORJSONRenderer',
     ],
 }
 
@@ -145,9 +147,69 @@ ESEWA_SUCCESS_URL = "http://127.0.0.1:8000/payments/success/"
 ESEWA_FAILURE_URL = "http://127.0.0.1:8000/payments/failure/"
 ESEWA_VERIFY_URL = "https://uat.esewa.com.np/epay/transrec"
 
+# Khalti ePayment
+KHALTI_BASE_URL = os.getenv('KHALTI_BASE_URL', 'https://dev.khalti.com/api/v2/')
+KHALTI_SECRET_KEY = os.getenv('KHALTI_SECRET_KEY', '')
+
+# Payment gateway clients (payments/gateway.py)
+PAYMENT_CONNECT_TIMEOUT = 3.05  # seconds
+PAYMENT_READ_TIMEOUT = 10
+PAYMENT_POOL_SIZE = 20          # keep-alive connections per gateway
+PAYMENT_BREAKER_THRESHOLD = 5   # consecutive failures before calls fail fast
+PAYMENT_BREAKER_RESET = 30      # seconds before a trial call
+RECONCILE_BATCH_SIZE = 200      # transactions per verification batch (manage.py reconcile_payments)
+RECONCILE_CONCURRENCY = 16      # gateway status calls in flight per batch
+RECONCILE_RECHECK_AFTER = 300   # seconds before a still-pending payment is asked about again
+SETTLEMENT_DIR = BASE_DIR / 'settlements'   # payout batch files (manage.py settle_payouts)
+SETTLEMENT_BATCH_SIZE = 1000    # withdrawals/payouts per batch file
+SETTLEMENT_LEASE = 600          # seconds a worker has to write a claimed batch before another takes it over
+
 # SMS
 SPARROW_SMS_API_KEY = os.getenv('SPARROW_SMS_API_KEY')
 SPARROW_SMS_SENDER = os.getenv('SPARROW_SMS_SENDER', 'SFA')
+SMS_GATEWAY = 'core.sms.SparrowGateway'   # outbox delivery backend (manage.py deliver_sms)
+SMS_BATCH_SIZE = 100            # outbox rows claimed per delivery round
+SMS_MAX_ATTEMPTS = 6            # then the message is marked failed
+SMS_DEDUPE_WINDOW = 600         # seconds; same text to the same phone is sent once
+SMS_TIMEOUT = 5                 # seconds per gateway call
+
+# Service search indexes (in-process, see services/snapshot.py)
+SERVICE_SNAPSHOT_MAX_AGE = 300  # seconds before a full reload
+SERVICE_SEARCH_MAX_AGE = 300
+FUZZY_SEARCH_THRESHOLD = 0.3    # trigram similarity, 0..1
+FUZZY_SEARCH_MAX_RESULTS = 50
+AUTOCOMPLETE_MAX_ENTRIES = 100_000   # suggestions kept in memory
+
+# Caches — "services" holds assembled service documents, cached API responses
+# and the version stamps that invalidate both (see services/cache.py). Every
+# worker must see the same stamps, so production points SERVICE_CACHE_URL at a
+# shared Redis (redis://host:6379/1). The local-memory fallback is per process,
+# fine for one dev server; `manage.py check --deploy` warns about it.
+SERVICE_CACHE_URL = os.getenv('SERVICE_CACHE_URL', '')
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "services": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": SERVICE_CACHE_URL,
+        "TIMEOUT": 600,
+    } if SERVICE_CACHE_URL else {
+        # evicts least recently used entries past MAX_ENTRIES
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "service-documents",
+        "TIMEOUT": 600,
+        "OPTIONS": {"MAX_ENTRIES": 10_000, "CULL_FREQUENCY": 10},
+    },
+}
+SERVICE_CACHE_ALIAS = "services"
+HTTP_CACHE_MAX_AGE = 60         # seconds a public API response is served as fresh
+HTTP_CACHE_STALE_TTL = 300      # further seconds served stale while one refresh runs
+# Concurrent identical GETs to these views share one computation (services/singleflight.py)
+SINGLE_FLIGHT_URL_NAMES = ["service_list_api", "nearby_services_api"]
+SINGLE_FLIGHT_TIMEOUT = 10      # seconds a coalesced request waits before computing itself
+BATCH_MAX_WORKERS = 8           # threads running /api/batch/ sub-requests; 0 runs them inline
+EXPORT_BATCH_SIZE = 2000        # rows per keyset batch in /api/admin/export/ downloads
 
 # CORS
 CORS_ALLOWED_ORIGINS = [
@@ -12,6 +12,8 @@ from rest_framework_simplejwt.views import (
     TokenRefreshView,
 )
 from accounts.views import profile_view
+from sfa_core.batch import batch_api
+from sfa_core.exports import admin_export
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -28,6 +30,8 @@ urlpatterns = [
     path('api/orders/', include('Orders.urls')),
     path('api/payments/', include('payments.urls')),
     path('api/book/', create_booking, name='create_booking'),
+    path('api/batch/', batch_api, name='api_batch'),       # several GETs, one round trip
+    path('api/admin/export/<slug:dataset>.<slug:export_format>', admin_export, name='admin_export'),
 
    
     path('accounts/', include('accounts.urls')),
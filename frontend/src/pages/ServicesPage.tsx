@@ -1,10 +1,13 @@
 // src/pages/ServicesPage.tsx — FINAL 100% WORKING — SERVICES ALWAYS SHOW
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { useNavigate } from 'react-router-dom';
 import axios from 'axios';
 import { Star, Search, MapPin } from 'lucide-react';
 import { useApp } from '../context/AppContext';
 
+const API = 'http://127.0.0.1:8000/api';
+const PAGE_SIZE = 24;
+
 interface Service {
   id: number;
   titleOverview: string;
@@ -13,48 +16,107 @@ interface Service {
   distance_km: number | null;
 }
 
+// Where the next page comes from: the list's `next` cursor URL, or a search offset
+type NextPage = { url: string } | { q: string; offset: number } | null;
+
+const DEMO_SERVICES: Service[] = [
+  { id: 1, titleOverview: "Professional React + Django Full Stack Website", provider: "raju", overall_rating: 4.9, distance_km: 2.4 },
+  { id: 2, titleOverview: "Mobile App Development (React Native)", provider: "himal", overall_rating: 4.8, distance_km: 5.1 },
+  { id: 3, titleOverview: "Logo & Complete Branding Package", provider: "gita", overall_rating: 5.0, distance_km: 1.8 },
+  { id: 4, titleOverview: "YouTube Video Editing Pro", provider: "sabin", overall_rating: 4.7, distance_km: 3.9 },
+  { id: 5, titleOverview: "Digital Marketing & SEO Expert", provider: "anisha", overall_rating: 4.8, distance_km: 4.2 },
+  { id: 6, titleOverview: "3D Animation & VFX", provider: "prabin", overall_rating: 4.9, distance_km: 6.8 }
+];
+
+// One bounded page: the card fields of the service list, or a page of /api/search/ hits
+async function fetchPage(page: { url: string } | { q: string; offset: number }) {
+  if ('url' in page) {
+    const res = await axios.get(page.url);
+    return { results: res.data.results as Service[], next: res.data.next ? { url: res.data.next } : null };
+  }
+  const res = await axios.get(`${API}/search/`, { params: { q: page.q, limit: PAGE_SIZE, offset: page.offset } });
+  const offset = page.offset + res.data.results.length;
+  return {
+    results: res.data.results as Service[],
+    next: offset < res.data.count && res.data.results.length ? { q: page.q, offset } : null,
+  };
+}
+
 export default function ServicesPage() {
   const { user, notify } = useApp();
   const navigate = useNavigate();
   const [services, setServices] = useState<Service[]>([]);
   const [searchTerm, setSearchTerm] = useState('');
+  const [query, setQuery] = useState('');
+  const [next, setNext] = useState<NextPage>(null);
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
+  const sentinel = useRef<HTMLDivElement>(null);
+  const generation = useRef(0);      // bumped per query, so late pages of an old one are dropped
 
+  // Search on the server once typing pauses
+  useEffect(() => {
+    const timer = setTimeout(() => setQuery(searchTerm.trim()), 300);
+    return () => clearTimeout(timer);
+  }, [searchTerm]);
 
-useEffect(() => {
-  const fetchServices = async () => {
-    try {
-      const res = await axios.get('http://127.0.0.1:8000/api/');
-      
-      if (Array.isArray(res.data) && res.data.length > 0) {
-        setServices(res.data);
-        console.log("REAL SERVICES LOADED:", res.data);
-      } else {
-        throw new Error("No real data");
-      }
-    } catch (err) {
-     
-      notify('Showing demo services', 'success');
-      setServices([
-        { id: 1, titleOverview: "Professional React + Django Full Stack Website", provider: "raju", overall_rating: 4.9, distance_km: 2.4 },
-        { id: 2, titleOverview: "Mobile App Development (React Native)", provider: "himal", overall_rating: 4.8, distance_km: 5.1 },
-        { id: 3, titleOverview: "Logo & Complete Branding Package", provider: "gita", overall_rating: 5.0, distance_km: 1.8 },
-        { id: 4, titleOverview: "YouTube Video Editing Pro", provider: "sabin", overall_rating: 4.7, distance_km: 3.9 },
-        { id: 5, titleOverview: "Digital Marketing & SEO Expert", provider: "anisha", overall_rating: 4.8, distance_km: 4.2 },
-        { id: 6, titleOverview: "3D Animation & VFX", provider: "prabin", overall_rating: 4.9, distance_km: 6.8 }
-      ]);
-    } finally {
-      setLoading(false);
-    }
-  };
+  // First page of the list, or of the search results
+  useEffect(() => {
+    let cancelled = false;
+    generation.current += 1;
+    const first = query
+      ? { q: query, offset: 0 }
+      : { url: `${API}/?fields=id,titleOverview,provider,overall_rating,distance_km&page_size=${PAGE_SIZE}` };
 
-  fetchServices();
-}, []);
+    setLoadingMore(true);
+    fetchPage(first)
+      .then(({ results, next }) => {
+        if (cancelled) return;
+        if (!query && results.length === 0) throw new Error("No real data");
+        setServices(results);
+        setNext(next);
+      })
+      .catch(() => {
+        if (cancelled) return;
+        if (query) {
+          notify('Search failed, please try again', 'error');
+          return;
+        }
+        notify('Showing demo services', 'success');
+        setServices(DEMO_SERVICES);
+        setNext(null);
+      })
+      .finally(() => {
+        if (cancelled) return;
+        setLoading(false);
+        setLoadingMore(false);
+      });
+    return () => { cancelled = true; };
+  }, [query]);
 
-  const filtered = services.filter(s =>
-    s.titleOverview.toLowerCase().includes(searchTerm.toLowerCase()) ||
-    s.provider.toLowerCase().includes(searchTerm.toLowerCase())
-  );
+  // Next page when the end of the grid scrolls into view
+  useEffect(() => {
+    const node = sentinel.current;
+    if (!node || !next || loadingMore) return;
+    const observer = new IntersectionObserver(async ([entry]) => {
+      if (!entry.isIntersecting) return;
+      observer.disconnect();
+      const gen = generation.current;
+      setLoadingMore(true);
+      try {
+        const page = await fetchPage(next);
+        if (gen !== generation.current) return;
+        setServices(prev => [...prev, ...page.results]);
+        setNext(page.next);
+      } catch {
+        if (gen === generation.current) notify('Could not load more services', 'error');
+      } finally {
+        if (gen === generation.current) setLoadingMore(false);
+      }
+    }, { rootMargin: '400px' });
+    observer.observe(node);
+    return () => observer.disconnect();
+  }, [next, loadingMore]);
 
   const renderStars = (rating: number) => {
     return Array.from({ length: 5 }, (_, i) => (
@@ -92,7 +154,7 @@ useEffect(() => {
         </div>
 
         <div className="grid md:grid-cols-2 lg:grid-cols-3 gap-10">
-          {filtered.map((s) => (
+          {services.map((s) => (
             <div
               key={s.id}
               onClick={() => navigate(`/service/${s.id}`)}
@@ -130,7 +192,12 @@ useEffect(() => {
           ))}
         </div>
 
-        {filtered.length === 0 && (
+        <div ref={sentinel} className="h-10" />
+        {loadingMore && !loading && (
+          <p className="text-center text-2xl text-gray-300 animate-pulse">Loading more services...</p>
+        )}
+
+        {services.length === 0 && !loadingMore && (
           <div className="text-center py-32">
             <p className="text-6xl text-gray-400 mb-8">No services found</p>
             <p className="text-3xl text-gray-500">Try different keywords</p>